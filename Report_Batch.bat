@@ -0,0 +1,18 @@
+@echo off
+
+rem Compiles reports without prompts, e.g. from Task Scheduler:
+rem   Report_Batch.bat "Q:\EngineeringPlanning\TeamMembers" --workers 4
+
+rem Activate Conda environment
+call conda activate excel
+
+rem Change directory to the location of the Python script
+cd /d "Q:\EngineeringPlanning\ReportTools\stable builds\Report Pipeline"
+
+rem Run in this window so the scheduler sees the exit code
+python batch.py %*
+set BATCH_EXIT=%ERRORLEVEL%
+
+rem Deactivate Conda environment (optional)
+call conda deactivate
+exit /b %BATCH_EXIT%
@@ -0,0 +1,17 @@
+@echo off
+
+rem Helps another workstation read the time forecast sheets of a run
+rem started with --shared-ingest (main.py or batch.py), e.g.:
+rem   Report_Ingest.bat "Q:\EngineeringPlanning\TeamMembers" --ingest-dir "Q:\EngineeringPlanning\ReportTools\ingest" --wait
+
+rem Activate Conda environment
+call conda activate excel
+
+rem Change directory to the location of the Python script
+cd /d "Q:\EngineeringPlanning\ReportTools\stable builds\Report Pipeline"
+
+rem Run in this window, until the run is read (or Ctrl+C with --wait)
+python ingest.py %*
+
+rem Deactivate Conda environment (optional)
+call conda deactivate
\ No newline at end of file
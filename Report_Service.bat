@@ -0,0 +1,14 @@
+@echo off
+
+rem Activate Conda environment
+call conda activate excel
+
+rem Change directory to the location of the Python script
+cd /d "Q:\EngineeringPlanning\ReportTools\stable builds\Report Pipeline"
+
+rem Start the report service in a new command prompt window, then
+rem request reports with "python reportClient.py" from that directory
+start cmd /k "python service.py"
+
+rem Deactivate Conda environment (optional)
+call conda deactivate
\ No newline at end of file
@@ -0,0 +1,270 @@
+'''
+Times each stage of the report pipeline on synthetic
+time forecasts (see generateForecasts.py) at several
+team sizes, and checks the reports written from the
+50 person forecasts against golden.json, so a change
+which makes a stage faster provably writes the same
+reports.
+
+    python benchmark.py                      time 50, 500 and 5000 people
+    python benchmark.py --sizes 50 500       time some sizes only
+    python benchmark.py --golden-only        only check the golden reports
+    python benchmark.py --update-golden      accept the current reports as golden
+
+Fixtures are written once per size to --fixtures and
+reused by later runs.
+'''
+import os
+import sys
+import io
+import re
+import json
+import time
+import hashlib
+import argparse
+import tempfile
+import contextlib
+import datetime as dt
+from typing import Callable, Dict, List, Tuple
+
+import openpyxl
+import pandas as pd
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCHMARKS, "..", "stable builds", "Report Pipeline"))
+from generateForecasts import generate, DEFAULT_DATE
+from fileIO import retrieveTimeForecasts, listTimeForecasts, pmForecasts, teamForecasts, getContractCatalog, getTeamList
+from manipulate import filterNaNs
+from render import emitPlan
+from pipeline import writeValidationReport
+import pmReport
+import teamReport
+
+# silence obnoxious false positive warning
+pd.options.mode.chained_assignment = None
+
+DEFAULT_SIZES = [50, 500, 5000]
+GOLDEN_SIZE = 50
+GOLDEN_FILE = os.path.join(BENCHMARKS, "golden.json")
+DEFAULT_FIXTURES = os.path.join(tempfile.gettempdir(), "engineeringPlanning_benchmarks")
+
+# generation time differs on every run and is left out of the golden reports
+GENERATED = re.compile(r"GENERATED: .*")
+
+def fixture(directory: str, people: int) -> str:
+    '''Time forecast directory of a given size, generated on first use'''
+    root = os.path.join(directory, f"people_{people}")
+    done = os.path.join(root, "generated")
+    if not os.path.exists(done):
+        print(f"Generating {people} time forecasts in {root}...")
+        generate(root, people)
+        open(done, 'w').close()
+    return root
+
+class Timer:
+    def __init__(self, quiet: bool =True):
+        '''
+        Initialize a Timer object.
+
+        Parameters:
+        - quiet (bool): Hide the progress lines printed by the timed stages (default is True).
+        '''
+        self.quiet = quiet
+        self.stages: Dict[str, float] = {}
+
+    def __call__(self, stage: str, function: Callable, *args):
+        '''Runs function(*args), adding its wall time to the stage'''
+        output = io.StringIO() if self.quiet else sys.stdout
+        with contextlib.redirect_stdout(output):
+            start = time.perf_counter()
+            result = function(*args)
+            elapsed = time.perf_counter() - start
+        self.stages[stage] = self.stages.get(stage, 0.0) + elapsed
+        return result
+
+def runReports(root: str, OUTPUT: str, timer: Timer, workers: int =1) -> Dict[str, str]:
+    '''
+    Writes the PM, Team and validation reports of a fixture
+    the way the pipeline does, one stage at a time
+
+    Returns
+    -------
+        report -> path
+    '''
+    sheets = os.path.join(root, "TeamMembers")
+    forecasts, DATE, contexts = timer("ingest", retrieveTimeForecasts, sheets, workers, None)
+    catalog = timer("reference lists", getContractCatalog, os.path.join(root, "ContractList.xlsx"))
+    team_list = timer("reference lists", getTeamList, os.path.join(root, "TeamMembersList.xlsx"))
+
+    paths = {}
+
+    pm = timer("filterNaNs", lambda: filterNaNs(pmForecasts(forecasts)))
+    contracts_with_pm = timer("merge", pmReport.prepareReport, pm, catalog)
+    plan = timer("plan", pmReport.planReport, contracts_with_pm, catalog, team_list, DATE)
+    paths["pm"] = saveTimed(plan, os.path.join(OUTPUT, f"PM_Report_for_{DATE}.xlsx"), timer)
+
+    team = timer("filterNaNs", lambda: filterNaNs(teamForecasts(forecasts)))
+    team, disciplines = timer("merge", teamReport.prepareReport, team, catalog, team_list)
+    plan = timer("plan", teamReport.planReport, team, disciplines, team_list, DATE)
+    paths["team"] = saveTimed(plan, os.path.join(OUTPUT, f"Team_Report_for_{DATE}.xlsx"), timer)
+
+    paths["validation"] = timer(
+        "validation",
+        writeValidationReport,
+        listTimeForecasts(sheets),
+        contexts,
+        DEFAULT_DATE,
+        catalog,
+        team_list,
+        OUTPUT,
+        "benchmark"
+    )
+    return paths
+
+def saveTimed(plan, path: str, timer: Timer) -> str:
+    '''pipeline.saveReport, with rendering and saving timed apart'''
+    wb = openpyxl.Workbook()
+    ws = wb.create_sheet("Report", 0)
+    timer("render", emitPlan, ws, plan)
+    timer("save", wb.save, path)
+    return path
+
+def dumpWorkbook(path: str) -> str:
+    '''
+    Canonical text of the "Report" sheet of a report: merges,
+    column widths and the value and style of every cell which
+    has either, with the generation time left out
+    '''
+    ws = openpyxl.load_workbook(path)["Report"]
+    lines = ["MERGES " + " ".join(sorted(str(m) for m in ws.merged_cells.ranges))]
+    for letter, dimension in sorted(ws.column_dimensions.items()):
+        lines.append(f"WIDTH {letter} {dimension.width}")
+    for row in ws.iter_rows():
+        for c in row:
+            styled = c.border.left.style or c.fill.fill_type or c.font.b
+            if c.value is None and not styled:
+                continue
+            value = GENERATED.sub("GENERATED", c.value) if isinstance(c.value, str) else c.value
+            lines.append(" ".join(str(part) for part in (
+                c.coordinate,
+                repr(value),
+                c.font.b,
+                c.fill.fgColor.rgb if c.fill.fill_type else None,
+                c.border.left.style,
+                c.border.top.style,
+                c.alignment.horizontal,
+                c.alignment.vertical,
+                c.number_format,
+            )))
+    return "\n".join(lines) + "\n"
+
+def dumpText(path: str) -> str:
+    with open(path, 'r', encoding='UTF-8') as file:
+        return GENERATED.sub("GENERATED", file.read())
+
+def dumpReports(paths: Dict[str, str]) -> Dict[str, str]:
+    '''report -> canonical text'''
+    return {
+        report: dumpText(path) if path.endswith(".txt") else dumpWorkbook(path)
+        for report, path in paths.items()
+    }
+
+def digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def checkGolden(fixtures: str, update: bool, workers: int) -> bool:
+    '''
+    Writes the reports of the golden fixture and compares them
+    with golden.json (or replaces golden.json when update is set).
+    Canonical dumps of mismatched reports are kept for diffing.
+
+    Returns
+    -------
+        True if every report matches
+    '''
+    root = fixture(fixtures, GOLDEN_SIZE)
+    OUTPUT = os.path.join(fixtures, "golden_reports")
+    os.makedirs(OUTPUT, exist_ok=True)
+
+    dumps = dumpReports(runReports(root, OUTPUT, Timer(), workers))
+    digests = {report: digest(text) for report, text in dumps.items()}
+
+    if update:
+        with open(GOLDEN_FILE, 'w') as file:
+            json.dump({"people": GOLDEN_SIZE, "reports": digests}, file, indent=4)
+            file.write("\n")
+        print(f"Updated {GOLDEN_FILE}")
+        return True
+
+    try:
+        with open(GOLDEN_FILE, 'r') as file:
+            golden = json.load(file)["reports"]
+    except FileNotFoundError:
+        print(f"No {GOLDEN_FILE}, run with --update-golden first")
+        return False
+
+    matched = True
+    for report, value in digests.items():
+        if golden.get(report) == value:
+            print(f"MATCH: {report} report")
+            continue
+        matched = False
+        path = os.path.join(OUTPUT, f"{report}.dump.txt")
+        with open(path, 'w', encoding='UTF-8') as file:
+            file.write(dumps[report])
+        print(f"MISMATCH: {report} report differs from golden, canonical dump in {path}")
+    return matched
+
+def benchmark(fixtures: str, sizes: List[int], workers: int, repeat: int) -> List[Tuple[int, Dict[str, float]]]:
+    '''Best of repeat timings of each stage, per size'''
+    results = []
+    for people in sizes:
+        root = fixture(fixtures, people)
+        best: Dict[str, float] = {}
+        for _ in range(repeat):
+            timer = Timer()
+            with tempfile.TemporaryDirectory() as OUTPUT:
+                start = time.perf_counter()
+                runReports(root, OUTPUT, timer, workers)
+                timer.stages["total"] = time.perf_counter() - start
+            for stage, seconds in timer.stages.items():
+                best[stage] = min(seconds, best.get(stage, seconds))
+        results.append((people, best))
+        printResults(results[-1:])
+    return results
+
+def printResults(results: List[Tuple[int, Dict[str, float]]]) -> None:
+    for people, stages in results:
+        print(f"\n{people} people")
+        for stage, seconds in stages.items():
+            print(f"  {stage:<16}{seconds:>10.3f} s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Time each stage of the report pipeline on synthetic time forecasts and check the reports against golden.json')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='Team sizes to time (default: 50 500 5000)')
+    parser.add_argument('--fixtures', default=DEFAULT_FIXTURES, help='Directory where generated time forecasts are kept between runs')
+    parser.add_argument('--workers', type=int, default=1, help='Number of processes used to read time forecast sheets (default: 1)')
+    parser.add_argument('--repeat', type=int, default=1, help='Runs per size, the fastest of which is reported (default: 1)')
+    parser.add_argument('--results', help='Also write the timings to this JSON file')
+    parser.add_argument('--golden-only', action='store_true', help='Only check the reports against golden.json')
+    parser.add_argument('--update-golden', action='store_true', help='Write the current reports to golden.json instead of checking them')
+    args = parser.parse_args()
+
+    print("Checking reports against golden.json...")
+    matched = checkGolden(args.fixtures, args.update_golden, args.workers)
+    if args.golden_only:
+        sys.exit(0 if matched else 1)
+
+    results = benchmark(args.fixtures, args.sizes, args.workers, args.repeat)
+
+    if args.results:
+        with open(args.results, 'w') as file:
+            json.dump({
+                "time": dt.datetime.now().isoformat(timespec="seconds"),
+                "workers": args.workers,
+                "golden": matched,
+                "sizes": {str(people): stages for people, stages in results},
+            }, file, indent=4)
+        print(f"\nWrote {args.results}")
+
+    sys.exit(0 if matched else 1)
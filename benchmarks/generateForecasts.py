@@ -0,0 +1,204 @@
+'''
+Writes a synthetic time forecast directory for
+benchmarking: one Plan-template sheet per person,
+with a matching ContractList.xlsx and
+TeamMembersList.xlsx. Every value is drawn from a
+seeded random generator, so the same arguments
+always write the same forecasts.
+
+    python generateForecasts.py <directory> <people>
+'''
+import os
+import sys
+import random
+import datetime
+import argparse
+from typing import List
+
+import openpyxl
+
+# the layout is taken from the pipeline, so the
+# sheets always match what excelToDataframe reads
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "stable builds", "Report Pipeline"))
+from fileIO import NAME_CELL, DATE_CELL, WEEK_ROWS, WEEK1_COLUMN_IDX, WEEK2_COLUMN_IDX
+from validationContext import SCHEDULE_CELL, ALT_HOURS_CELLS
+from contractCatalog import OVERHEAD_CONTRACTS
+
+DEFAULT_DATE = datetime.datetime(2024, 1, 29)
+PROGRAM_MANAGERS = ["Alice PM", "Bob PM", "Carol PM", "Dan PM", "Erin PM"]
+DISCIPLINES = ["SE", "IRSP", "SWE", "ME", "EE", "SRS"]
+MILESTONES = [None, None, "finish ECO", "N/A", "support whatever pops up", "design review"]
+HOURS = [None, None, None, 1, 2, 4, 8, 1.5, 0.5]
+
+def writeContractList(path: str, contracts: List[str], rnd: random.Random) -> None:
+    '''ContractList.xlsx: contract, description and manager, with the managers listed in column E from row 3'''
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Sheet1"
+    ws.append(["Contract", "Description", "Program Manager", None, "Program Managers"])
+    for contract in contracts:
+        ws.append([contract, f"Program {contract}", rnd.choice(PROGRAM_MANAGERS)])
+    for idx, manager in enumerate(PROGRAM_MANAGERS, start=3):
+        ws.cell(idx, 5, manager)
+    wb.save(path)
+
+def writeTeamList(path: str, names: List[str]) -> None:
+    '''TeamMembersList.xlsx: name, discipline, discipline list and manager'''
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Sheet1"
+    ws.append(["Name", "Group", "Group List", "Manager"])
+    for idx, name in enumerate(names):
+        ws.append([
+            name,
+            DISCIPLINES[idx % len(DISCIPLINES)],
+            DISCIPLINES[idx] if idx < len(DISCIPLINES) else None,
+            "Line Manager"
+        ])
+    wb.save(path)
+
+def writeForecast(
+        path: str,
+        name: str,
+        date: datetime.datetime,
+        contracts: List[str],
+        rnd: random.Random,
+        filler_rows: int
+) -> None:
+    '''
+    One person's time forecast: a Plan sheet with the name,
+    date and both week blocks where excelToDataframe reads
+    them, plus the schedule and alternate hours cells that
+    validation checks
+    '''
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Plan"
+    wb.create_sheet("Instructions")["A1"] = "Fill in the Plan sheet"
+
+    def cell(position, value):
+        # 0-indexed (row, column) as in fileIO
+        ws.cell(position[0] + 1, position[1] + 1, value)
+
+    ws.cell(SCHEDULE_CELL[0], SCHEDULE_CELL[1] + 1, rnd.choice([1, 2]))
+    ws["A1"] = "Engineering Time Forecast"
+    ws["D6"] = "Name:"
+    ws["D7"] = "Week beginning:"
+    cell(NAME_CELL, name)
+    cell(DATE_CELL, date)
+
+    first_row, last_row = WEEK_ROWS
+    # first row of the block holds the column headers
+    # (the Team report reads it, the PM report does not)
+    cell((first_row, WEEK1_COLUMN_IDX[0]), "Contract")
+    cell((first_row, WEEK2_COLUMN_IDX[0]), "Contract")
+
+    # a few project contracts, some overhead, and unallocated
+    # time in the last row of the block
+    mine = rnd.sample(contracts, rnd.randint(1, min(8, len(contracts))))
+    if rnd.random() < 0.05:
+        mine.append("UNLISTED/" + str(rnd.randint(100, 999)))
+    mine += rnd.sample(OVERHEAD_CONTRACTS, rnd.randint(0, 3))
+    rows = list(range(first_row + 1, last_row - 1))[:len(mine)]
+
+    for row, contract in zip(rows, mine):
+        same_in_week2 = rnd.random() > 0.05
+        for week, columns in ((1, WEEK1_COLUMN_IDX), (2, WEEK2_COLUMN_IDX)):
+            if week == 2 and not same_in_week2:
+                continue
+            hours = [rnd.choice(HOURS) for _ in range(5)]
+            total = sum(h or 0 for h in hours)
+            values = [contract] + hours + [total, total / 40] + [rnd.choice(MILESTONES) for _ in range(3)]
+            for column, value in zip(columns, values):
+                cell((row, column), value)
+
+    unallocated = last_row - 1
+    for columns in (WEEK1_COLUMN_IDX, WEEK2_COLUMN_IDX):
+        hours = rnd.choice([0, 0, 4, 8])
+        cell((unallocated, columns[0]), "Unallocated Time")
+        cell((unallocated, columns[6]), hours)
+        cell((unallocated, columns[7]), hours / 40)
+
+    for position in ALT_HOURS_CELLS:
+        ws.cell(position[0], position[1] + 1, rnd.choice([None, 0, 8, 9]))
+
+    # the rest of the template: totals, notes and lookup tables
+    # below the forecast, which readers have to skip over
+    for row in range(last_row + 3, last_row + 3 + filler_rows):
+        ws.cell(row, 1, f"note {row}")
+        ws.cell(row, 3, rnd.random())
+        ws.cell(row, 30, "=SUM(C1:C2)")
+
+    wb.save(path)
+
+def generate(
+        directory: str,
+        people: int,
+        seed: int =0,
+        date: datetime.datetime =DEFAULT_DATE,
+        contracts: int =60,
+        extension: str =".xlsm",
+        filler_rows: int =100
+) -> str:
+    '''
+    Writes ContractList.xlsx, TeamMembersList.xlsx and a
+    TeamMembers directory of time forecasts to directory.
+
+    Params
+    ------
+        directory: where the files are written (created if missing)
+
+        people: number of time forecast sheets
+
+        seed: seed of the random values
+
+        date: week beginning date of the forecasts
+
+        contracts: number of contracts in ContractList.xlsx
+
+        extension: ".xlsm" (read by the tools) or ".xlsx"
+
+        filler_rows: rows of template content below the forecast
+
+    Returns
+    -------
+        path of the TeamMembers directory
+    '''
+    rnd = random.Random(seed)
+    sheets = os.path.join(directory, "TeamMembers")
+    os.makedirs(sheets, exist_ok=True)
+
+    contract_list = [f"{15000 + idx}/{rnd.randint(100, 999)}" for idx in range(contracts)]
+    # a few people on the team list do not hand in a forecast
+    names = [f"Person {idx:05d}" for idx in range(people + max(1, people // 20))]
+
+    writeContractList(os.path.join(directory, "ContractList.xlsx"), contract_list, rnd)
+    writeTeamList(os.path.join(directory, "TeamMembersList.xlsx"), names)
+    for idx, name in enumerate(names[:people]):
+        writeForecast(os.path.join(sheets, name + extension), name, date, contract_list, rnd, filler_rows)
+        if (idx + 1) % 500 == 0:
+            print(f"Wrote {idx + 1} of {people} sheets")
+
+    return sheets
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Write synthetic time forecast sheets, ContractList.xlsx and TeamMembersList.xlsx')
+    parser.add_argument('directory', help='Where to write the files')
+    parser.add_argument('people', type=int, help='Number of time forecast sheets')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the random values (default: 0)')
+    parser.add_argument('--date', default=DEFAULT_DATE.strftime("%m/%d/%Y"), help='Week beginning date (MM/DD/YYYY)')
+    parser.add_argument('--contracts', type=int, default=60, help='Number of contracts (default: 60)')
+    parser.add_argument('--extension', choices=['.xlsm', '.xlsx'], default='.xlsm', help='Extension of the sheets (default: .xlsm)')
+    parser.add_argument('--filler-rows', type=int, default=100, help='Rows of template content below the forecast (default: 100)')
+    args = parser.parse_args()
+
+    generate(
+        args.directory,
+        args.people,
+        args.seed,
+        datetime.datetime.strptime(args.date, "%m/%d/%Y"),
+        args.contracts,
+        args.extension,
+        args.filler_rows
+    )
+    print(f"Wrote {args.people} time forecasts to {args.directory}")
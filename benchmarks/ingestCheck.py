@@ -0,0 +1,139 @@
+'''
+Checks shared ingestion (see ingest.py) with several
+processes against a temporary work directory: that
+exactly one process claims a sheet, also when they
+race to take over an expired lease, that a lease is
+renewed while it is held and only released by its
+holder, and that sheets read by several workers, one
+of them taking over a dead worker's sheet, are read
+back (without unpickling) as excelToDataframe reads
+them and merge into the forecasts retrieveTimeForecasts
+reads.
+
+    python ingestCheck.py                  run every check
+    python ingestCheck.py --processes 8    race more processes
+'''
+import os
+import io
+import sys
+import time
+import argparse
+import tempfile
+import contextlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, List, Optional
+
+import pandas as pd
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCHMARKS, "..", "stable builds", "Report Pipeline"))
+from generateForecasts import generate
+from fileIO import retrieveTimeForecasts, listTimeForecasts, excelToDataframe
+from profiler import Profiler
+import ingest
+
+DEFAULT_PROCESSES = 4
+DEFAULT_PEOPLE = 12
+
+def claimAt(path: str, start: float, lease_seconds: float) -> Optional[str]:
+    '''Waits until start, so every process claims at once, then claims path'''
+    time.sleep(max(0, start - time.time()))
+    return ingest.claimLease(path, lease_seconds)
+
+def race(path: str, processes: int, lease_seconds: float =ingest.LEASE_SECONDS) -> List[Optional[str]]:
+    '''Tokens of processes claiming path at the same time (None for those which lost)'''
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        start = time.time() + 1
+        futures = [pool.submit(claimAt, path, start, lease_seconds) for _ in range(processes)]
+        return [future.result() for future in futures]
+
+def plantDeadLease(path: str) -> None:
+    '''An expired lease, as left by a worker which crashed'''
+    ingest.writeJson(path, {"owner": "crashed-host-1", "token": "crashed", "expires": time.time() - 1})
+
+def checkClaim(directory: str, processes: int) -> bool:
+    '''Only one of several processes claims a free sheet'''
+    tokens = race(os.path.join(directory, "free.lease"), processes)
+    return sum(token is not None for token in tokens) == 1
+
+def checkTakeover(directory: str, processes: int) -> bool:
+    '''Only one of several processes takes over an expired lease, and nothing is left aside'''
+    path = os.path.join(directory, "expired.lease")
+    plantDeadLease(path)
+    tokens = race(path, processes)
+    winner = [token for token in tokens if token is not None]
+    lease = ingest.readJson(path) or {}
+    left = [name for name in os.listdir(directory) if name.startswith("expired.lease.")]
+    return len(winner) == 1 and lease.get("token") == winner[0] and not left
+
+def checkRenewAndRelease(directory: str, processes: int) -> bool:
+    '''A held lease outlives lease_seconds while renewed, and only its holder releases it'''
+    path = os.path.join(directory, "held.lease")
+    token = ingest.claimLease(path, 1)
+    with ingest.keepLease(path, token, 1):
+        time.sleep(2)
+        # the other processes see a live lease
+        held = not any(race(path, processes, 1))
+    ingest.releaseLease(path, "another worker's token")
+    kept = (ingest.readJson(path) or {}).get("token") == token
+    ingest.releaseLease(path, token)
+    return held and kept and not os.path.exists(path)
+
+def checkWorkers(directory: str, processes: int, people: int) -> bool:
+    '''Workers read every sheet of a run, taking over a dead worker's sheet, as one process would'''
+    with contextlib.redirect_stdout(io.StringIO()):
+        sheets = generate(os.path.join(directory, "forecasts"), people)
+    filepaths = listTimeForecasts(sheets)
+    work_dir = os.path.join(directory, "work")
+
+    run_dir = ingest.startRun(work_dir, [os.path.basename(file_path) for file_path in filepaths])
+    plantDeadLease(ingest.leasePath(run_dir, 0))
+    parsed = ingest.runWorkers(run_dir, sheets, processes, lease_seconds=5)
+    results = [ingest.readResult(ingest.resultPath(run_dir, index), file_path) for index, file_path in enumerate(filepaths)]
+    ingest.finishRun(work_dir, run_dir)
+    def sameSheet(result, file_path):
+        df, date, context = excelToDataframe(file_path)
+        return (
+            result[0].equals(df)
+            and result[1] == date
+            and result[2].sheet.equals(context.sheet)
+            and result[2].sheet_exists == context.sheet_exists
+        )
+    frames_match = parsed == len(filepaths) and all(map(sameSheet, results, filepaths))
+
+    # the coordinator's merged forecasts and measured sheets
+    profiler = Profiler()
+    shared, shared_date, shared_contexts = ingest.shareTimeForecasts(sheets, work_dir, processes, profiler=profiler)
+    data, date, contexts = retrieveTimeForecasts(sheets)
+    return (
+        frames_match
+        and shared.equals(data)
+        and shared_date == date
+        and list(shared_contexts) == list(contexts)
+        and sorted(measurement["name"] for measurement in profiler.files) == filepaths
+        and os.listdir(work_dir) == []
+    )
+
+def runCheck(name: str, check: Callable[[], bool]) -> bool:
+    '''Runs a check, printing whether it passed'''
+    passed = check()
+    print(f"{'PASS' if passed else 'FAIL'}: {name}")
+    return passed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Check lease claiming and shared reading of time forecasts with several processes')
+    parser.add_argument('--processes', type=int, default=DEFAULT_PROCESSES, help='Number of processes racing for each lease (default: 4)')
+    parser.add_argument('--people', type=int, default=DEFAULT_PEOPLE, help='Number of time forecast sheets read by the workers (default: 12)')
+    args = parser.parse_args()
+
+    # silence obnoxious false positive warning
+    pd.options.mode.chained_assignment = None
+
+    with tempfile.TemporaryDirectory() as directory:
+        passed = [
+            runCheck("one process claims a free lease", lambda: checkClaim(directory, args.processes)),
+            runCheck("one process takes over an expired lease", lambda: checkTakeover(directory, args.processes)),
+            runCheck("a held lease is renewed and only released by its holder", lambda: checkRenewAndRelease(directory, args.processes)),
+            runCheck("workers read every sheet as retrieveTimeForecasts does", lambda: checkWorkers(directory, args.processes, args.people)),
+        ]
+    sys.exit(0 if all(passed) else 1)
@@ -0,0 +1,229 @@
+'''
+The module provides an on-disk cache of
+parsed time forecast sheets so that sheets
+which have not changed since the last run
+are not read from excel again, and a cache
+of the reference lists (ContractList.xlsx,
+TeamMembersList.xlsx) which reads each list
+once per process and keeps a parsed copy on disk
+'''
+import os
+import pickle
+import hashlib
+from typing import Dict, List, Optional, Tuple, Any
+
+import pandas as pd
+
+from planReader import READER_VERSION
+
+DEFAULT_CACHE_DIRECTORY = os.path.join(os.path.expanduser("~"), ".engineering_planning", "forecast_cache")
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+# share of max_bytes a full cache is trimmed to, so it
+# is not listed again on every write once it is full
+TRIM_FRACTION = 0.75
+DEFAULT_REFERENCE_DIRECTORY = os.path.join(os.path.expanduser("~"), ".engineering_planning", "reference_cache")
+
+class ForecastCache:
+    def __init__(self,
+                 directory: str =DEFAULT_CACHE_DIRECTORY,
+                 layout: Any =None,
+                 max_bytes: int =DEFAULT_MAX_BYTES,
+                 hash_contents: bool =False
+        ):
+        '''
+        Initialize a ForecastCache object.
+
+        Parameters:
+        - directory (str): Where cached forecasts are stored (created if missing).
+        - layout (Any): Sheet layout constants used by the reader. Changing
+          the layout changes every key, so stale entries are never returned.
+        - max_bytes (int): Total size the cache may grow to. Once a write takes
+          it over, the least recently used entries are removed until it is back
+          under TRIM_FRACTION of max_bytes.
+        - hash_contents (bool): Also key entries on a hash of the file contents,
+          for shares where modification times are not reliable.
+        '''
+        self.directory = directory
+        self.layout = repr(layout)
+        self.max_bytes = max_bytes
+        self.hash_contents = hash_contents
+        # running total size of the entries, counted on the first write
+        self._total: Optional[int] = None
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, filepath: str) -> str:
+        '''Fingerprint of a sheet: path, size, mtime, layout, reader version and optionally contents'''
+        stat = os.stat(filepath)
+        fingerprint = hashlib.sha1()
+        for part in (
+            os.path.normcase(os.path.abspath(filepath)),
+            stat.st_size,
+            stat.st_mtime_ns,
+            self.layout,
+            READER_VERSION,
+            pd.__version__
+        ):
+            fingerprint.update(repr(part).encode("utf-8"))
+
+        if self.hash_contents:
+            with open(filepath, 'rb') as file:
+                fingerprint.update(hashlib.sha1(file.read()).digest())
+
+        return fingerprint.hexdigest()
+
+    def _entryPath(self, key: str) -> str:
+        return os.path.join(self.directory, key + ".pkl")
+
+    def has(self, filepath: str) -> bool:
+        '''True if the sheet has a current entry in the cache'''
+        return os.path.exists(self._entryPath(self.key(filepath)))
+
+    def get(self, filepath: str) -> Optional[Tuple[pd.DataFrame, Any]]:
+        '''Returns the cached result for a sheet, or None if it must be read'''
+        entry = self._entryPath(self.key(filepath))
+        try:
+            with open(entry, 'rb') as file:
+                result = pickle.load(file)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # unreadable entry (partial write, pandas upgrade, ...)
+            self._remove(entry)
+            return None
+
+        # bump modification time so eviction is least-recently-used
+        os.utime(entry)
+        return result
+
+    def put(self, filepath: str, result: Tuple[pd.DataFrame, Any]) -> None:
+        '''Stores the result of reading a sheet, trimming the cache if it is over size'''
+        if result is None:
+            return
+
+        if self._total is None:
+            self._total = self._size()
+        entry = self._entryPath(self.key(filepath))
+        try:
+            replaced = os.path.getsize(entry)
+        except OSError:
+            replaced = 0
+        # write to a temporary file first so a concurrent
+        # reader never sees a partially written entry
+        partial = f"{entry}.{os.getpid()}.tmp"
+        with open(partial, 'wb') as file:
+            pickle.dump(result, file, protocol=pickle.HIGHEST_PROTOCOL)
+        size = os.path.getsize(partial)
+        os.replace(partial, entry)
+
+        self._total += size - replaced
+        if self._total > self.max_bytes:
+            self.evict(int(self.max_bytes * TRIM_FRACTION))
+
+    def _entries(self) -> List[Tuple[int, int, str]]:
+        '''(modification time, size, path) of every entry'''
+        entries = []
+        for filename in os.listdir(self.directory):
+            if filename.endswith(".pkl"):
+                entry = os.path.join(self.directory, filename)
+                try:
+                    stat = os.stat(entry)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, entry))
+        return entries
+
+    def _size(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self, max_bytes: Optional[int] =None) -> None:
+        '''Removes least recently used entries until the cache fits in max_bytes (default: self.max_bytes)'''
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries):
+            if total <= max_bytes:
+                break
+            self._remove(entry)
+            total -= size
+        # also corrects the running total for other processes' writes
+        self._total = total
+
+    def _remove(self, entry: str) -> None:
+        try:
+            os.remove(entry)
+        except OSError:
+            pass
+
+class ReferenceCache:
+    def __init__(self, directory: Optional[str] =DEFAULT_REFERENCE_DIRECTORY, hash_contents: bool =False):
+        '''
+        Initialize a ReferenceCache object.
+
+        Parameters:
+        - directory (str): Where parsed lists are stored (created if missing).
+          None keeps them in memory only, for this process.
+        - hash_contents (bool): Also compare file contents when deciding
+          if a parsed list is current, for shares where modification
+          times are not reliable.
+        '''
+        self.directory = directory
+        self.hash_contents = hash_contents
+        # entry name -> (key, parsed list) of lists read by this process
+        self._loaded: Dict[str, Tuple[str, pd.DataFrame]] = {}
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def key(self, filepath: str, *args: Any) -> str:
+        '''Fingerprint of a list: path, size, mtime, read arguments and optionally contents'''
+        stat = os.stat(filepath)
+        fingerprint = hashlib.sha1()
+        for part in (
+            os.path.normcase(os.path.abspath(filepath)),
+            stat.st_size,
+            stat.st_mtime_ns,
+            args,
+            pd.__version__
+        ):
+            fingerprint.update(repr(part).encode("utf-8"))
+
+        if self.hash_contents:
+            with open(filepath, 'rb') as file:
+                fingerprint.update(hashlib.sha1(file.read()).digest())
+
+        return fingerprint.hexdigest()
+
+    def readExcel(self, filepath: str, sheet_name: str, header: Optional[int]) -> pd.DataFrame:
+        '''
+        pd.read_excel(filepath, sheet_name, header=header), from
+        memory or disk while the file is unchanged. Each list has
+        a single entry, replaced whenever the file changes.
+        '''
+        key = self.key(filepath, sheet_name, header)
+        name = hashlib.sha1(repr((os.path.normcase(os.path.abspath(filepath)), sheet_name, header)).encode("utf-8")).hexdigest()
+
+        loaded = self._loaded.get(name)
+        if loaded is not None and loaded[0] == key:
+            return loaded[1].copy()
+
+        frame = None
+        entry = None if self.directory is None else os.path.join(self.directory, name + ".pkl")
+        if entry is not None:
+            try:
+                with open(entry, 'rb') as file:
+                    stored_key, stored = pickle.load(file)
+                if stored_key == key:
+                    frame = stored
+            except Exception:
+                # missing or unreadable entry (partial write, pandas upgrade, ...)
+                pass
+
+        if frame is None:
+            frame = pd.read_excel(filepath, sheet_name, header=header)
+            if entry is not None:
+                partial = f"{entry}.{os.getpid()}.tmp"
+                with open(partial, 'wb') as file:
+                    pickle.dump((key, frame), file, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(partial, entry)
+
+        self._loaded[name] = (key, frame)
+        return frame.copy()
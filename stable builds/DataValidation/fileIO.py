@@ -1,7 +1,11 @@
 import json
+from typing import Optional
 
 import pandas as pd
 
+from cache import ReferenceCache
+from contractCatalog import ContractCatalog
+
 def getDefaultPaths(config_file_path: str):
     try:
         with open(config_file_path, 'r') as file:
@@ -18,23 +22,27 @@ def getDefaultPaths(config_file_path: str):
         print(f"Config file '{config_file_path}' not found.")
         return None
 
-def getContractList(PATH: str) -> pd.DataFrame:
+def readReferenceList(PATH: str, header: Optional[int], cache: ReferenceCache = None) -> pd.DataFrame:
+    '''Sheet1 of a reference list, through the cache if one is given'''
+    if cache is None:
+        return pd.read_excel(PATH, "Sheet1", header=header)
+    return cache.readExcel(PATH, "Sheet1", header)
+
+def getContractCatalog(PATH: str, cache: ReferenceCache = None) -> ContractCatalog:
     print("Reading ContractList.xlsx...")
     try:
-        CONTRACT_LIST = pd.read_excel(PATH, "Sheet1", header=None)
+        contract_sheet = readReferenceList(PATH, None, cache)
     except Exception as e:
         print(e)
-        return pd.DataFrame([])
+        contract_sheet = pd.DataFrame([])
 
-    # create basis for contract info dataframe
-    CONTRACT_LIST = CONTRACT_LIST[[0, 2, 1]][1:]
-    CONTRACT_LIST = CONTRACT_LIST.set_axis(['contract', 'program_mgr', 'desc'], axis='columns')
-    return CONTRACT_LIST
+    # index contract info by contract
+    return ContractCatalog(contract_sheet)
 
-def getTeamList(PATH: str) -> pd.DataFrame:
+def getTeamList(PATH: str, cache: ReferenceCache = None) -> pd.DataFrame:
     print("Reading TeamMembersList.xlsx...")
     try:
-        team_list = pd.read_excel(PATH, "Sheet1", header=0)
+        team_list = readReferenceList(PATH, 0, cache)
     except Exception as e:
         print(e)
         return pd.DataFrame([])
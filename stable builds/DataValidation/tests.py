@@ -7,49 +7,44 @@ import datetime
 from typing import List
 
 import pandas as pd
-import openpyxl
 
-def testContractValidity(series1: pd.DataFrame, contract_list: pd.DataFrame) -> List[str]:
+from validationContext import ValidationContext
+from contractCatalog import ContractCatalog
+from nameIndex import NameIndex
+
+def testContractValidity(series1: pd.Series, catalog: ContractCatalog) -> List[str]:
     '''
-    Get a list of strings from the first pandas Series
-    that are not present in the second pandas Series.
+    Get a list of the contracts in a pandas Series
+    that are not present in ContractList.xlsx.
 
     Parameters
     ----------
-    - series1 (pd.Series): The first pandas Series.
-    - filepath (str): path to contracts list
+    - series1 (pd.Series): The contracts of a sheet.
+    - catalog (ContractCatalog): contracts of ContractList.xlsx
 
     Returns
     -------
-        None
+        contracts not found in the catalog
     '''
 
-    s = list((set(series1) - set(contract_list)))
-    return s
+    return catalog.unknown(series1)
 
-def weekContractsMatch(file_path: str, cn_week1: List) -> List[str]:
-    cn_week2 = pd.read_excel(
-        io=file_path,
-        sheet_name="Plan",
-        header=None,
-        usecols="S",
-        skiprows=range(0, 17),
-        nrows=14,
-        keep_default_na=True,
-        names=["contract"]
-    ).dropna()["contract"]
+def weekContractsMatch(context: ValidationContext, cn_week1: List) -> List[str]:
+    # column S, rows 18-31
+    cn_week2 = context.week2_contracts
 
-    return list((set(cn_week1) - set(cn_week2)))
+    # sorted (as text, so numbers and text mix) so reports do not depend on set order
+    return sorted(set(cn_week1) - set(cn_week2), key=str)
 
 
 
-def isValidName(name: str, valid_names: pd.Series) -> bool:
-    ''''''
-    return valid_names.str.contains(name).any()
+def isValidName(name: str, names: NameIndex) -> bool:
+    '''True if name is in TeamMembersList.xlsx, ignoring case and spacing'''
+    return name in names
 
-def testSheetExistence(wb: openpyxl.Workbook) -> bool:
+def testSheetExistence(context: ValidationContext) -> bool:
     ''''''
-    if 'Plan' in wb.sheetnames:
+    if context.sheet_exists:
         return True
     print('Sheet \"Plan\" does not exist')
     return False
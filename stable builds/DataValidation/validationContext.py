@@ -0,0 +1,105 @@
+'''
+This module provides the validation context of a
+time forecast sheet: the Plan sheet is read once,
+and every check takes the cells and ranges it
+needs from memory instead of reopening the file
+'''
+from typing import Any, Optional
+
+import pandas as pd
+
+from planReader import readPlanSheet, columnIndex
+
+# cells and ranges read by the checks (sheet rows are 1-indexed)
+SCHEDULE_CELL = (2, columnIndex("A"))      # 1 = 9/80, 2 = 40 hr
+NAME_CELL = (6, columnIndex("E"))
+DATE_CELL = (7, columnIndex("E"))
+ALT_HOURS_CELLS = [(39, columnIndex("K")), (39, columnIndex("X"))]
+CONTRACT_ROWS = (18, 31)
+WEEK1_CONTRACT_COLUMN = columnIndex("C")
+WEEK2_CONTRACT_COLUMN = columnIndex("S")
+
+MAX_ROW = max(ALT_HOURS_CELLS)[0]
+COLUMNS = [
+    SCHEDULE_CELL[1],
+    NAME_CELL[1],
+    DATE_CELL[1],
+    WEEK1_CONTRACT_COLUMN,
+    WEEK2_CONTRACT_COLUMN,
+    *(col for _, col in ALT_HOURS_CELLS)
+]
+
+class ValidationContext:
+    def __init__(self, file_path: str, sheet_name: str ="Plan", sheet: Optional[pd.DataFrame] =None):
+        '''
+        Initialize a ValidationContext object.
+
+        Reads the cells of the sheet used by the checks in
+        tests.py in a single pass over the file. If the
+        workbook has no sheet of this name, sheet_exists is
+        False and no cells are available.
+
+        Parameters:
+        - file_path (str): Path to the time forecast workbook.
+        - sheet_name (str): The sheet to validate (default is "Plan").
+        - sheet (pd.DataFrame): The sheet, if it has already been read with
+          readPlanSheet (at least MAX_ROW rows and the COLUMNS and DATE_CELL
+          above); the file is then not opened at all (default is None).
+        '''
+        self.file_path = file_path
+        self.sheet_name = sheet_name
+        if sheet is not None:
+            self.sheet = sheet
+            self.sheet_exists = True
+            return
+        try:
+            self.sheet = readPlanSheet(
+                file_path,
+                MAX_ROW,
+                COLUMNS,
+                [(DATE_CELL[0] - 1, DATE_CELL[1])],
+                sheet_name
+            )
+            self.sheet_exists = True
+        except ValueError:
+            self.sheet = pd.DataFrame()
+            self.sheet_exists = False
+
+    def cell(self, row: int, column: int) -> Any:
+        '''
+        Value of a cell, with the 1-indexed row and 0-indexed
+        column used above. Empty cells are returned as None,
+        as openpyxl does.
+        '''
+        value = self.sheet.iat[row - 1, column]
+        return None if pd.isna(value) else value
+
+    def contracts(self, column: int) -> pd.Series:
+        '''Contracts entered in rows 18-31 of a column, skipping blanks'''
+        first, last = CONTRACT_ROWS
+        return self.sheet.iloc[first - 1:last, column].dropna()
+
+    @property
+    def name(self) -> Any:
+        return self.cell(*NAME_CELL)
+
+    @property
+    def forecast_date(self) -> Any:
+        return self.cell(*DATE_CELL)
+
+    @property
+    def schedule(self) -> Any:
+        return self.cell(*SCHEDULE_CELL)
+
+    @property
+    def alternate_hours(self) -> int:
+        # need to say "or 0" in case the cell is empty
+        return sum(int(self.cell(*cell) or 0) for cell in ALT_HOURS_CELLS)
+
+    @property
+    def week1_contracts(self) -> pd.Series:
+        return self.contracts(WEEK1_CONTRACT_COLUMN)
+
+    @property
+    def week2_contracts(self) -> pd.Series:
+        return self.contracts(WEEK2_CONTRACT_COLUMN)
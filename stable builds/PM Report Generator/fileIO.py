@@ -5,15 +5,62 @@ and writing those dataframes back to excel
 '''
 import os
 import sys
-import warnings
 import datetime
-from typing import List, Tuple
+from typing import List, Optional, Tuple, Iterable, Iterator
 import json
+import functools
+from concurrent.futures import ProcessPoolExecutor
 
 import pandas as pd
 import openpyxl
 from openpyxl.utils.dataframe import dataframe_to_rows
 
+from cache import ForecastCache, ReferenceCache
+from profiler import Profiler, timeParse
+from planReader import readPlanSheet
+from manipulate import applySchema
+import styles
+from styles import registerStyles
+
+# Layout of the "Plan" sheet in the time forecast template,
+# as 0-indexed (row, column) positions (see planReader.readPlanSheet).
+# These are part of every cache key (see FORECAST_LAYOUT), so cached
+# forecasts are re-read whenever the template layout changes here.
+NAME_CELL = (5, 4)
+DATE_CELL = (6, 4)
+WEEK_ROWS = (17, 38)
+WEEK1_COLUMN_IDX = [2, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15]
+WEEK2_COLUMN_IDX = [18, 19, 20, 21, 22, 23, 24, 25, 26, 27, 28]
+COLUMN_NAMES = [
+    "contract", 
+    "monday", 
+    "tuesday", 
+    "wednesday", 
+    "thursday", 
+    "friday", 
+    "roll_up_hours", 
+    "roll_up_percent", 
+    "milestone1", 
+    "milestone2", 
+    "milestone3"
+]
+# column position the name is inserted at
+NAME_POSITION = 1
+
+FORECAST_LAYOUT = (
+    NAME_CELL,
+    DATE_CELL,
+    WEEK_ROWS,
+    WEEK1_COLUMN_IDX,
+    WEEK2_COLUMN_IDX,
+    COLUMN_NAMES,
+    NAME_POSITION,
+)
+
+# only these rows and columns of the sheet are read
+PLAN_ROWS = max(WEEK_ROWS[1], NAME_CELL[0] + 1, DATE_CELL[0] + 1)
+PLAN_COLUMNS = [NAME_CELL[1], DATE_CELL[1]] + WEEK1_COLUMN_IDX + WEEK2_COLUMN_IDX
+
 def excelToDataframe(filepath: str) -> Tuple[pd.DataFrame, datetime.date]:
     '''
     Reads time forecast formatted excel file 
@@ -47,47 +94,29 @@ def excelToDataframe(filepath: str) -> Tuple[pd.DataFrame, datetime.date]:
 
     # Check if the file is a valid Excel file
     try:
-        with warnings.catch_warnings():
-            print(f"Loading {filepath}")
-            warnings.filterwarnings("ignore", category=UserWarning)
-            df = pd.read_excel(filepath, "Plan", header=None)
+        print(f"Loading {filepath}")
+        df = readPlanSheet(filepath, PLAN_ROWS, PLAN_COLUMNS, [DATE_CELL])
     except Exception as e:
         print(e)
         return
     
-    DATE = df.iloc[6,4].date()
+    DATE = df.iloc[DATE_CELL].date()
 
     # Extract name from the DataFrame
-    name = df.iloc[5,4]
+    name = df.iloc[NAME_CELL]
 
     # Using iloc for integer-location based indexing
-    week1_column_idx = [2, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15]
-    week2_column_idx = [18, 19, 20, 21, 22, 23, 24, 25, 26, 27, 28]
-    week1 = df.iloc[17:38, week1_column_idx].dropna(how='all', axis=0)
-    week2 = df.iloc[17:38, week2_column_idx].dropna(how='all', axis=0)
-
-    # Define column names
-    column_names = [
-        "contract", 
-        "monday", 
-        "tuesday", 
-        "wednesday", 
-        "thursday", 
-        "friday", 
-        "roll_up_hours", 
-        "roll_up_percent", 
-        "milestone1", 
-        "milestone2", 
-        "milestone3"
-    ]
-
-    week1.columns = column_names
-    week2.columns = column_names
+    first_row, last_row = WEEK_ROWS
+    week1 = df.iloc[first_row:last_row, WEEK1_COLUMN_IDX].dropna(how='all', axis=0)
+    week2 = df.iloc[first_row:last_row, WEEK2_COLUMN_IDX].dropna(how='all', axis=0)
+
+    week1.columns = COLUMN_NAMES
+    week2.columns = COLUMN_NAMES
 
     # Add name and week columns
-    week1.insert(1, "name", name)
+    week1.insert(NAME_POSITION, "name", name)
     week1.insert(1, "week", 1)
-    week2.insert(1, "name", name)
+    week2.insert(NAME_POSITION, "name", name)
     week2.insert(1, "week", 2)
 
     # Concatenate DataFrames
@@ -95,7 +124,7 @@ def excelToDataframe(filepath: str) -> Tuple[pd.DataFrame, datetime.date]:
 
     return data, DATE
 
-def retrieveTimeForecasts(path: str) -> Tuple[pd.DataFrame, datetime.date]:
+def retrieveTimeForecasts(path: str, workers: int = 1, cache: ForecastCache = None, profiler: Profiler = None) -> Tuple[pd.DataFrame, datetime.date]:
     '''
     Returns a pandas dataframe containing all 
     the time report information by contract.
@@ -105,6 +134,16 @@ def retrieveTimeForecasts(path: str) -> Tuple[pd.DataFrame, datetime.date]:
         path: path to a directory containing excel 
         sheets with bi-weekly time forecasts
 
+        workers: number of processes used to read
+        the sheets (1 -> read one after another).
+        Sheets are always combined in filename order
+
+        cache: if given, sheets unchanged since they were
+        last read are taken from the cache instead
+
+        profiler: if given and enabled, each sheet parsed
+        is measured (see profiler.timeParse)
+
     Returns
     -------
         DATE: week beginning date from sheet
@@ -131,26 +170,126 @@ def retrieveTimeForecasts(path: str) -> Tuple[pd.DataFrame, datetime.date]:
         print("Invalid time forcast directory path.")
         sys.exit()
 
-    # Initialize an empty DataFrame to store the combined data
-    data = pd.DataFrame()
+    return combineTimeForecasts(iterTimeForecasts(path, workers, cache, profiler))
+
+def iterTimeForecasts(path: str, workers: int = 1, cache: ForecastCache = None, profiler: Profiler = None) -> Iterator[Tuple[pd.DataFrame, datetime.date]]:
+    '''
+    Yields the time forecast of each sheet in a
+    directory, one person at a time, in filename order.
+    Sheets which cannot be read are reported and skipped.
+
+    Params
+    ------
+        path: path to a directory containing excel 
+        sheets with bi-weekly time forecasts
+
+        workers: number of processes used to read
+        the sheets (1 -> read one after another)
+
+        cache: if given, sheets unchanged since they were
+        last read are taken from the cache instead
+
+        profiler: if given and enabled, each sheet parsed
+        is measured (see profiler.timeParse)
+
+    Yields
+    ------
+        forecast: dataframe of a single sheet 
+        (see excelToDataframe)
+        date: week beginning date from sheet
+    '''
+    filepaths = listTimeForecasts(path)
+
+    unread = filepaths
+    if cache is not None:
+        unread = [file_path for file_path in filepaths if not cache.has(file_path)]
+        print(f"Using cached data for {len(filepaths) - len(unread)} of {len(filepaths)} sheets")
+
+    parse = excelToDataframe
+    profiling = profiler is not None and profiler.enabled
+    if profiling:
+        # measured where the sheet is parsed, which
+        # may be one of the pool's processes
+        parse = functools.partial(timeParse, excelToDataframe)
+
+    # Convert each Excel file to dataframe, spreading
+    # the files across a pool of processes if requested.
+    # map() hands results back in submission order, so
+    # the output does not depend on which sheet
+    # finishes loading first
+    pool = None
+    if workers > 1 and len(unread) > 1:
+        pool = ProcessPoolExecutor(max_workers=min(workers, len(unread)))
+        parsed = pool.map(parse, unread)
+    else:
+        parsed = map(parse, unread)
+    # unread is in filename order too, so the next
+    # parsed sheet is always the next unread one
+    parsed = zip(unread, parsed)
+
+    try:
+        pending = next(parsed, None)
+        for file_path in filepaths:
+            if pending is not None and pending[0] == file_path:
+                result = pending[1]
+                pending = next(parsed, None)
+                if profiling:
+                    result, measurement = result
+                    profiler.addFile(measurement)
+                if cache is not None:
+                    cache.put(file_path, result)
+            else:
+                result = cache.get(file_path)
+                if result is None:
+                    # evicted since it was checked
+                    result = excelToDataframe(file_path)
+
+            if result is None:
+                print(f"Skipping {file_path}")
+                continue
+            yield result
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+def combineTimeForecasts(forecasts: Iterable[Tuple[pd.DataFrame, datetime.date]]) -> Tuple[pd.DataFrame, datetime.date]:
+    '''
+    Combines the time forecasts from iterTimeForecasts
+    into a single dataframe, copying each forecast
+    once rather than once per sheet that follows it.
 
-    # Iterate through all sheets in the directory, 
-    # appending data to dataframe
-    for filename in os.listdir(path):
+    Returns
+    -------
+        data: all forecasts, in the order given,
+        typed by manipulate.applySchema
+        date: week beginning date from the last sheet
+    '''
+    frames = []
+    date = None
+    for forecast, date in forecasts:
+        frames.append(forecast)
+
+    if not frames:
+        return pd.DataFrame(), date
+
+    return applySchema(pd.concat(frames, ignore_index=True)), date
+
+def listTimeForecasts(path: str) -> List[str]:
+    '''
+    Returns the paths of all time forecast sheets
+    in a directory, sorted by filename. Temporary
+    files left open by Excel (~$...) are skipped.
+    '''
+    filepaths = []
+    for filename in sorted(os.listdir(path)):
         if filename.endswith(".xlsm"):
             if (filename.startswith('~')):
                 print(f"Ignoring temporary file: {filename}")
                 continue
             # Construct the full file path
-            file_path = os.path.join(path, filename)
+            filepaths.append(os.path.join(path, filename))
 
-            # Convert each Excel file to dataframe 
-            forecast, date = excelToDataframe(file_path)
-
-            # Concatenate the result to the data DataFrame
-            data = pd.concat([data, forecast], ignore_index=True)
-
-    return data, date
+    return filepaths
 
 def printHeader(
         ws: openpyxl.worksheet.worksheet.Worksheet,
@@ -167,18 +306,9 @@ def printHeader(
         (placement will always begin from the first column)
         header: list of strings to print
     '''
+    registerStyles(ws.parent)
     for idx, item in enumerate(header):
-        ws.cell(column=idx + 1, row=row, value=item)
-        ws.cell(column=idx + 1, row=row).font = openpyxl.styles.Font(bold=True)
-
-blue_fill = openpyxl.styles.PatternFill('solid', fgColor="daeef3")
-style = openpyxl.styles.Side(border_style="hair")
-border_style = openpyxl.styles.borders.Border(
-    left=style, 
-    right=style, 
-    top=style, 
-    bottom=style,
-)
+        ws.cell(column=idx + 1, row=row, value=item).style = styles.HEADER
 
 def dataframeToExcel(df: pd.DataFrame,
                      ws: openpyxl.worksheet,
@@ -209,13 +339,13 @@ def dataframeToExcel(df: pd.DataFrame,
     '''
     rows = dataframe_to_rows(df, header=header, index=index)
 
+    registerStyles(ws.parent)
+    style = styles.WEEK1 if color else styles.BODY
     for r_idx, row in enumerate(rows, startrow):
         for c_idx, value in enumerate(row, startcol):
             cell = ws.cell(row=r_idx, column=c_idx)
             cell.value = value
-            if (color):
-                cell.fill = blue_fill
-            cell.border = border_style  # must be after color
+            cell.style = style
 
 def getDefaultPaths(config_file_path: str):
     try:
@@ -233,10 +363,16 @@ def getDefaultPaths(config_file_path: str):
         print(f"Config file '{config_file_path}' not found.")
         return None
 
-def getTeamList(PATH: str) -> pd.DataFrame:
+def readReferenceList(PATH: str, header: Optional[int], cache: ReferenceCache = None) -> pd.DataFrame:
+    '''Sheet1 of a reference list, through the cache if one is given'''
+    if cache is None:
+        return pd.read_excel(PATH, "Sheet1", header=header)
+    return cache.readExcel(PATH, "Sheet1", header)
+
+def getTeamList(PATH: str, cache: ReferenceCache = None) -> pd.DataFrame:
     print("Reading TeamMembersList.xlsx...")
     try:
-        team_list = pd.read_excel(PATH, "Sheet1", header=0)
+        team_list = readReferenceList(PATH, 0, cache)
     except Exception as e:
         print(e)
         return pd.DataFrame([])
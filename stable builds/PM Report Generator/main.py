@@ -1,11 +1,17 @@
-import datetime
+import os
+import argparse
 
-import openpyxl
 import pandas as pd
 import click
 
-from fileIO import retrieveTimeForecasts, printHeader, dataframeToExcel, getDefaultPaths, getTeamList
+from fileIO import FORECAST_LAYOUT, retrieveTimeForecasts, getDefaultPaths, getTeamList, readReferenceList
 from manipulate import filterNaNs
+from workbooks import BACKENDS, resolveBackend, savePlan
+from outputs import FORMATS, missingFormats, writeOutputs
+from pmReport import prepareReport, planReport
+from contractCatalog import ContractCatalog
+from cache import ForecastCache, ReferenceCache, DEFAULT_CACHE_DIRECTORY, DEFAULT_REFERENCE_DIRECTORY
+from profiler import Profiler, DEFAULT_TOP_FILES
 
 # silence obnoxious false positive warning
 # default='warn'
@@ -28,7 +34,32 @@ if __name__ == "__main__":
     #                 to excel
     #
     #   5. Format excel sheet
+    #
+    # Steps 4 and 5 are planned in full (pmReport.py)
+    # before the plan is written to excel (workbooks.py),
+    # or to CSV, Parquet or HTML with --formats (outputs.py)
     
+    # Parse command-line arguments
+    parser = argparse.ArgumentParser(description='Compile time forecast excel sheets into a report organized by program manager')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Number of processes used to read time forecast sheets (default: one per CPU)')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIRECTORY, help='Directory where parsed time forecast sheets are cached between runs')
+    parser.add_argument('--cache-mb', type=int, default=256, help='Maximum size of the cache in megabytes')
+    parser.add_argument('--hash', action='store_true', help='Also compare file contents when deciding if a cached sheet or reference list is current')
+    parser.add_argument('--no-cache', action='store_true', help='Read every sheet and reference list from excel, ignoring the caches')
+    parser.add_argument('--formats', nargs='+', choices=FORMATS, default=['xlsx'], help='Formats the report is written in, from a single render (default: xlsx)')
+    parser.add_argument('--backend', choices=BACKENDS, default='auto', help='Library the xlsx report is written with: xlsxwriter streams rows in constant memory, openpyxl builds the sheet in memory (default: xlsxwriter if installed)')
+    parser.add_argument('--profile', action='store_true', help='Measure the time and memory of each stage and sheet, written to a .profile.json file next to the report (runs slower)')
+    parser.add_argument('--profile-top', type=int, default=DEFAULT_TOP_FILES, help='Number of slowest sheets listed in the profile (default: 10)')
+    args = parser.parse_args()
+    missing = missingFormats(args.formats)
+    if missing:
+        parser.error(f"{', '.join(missing)} output needs pyarrow (pip install pyarrow)")
+    try:
+        resolveBackend(args.backend)
+    except ValueError as e:
+        parser.error(str(e))
+    profiler = Profiler(args.profile, args.profile_top)
+
     DEFAULTS = r"Q:\EngineeringPlanning\ReportTools\defaults\config.json"
     print(f"Fetching defaults from: {DEFAULTS}")
     tf, out, cn, tl = getDefaultPaths(DEFAULTS)
@@ -46,204 +77,44 @@ if __name__ == "__main__":
     CN_LIST_PATH = cn
     TEAM_LIST_PATH = tl
 
-    forecasts, DATE = retrieveTimeForecasts(SHEETS)
-    forecasts = filterNaNs(forecasts)
-
-    print("Reading ContractList.xlsx...")
-    try:
-        contract_list = pd.read_excel(CN_LIST_PATH, "Sheet1", header=None)
-    except Exception as e:
-        print(e)
-
-    # create list of program managers from ContractsList sheet
-    print("Fetching a list of active program managers...")
-    program_mgr_list = contract_list[[4]][2:]
-    program_mgr_list.columns = ["program_mgr"]
-    program_mgr_list.dropna(inplace=True)
-
-    # create basis for contract info dataframe
-    contract_list = contract_list[[0, 2, 1]][1:]
-    contract_list = contract_list.set_axis(['contract', 'program_mgr', 'desc'], axis='columns')
-
-
-    # merge associated program mgr labels to contracts and sort
-    print("Matching managers to contracts...")
-    contracts_with_pm = pd.merge(
-        forecasts,
-        contract_list[['contract', 'program_mgr']],
-        on="contract", how='left'
-    )
-    contracts_with_pm = contracts_with_pm.sort_values(["contract", "week", "name"])
-    
-    # replace NaNs with "none" for grouping. (np.NaN cannot be passed as key to get_group)
-    values = {"program_mgr":"none", "contract":"none"}
-    contracts_with_pm.fillna(value=values, inplace=True)
-
-    # create an ordered list of PMs based on their order in ContractsList.xlsx
-    mgr_order = program_mgr_list['program_mgr'].tolist()
-    # used to aggregates NaNs last in print out (np.NaN cannot be passed as key to get_group)
-    mgr_order.append("none")
-
-    # see which PMs and contracts are present for this 2 week period
-    active_mgrs = contracts_with_pm["program_mgr"].unique()
-
-    # split data by PM
-    mgr_groups = contracts_with_pm.groupby(["program_mgr"])
-
-
-
-
-    wb = openpyxl.Workbook()
-    ws = wb.create_sheet("Report", 0) # insert at first position
-
-    # tracks current row being printed to excel sheet
-    curr_row = 1
-    printHeader(
-        ws,
-        curr_row,
-        [f"REPORT FOR WEEK BEGINNING: {str(DATE)}, "
-         f"GENERATED: {datetime.datetime.now()}"]
-    )
-    curr_row += 1
-
-    H = ["Contract",
-        "Week",
-        "Name",
-        "M", "T", "W", "R", "F",
-        "Hours",
-        "%",
-        "Milestone 1", "Milestone 2","Milestone 3"]
-
-    printHeader(ws, curr_row, H)
-    curr_row += 1
-
-    num_active_managers = 0 # flag to avoid printing header twice
-    # only print header again if there is > 1 mgr active
-    for i, mgr in enumerate(mgr_order):
-        # if manager in data, fetch their associated contracts
-        if mgr in active_mgrs:
-            group = mgr_groups.get_group((mgr))
-            group.drop(columns=['program_mgr'], inplace=True)
-            print(f"Writing report for {mgr}...")
-            num_active_managers += 1
-        else:
-            continue
-
-        if num_active_managers > 1:
-            printHeader(ws, curr_row, H)
-            curr_row += 1
-            
-        # get contracts present in this mgrs data
-        contracts = group["contract"].unique()
-        contract_groups = group.groupby(["contract", "week"])
-
-        for contract in contracts:
-            # track first row index for use vertically appending later
-            FIRST_ROW = curr_row
-
-            contract_info = contract_list[contract_list["contract"] == contract]
-            if (contract not in contract_list.contract.values): # create new info so the weeks will have a CN label
-                contract_info = pd.DataFrame({'contract':[contract]})
-                if (contract not in ["Sustaining", "ENG_OH", "IRC_OH", "STE_OH", "BP", "PTO", "HOLIDAY"]):
-                    name = {contract_groups.get_group((contract, 1)).name.values[0]}
-                    print(f"Contract \"{contract}\" was referenced by {name}, but not found in ContractList.xlsx")
-            dataframeToExcel(contract_info, ws, False, False, False, curr_row, 1)
-            curr_row += 1
-
-            week1 = contract_groups.get_group((contract, 1))
-            week2 = contract_groups.get_group((contract, 2))
-
-            dataframeToExcel(week1, ws, False, False, True, curr_row, 1)  
-            curr_row += len(week1.index)
-            week1_length = len(week1.index)
-
-            dataframeToExcel(week2, ws, False, False, False, curr_row, 1)
-            curr_row += len(week2.index) + 1
-            week2_length = len(week2.index)
-
-            # track last row index for use merging later
-            last_row = curr_row - 2
-
-            # merge contract cells
-            ws.merge_cells(
-                start_row=FIRST_ROW,
-                start_column=1,
-                end_row=FIRST_ROW + week1_length + week2_length,
-                end_column=1
-            )
-
-            # merge week number cells
-            ws.merge_cells(
-                start_row=FIRST_ROW + 1,
-                start_column=2, 
-                end_row=FIRST_ROW + week1_length, 
-                end_column=2
-            )
-            start_week2 = FIRST_ROW + week1_length + 1
-
-            ws.merge_cells(
-                start_row=start_week2, 
-                start_column=2, 
-                end_row=start_week2 + week2_length - 1,
-                end_column=2
-            )
-
-    print("Formatting...")
-    # [1:] is to avoid centering report date
-    # in first cell
-    for cell in ws['A'][1:]:
-        cell.alignment = openpyxl.styles.Alignment(
-            horizontal='center',
-            vertical='center'
-        )
-
-    for cell in ws['B']:
-        cell.alignment = openpyxl.styles.Alignment(
-            horizontal='center',
-            vertical='center'
-        )
-
-    WEEKDAY_WIDTH = 5
-    ws.column_dimensions['A'].width = 11  # contract
-    ws.column_dimensions['B'].width = 6  # week
-    ws.column_dimensions['C'].width = 19  # name
-    ws.column_dimensions['D'].width = WEEKDAY_WIDTH  # m
-    ws.column_dimensions['E'].width = WEEKDAY_WIDTH  # t
-    ws.column_dimensions['F'].width = WEEKDAY_WIDTH  # w
-    ws.column_dimensions['G'].width = WEEKDAY_WIDTH  # r
-    ws.column_dimensions['H'].width = WEEKDAY_WIDTH  # f
-    ws.column_dimensions['I'].width = 6  # hours
-    ws.column_dimensions['J'].width = WEEKDAY_WIDTH + .5  # %
-    ws.column_dimensions['K'].width = 13  # milestone 1
-    ws.column_dimensions['L'].width = 13  # milestone 2
-    ws.column_dimensions['M'].width = 13  # milestone 3
-
-    # style weekday and hours columns
-    for row in ws.iter_rows(min_row=1, min_col=4, max_col=9):
-        for cell in row:
-            cell.number_format = "0.0"
-    # style % column
-    for row in ws.iter_rows(min_row=1, min_col=10, max_col=10):
-        for cell in row:
-            cell.number_format = "0%"
-
-    printHeader(ws, curr_row, ["Team Members Reported:"])
-    curr_row += 1
-    unique_names = sorted(forecasts["name"].unique())
-    for name in unique_names:
-        printHeader(ws, curr_row, [name])
-        curr_row += 1
-
-    curr_row += 1
-    printHeader(ws, curr_row, ["Members Missing:"])
-    curr_row += 1
-    team_list = getTeamList(TEAM_LIST_PATH)
-    for n in team_list["name"][~team_list["name"].str.lower().isin(list(name.lower() for name in unique_names))].tolist():
-        printHeader(ws, curr_row, [n])
-        curr_row += 1
-
-    print("Saving...")
-
-    wb.save(OUTPUT + "/PM_Report_for_" + str(DATE) + ".xlsx")
+    cache = None
+    if not args.no_cache:
+        cache = ForecastCache(args.cache_dir, FORECAST_LAYOUT, args.cache_mb * 1024 * 1024, args.hash)
+
+    reference_cache = ReferenceCache(None if args.no_cache else DEFAULT_REFERENCE_DIRECTORY, args.hash)
+
+    with profiler.stage("ingest"):
+        forecasts, DATE = retrieveTimeForecasts(SHEETS, args.workers, cache, profiler)
+    with profiler.stage("filter"):
+        forecasts = filterNaNs(forecasts)
+
+    with profiler.stage("reference lists"):
+        print("Reading ContractList.xlsx...")
+        try:
+            contract_sheet = readReferenceList(CN_LIST_PATH, None, reference_cache)
+        except Exception as e:
+            print(e)
+            contract_sheet = pd.DataFrame([])
+        # index contract info by contract once for every lookup
+        catalog = ContractCatalog(contract_sheet)
+
+    with profiler.stage("merge"):
+        contracts_with_pm = prepareReport(forecasts, catalog)
+
+    with profiler.stage("reference lists"):
+        team_list = getTeamList(TEAM_LIST_PATH, reference_cache)
+
+    # work out every cell, merge and style of the report
+    # before writing any of it (see pmReport.py)
+    with profiler.stage("render"):
+        plan = planReport(contracts_with_pm, catalog, team_list, DATE)
+
+    BASE = OUTPUT + "/PM_Report_for_" + str(DATE)
+    if "xlsx" in args.formats:
+        savePlan(plan, BASE + ".xlsx", args.backend, profiler)
+
+    # the same plan, written to any other formats asked for
+    writeOutputs(plan, BASE, args.formats, profiler)
+    profiler.write(BASE + "." + args.formats[0])
 
     print("Report compiled successfully!")
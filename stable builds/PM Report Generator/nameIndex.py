@@ -0,0 +1,92 @@
+'''
+Team member names from TeamMembersList.xlsx, indexed
+once so names on the time forecast sheets are matched
+in constant time, ignoring case and spacing, and names
+which are not in the list get close-match suggestions
+'''
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+def normalizeName(name: Any) -> str:
+    '''name compared case-insensitively with single spaces ("" if it is not a string)'''
+    if not isinstance(name, str):
+        return ""
+    return " ".join(name.split()).casefold()
+
+def trigrams(name: str) -> Set[str]:
+    '''3 letter pieces of a normalized name, padded so short names have some'''
+    padded = f"  {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class NameIndex:
+    def __init__(self, names: Iterable[Any]):
+        """
+        Initialize a NameIndex object.
+
+        Parameters:
+        - names (Iterable): The names of TeamMembersList.xlsx, in list order.
+          Blank names are kept for missing lists but never match.
+        """
+        self.names: List[Any] = list(names)
+        self.keys: List[str] = [normalizeName(name) for name in self.names]
+
+        # normalized name -> name as written in the list
+        self.lookup: Dict[str, Any] = {}
+        for key, name in zip(self.keys, self.names):
+            if key:
+                self.lookup.setdefault(key, name)
+
+        # trigram -> normalized names containing it,
+        # only built when a suggestion is first asked for
+        self._grams: Optional[Dict[str, List[str]]] = None
+
+    def __repr__(self):
+        return f"NameIndex(names={len(self.lookup)})"
+
+    def __len__(self) -> int:
+        return len(self.lookup)
+
+    def __contains__(self, name) -> bool:
+        return normalizeName(name) in self.lookup
+
+    def resolve(self, name) -> Any:
+        '''name as written in the list, or None if it is not in the list'''
+        return self.lookup.get(normalizeName(name))
+
+    def suggest(self, name, limit: int =3, cutoff: float =0.5) -> List[Any]:
+        '''
+        Names in the list which are spelled like a name
+
+        Params
+        ------
+            name: name to find close matches of
+
+            limit: most suggestions returned
+
+            cutoff: least share of trigrams a suggestion has in common
+            with name (Dice coefficient, 1 -> same trigrams)
+
+        Returns
+        -------
+            names as written in the list, closest first
+        '''
+        if self._grams is None:
+            self._grams = {}
+            for key in self.lookup:
+                for gram in trigrams(key):
+                    self._grams.setdefault(gram, []).append(key)
+
+        grams = trigrams(normalizeName(name))
+        shared = Counter(key for gram in grams for key in self._grams.get(gram, ()))
+
+        scores = []
+        for key, count in shared.items():
+            score = 2 * count / (len(grams) + len(trigrams(key)))
+            if score >= cutoff:
+                scores.append((-score, key))
+        return [self.lookup[key] for _, key in sorted(scores)[:limit]]
+
+    def missing(self, present: Iterable[Any]) -> List[Any]:
+        '''names in the list, in list order, which do not match any name of present'''
+        absent = set(self.keys) - {normalizeName(name) for name in present}
+        return [name for key, name in zip(self.keys, self.names) if key in absent]
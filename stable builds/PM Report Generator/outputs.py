@@ -0,0 +1,248 @@
+'''
+The module writes render plans (see render.py) to
+formats other than excel, without building a workbook:
+
+    csv      the report's entries, one line per week entry,
+             with the section (PM or discipline) of each
+    parquet  the same table, typed, for analysis tools
+    html     a static page laid out like the excel sheet
+
+A plan is rendered once and may be written to any
+number of formats (see writeOutputs).
+'''
+import os
+import csv
+import html
+import bisect
+import importlib.util
+from typing import Any, Dict, Iterator, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from render import RenderPlan, TITLE, HEADER, INFO, WEEK1, WEEK2, HIGHLIGHT, LIST
+
+FORMATS = ["xlsx", "csv", "parquet", "html"]
+
+# css class of each kind of row (see render.py)
+KIND_CLASSES = {
+    TITLE: "title",
+    HEADER: "header",
+    INFO: "info",
+    WEEK1: "week1",
+    WEEK2: "week2",
+    HIGHLIGHT: "highlight",
+    LIST: "list",
+}
+
+# kinds of the rows holding week entries
+ENTRIES = (WEEK1, WEEK2, HIGHLIGHT)
+
+PAGE_STYLE = """
+body { font-family: Calibri, Arial, sans-serif; font-size: 11pt; }
+table { border-collapse: collapse; table-layout: fixed; }
+td { padding: 1px 4px; white-space: nowrap; overflow: hidden; }
+.title, .header, .list { font-weight: bold; }
+.info, .week1, .week2, .highlight { border: 1px dotted #808080; }
+.week1 { background: #daeef3; }
+.highlight { background: #ffb38a; }
+.center { text-align: center; vertical-align: middle; }
+"""
+
+def missingFormats(formats: Sequence[str]) -> List[str]:
+    '''formats which need a library that is not installed'''
+    missing = []
+    if "parquet" in formats and not any(importlib.util.find_spec(name) for name in ("pyarrow", "fastparquet")):
+        missing.append("parquet")
+    return missing
+
+def planRows(plan: RenderPlan) -> Iterator[Tuple[int, np.ndarray, np.ndarray, np.ndarray]]:
+    '''
+    The planned sheet rows in order, as (row, columns,
+    values, style ids) of the cells planned in each
+    '''
+    rows, cols, values, style_ids = plan.cells()
+    starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]]) if len(rows) else []
+    for start, stop in zip(starts, list(starts[1:]) + [len(rows)]):
+        yield int(rows[start]), cols[start:stop], values[start:stop], style_ids[start:stop]
+
+def entryHeader(plan: RenderPlan) -> List[str]:
+    '''column names of the entry table: section, then the report's first header row'''
+    names = [f"column {col}" for col in range(1, len(plan.columns) + 1)]
+    for _, cols, values, style_ids in planRows(plan):
+        if (plan.kinds(style_ids) == HEADER).all():
+            for col, value in zip(cols.tolist(), values.tolist()):
+                if 0 < col <= len(names) and value is not None:
+                    names[col - 1] = str(value)
+            break
+    return ["section"] + names
+
+def entryRows(plan: RenderPlan) -> Iterator[List[Any]]:
+    '''
+    Week entries of the report in printed order, each
+    as its section followed by one value per column
+    '''
+    section_rows = [row for row, _ in plan.sections]
+    labels = [label for _, label in plan.sections]
+    for row, cols, values, style_ids in planRows(plan):
+        if not np.isin(plan.kinds(style_ids), ENTRIES).any():
+            continue
+        entry = [None] * len(plan.columns)
+        for col, value in zip(cols.tolist(), values.tolist()):
+            if 0 < col <= len(entry):
+                entry[col - 1] = value
+        section = bisect.bisect_right(section_rows, row) - 1
+        yield [labels[section] if section >= 0 else None] + entry
+
+def writeCsv(plan: RenderPlan, path: str) -> str:
+    '''Writes the week entries of a plan to a CSV file, one line at a time'''
+    with open(path, 'w', newline='', encoding='UTF-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(entryHeader(plan))
+        for entry in entryRows(plan):
+            writer.writerow(entry)
+    return path
+
+def uniformColumn(column: pd.Series) -> pd.Series:
+    '''A column as numbers if every value is one, else as text, so it has one type'''
+    numbers = pd.to_numeric(column, errors='coerce')
+    if numbers.notna().sum() == column.notna().sum():
+        return numbers
+    return column.map(lambda value: None if value is None else str(value))
+
+def writeParquet(plan: RenderPlan, path: str) -> str:
+    '''Writes the week entries of a plan to a Parquet file'''
+    table = pd.DataFrame(list(entryRows(plan)), columns=entryHeader(plan), dtype=object)
+    table = table.apply(uniformColumn)
+    table.to_parquet(path, index=False)
+    return path
+
+def formatValue(value: Any, number_format: str) -> str:
+    '''value as excel would show it in a cell of this number format'''
+    if value is None:
+        return ""
+    if isinstance(value, (int, float, np.number)) and not isinstance(value, bool):
+        if number_format == "0.0":
+            return f"{value:.1f}"
+        if number_format == "0%":
+            return f"{value:.0%}"
+    return html.escape(str(value))
+
+def writeHtml(plan: RenderPlan, path: str, title: str ="") -> str:
+    '''
+    Writes a plan to a static HTML page with the cells,
+    merged ranges, column widths and colours of the
+    excel sheet, and a link to each section of the report
+    '''
+    title = title or os.path.splitext(os.path.basename(path))[0]
+
+    # merged ranges: top left cell -> (rows, columns) spanned,
+    # and the cells hidden under them
+    spans: Dict[Tuple[int, int], Tuple[int, int]] = {}
+    hidden = set()
+    for start_row, start_column, end_row, end_column in plan.merges:
+        spans[(start_row, start_column)] = (end_row - start_row + 1, end_column - start_column + 1)
+        for row in range(start_row, end_row + 1):
+            for col in range(start_column, end_column + 1):
+                if (row, col) != (start_row, start_column):
+                    hidden.add((row, col))
+
+    styles = {}
+    sections = dict(plan.sections)
+    n_cols = len(plan.columns)
+
+    with open(path, 'w', encoding='UTF-8') as file:
+        file.write(f"<!DOCTYPE html>\n<html>\n<head>\n<meta charset=\"utf-8\">\n<title>{html.escape(title)}</title>\n")
+        file.write(f"<style>{PAGE_STYLE}</style>\n</head>\n<body>\n")
+        if plan.sections:
+            file.write("<nav>" + " | ".join(
+                f"<a href=\"#section-{number}\">{html.escape(str(label))}</a>"
+                for number, (_, label) in enumerate(plan.sections, 1)
+            ) + "</nav>\n")
+
+        file.write("<table>\n<colgroup>")
+        for column in plan.columns:
+            file.write(f"<col style=\"width: {column.width}ch\">")
+        file.write("</colgroup>\n<tbody>\n")
+
+        section_numbers = {row: number for number, (row, _) in enumerate(plan.sections, 1)}
+        previous = 0
+        for row, cols, values, style_ids in planRows(plan):
+            # rows left empty in the sheet are kept as spacers
+            for _ in range(previous + 1, row):
+                file.write(f"<tr><td colspan=\"{n_cols}\">&nbsp;</td></tr>\n")
+            previous = row
+
+            if row in sections:
+                file.write(f"</tbody>\n<tbody id=\"section-{section_numbers[row]}\">\n")
+
+            cells = dict(zip(cols.tolist(), zip(values.tolist(), style_ids.tolist())))
+            file.write("<tr>")
+            for col in range(1, max(n_cols, max(cells)) + 1):
+                if (row, col) in hidden:
+                    continue
+                value, style_id = cells.get(col, (None, None))
+                attributes = ""
+                if (row, col) in spans:
+                    rowspan, colspan = spans[(row, col)]
+                    attributes += f" rowspan=\"{rowspan}\"" if rowspan > 1 else ""
+                    attributes += f" colspan=\"{colspan}\"" if colspan > 1 else ""
+                if style_id is None:
+                    file.write(f"<td{attributes}></td>")
+                    continue
+
+                if style_id not in styles:
+                    _, number_format, alignment = plan.style(style_id)
+                    classes = [KIND_CLASSES[int(plan.kinds(np.asarray(style_id)))]]
+                    if alignment is not None and alignment.horizontal == "center":
+                        classes.append("center")
+                    styles[style_id] = (" ".join(classes), number_format)
+                classes, number_format = styles[style_id]
+                # titles and lists run across the empty cells next to them
+                if value is not None and col == 1 and len(cells) == 1 and (row, col) not in spans:
+                    attributes += f" colspan=\"{n_cols}\""
+                    file.write(f"<td class=\"{classes}\"{attributes}>{formatValue(value, number_format)}</td>")
+                    break
+                file.write(f"<td class=\"{classes}\"{attributes}>{formatValue(value, number_format)}</td>")
+            file.write("</tr>\n")
+
+        file.write("</tbody>\n</table>\n</body>\n</html>\n")
+    return path
+
+# format -> function writing a plan to a path
+WRITERS = {
+    "csv": writeCsv,
+    "parquet": writeParquet,
+    "html": writeHtml,
+}
+
+def writeOutputs(plan: RenderPlan, base_path: str, formats: Sequence[str], profiler=None) -> List[str]:
+    '''
+    Writes a plan to every format other than xlsx
+
+    Params
+    ------
+        plan: render plan of the report
+
+        base_path: path of the report without an extension
+
+        formats: any of FORMATS; xlsx is left to the caller
+
+        profiler: if given, each format is timed as its own stage
+
+    Returns
+    -------
+        paths written, in the order of formats
+    '''
+    paths = []
+    for output_format in formats:
+        if output_format not in WRITERS:
+            continue
+        path = f"{base_path}.{output_format}"
+        print(f"Writing {output_format}...")
+        if profiler is None:
+            paths.append(WRITERS[output_format](plan, path))
+        else:
+            with profiler.stage(output_format):
+                paths.append(WRITERS[output_format](plan, path))
+    return paths
@@ -0,0 +1,205 @@
+'''
+This module lays out the PM report as a render
+plan: time forecast entries grouped by program
+manager, then by contract, with the week 1 and
+week 2 entries of each contract listed under it
+'''
+import datetime
+
+import numpy as np
+import pandas as pd
+
+from manipulate import BlockIndex, categorize, addCategory
+from contractCatalog import ContractCatalog
+from nameIndex import NameIndex
+from styles import center
+from render import RenderPlan, ColumnFormat, TITLE, HEADER, INFO, WEEK1, WEEK2, LIST
+
+H = ["Contract",
+    "Week",
+    "Name",
+    "M", "T", "W", "R", "F",
+    "Hours",
+    "%",
+    "Milestone 1", "Milestone 2","Milestone 3"]
+
+WEEKDAY_WIDTH = 5
+COLUMNS = [
+    ColumnFormat(11, center),               # contract
+    ColumnFormat(6, center),                # week
+    ColumnFormat(19),                       # name
+    ColumnFormat(WEEKDAY_WIDTH, None, "0.0"),  # m
+    ColumnFormat(WEEKDAY_WIDTH, None, "0.0"),  # t
+    ColumnFormat(WEEKDAY_WIDTH, None, "0.0"),  # w
+    ColumnFormat(WEEKDAY_WIDTH, None, "0.0"),  # r
+    ColumnFormat(WEEKDAY_WIDTH, None, "0.0"),  # f
+    ColumnFormat(6, None, "0.0"),           # hours
+    ColumnFormat(WEEKDAY_WIDTH + .5, None, "0%"),  # %
+    ColumnFormat(13),                       # milestone 1
+    ColumnFormat(13),                       # milestone 2
+    ColumnFormat(13),                       # milestone 3
+]
+
+def prepareReport(
+        forecasts: pd.DataFrame,
+        catalog: ContractCatalog
+) -> pd.DataFrame:
+    '''
+    Matches filtered forecasts to their program managers.
+
+    Params
+    ------
+        forecasts: filtered forecasts (see filterNaNs)
+
+        catalog: contracts of ContractList.xlsx
+
+    Returns
+    -------
+        contracts_with_pm: see planReport
+    '''
+    # look up the program mgr label of each contract and sort
+    print("Matching managers to contracts...")
+    contracts_with_pm = forecasts.reset_index(drop=True)
+    # (a categorical contract column maps each contract once)
+    contracts_with_pm["program_mgr"] = categorize(contracts_with_pm["contract"].map(catalog.managers))
+    contracts_with_pm = contracts_with_pm.sort_values(["contract", "week", "name"])
+    
+    # replace NaNs with "none" for grouping. (np.NaN cannot be passed as key to get_group)
+    values = {"program_mgr":"none", "contract":"none"}
+    for column, value in values.items():
+        contracts_with_pm[column] = addCategory(contracts_with_pm[column], value)
+    contracts_with_pm.fillna(value=values, inplace=True)
+
+    return contracts_with_pm
+
+def planReport(
+        contracts_with_pm: pd.DataFrame,
+        catalog: ContractCatalog,
+        team_list: pd.DataFrame,
+        DATE: datetime.date
+) -> RenderPlan:
+    '''
+    Lays out the PM report.
+
+    Params
+    ------
+        contracts_with_pm: filtered forecasts with a program_mgr
+        column, sorted by contract, week and name, with missing
+        contracts and managers filled in as "none"
+
+        catalog: contracts of ContractList.xlsx, for the
+        contract info rows and the order managers are printed
+
+        team_list: TeamMembersList.xlsx, for the list
+        of members missing from the report
+
+        DATE: week beginning date of the forecasts
+
+    Returns
+    -------
+        render plan of the report worksheet
+    '''
+    plan = RenderPlan(COLUMNS)
+
+    # see which PMs and contracts are present for this 2 week period
+    active_mgrs = contracts_with_pm["program_mgr"].unique()
+
+    # split data by PM, then by contract and week, so each
+    # printed block is a contiguous slice of one sorted frame
+    blocks = BlockIndex(contracts_with_pm, ["program_mgr", "contract", "week"])
+
+    # managers are printed in their order in ContractsList.xlsx,
+    # with contracts without a manager ("none") last
+    mgr_order = catalog.mgr_order + ["none"]
+
+    # tracks current row being printed to excel sheet
+    curr_row = 1
+    plan.addRows(
+        curr_row,
+        [f"REPORT FOR WEEK BEGINNING: {str(DATE)}, "
+         f"GENERATED: {datetime.datetime.now()}"],
+        TITLE
+    )
+    curr_row += 1
+
+    plan.addRows(curr_row, H, HEADER)
+    curr_row += 1
+
+    # week entries are gathered as positions in blocks.frame
+    # and sheet rows, then planned together at the end
+    frame_rows = []
+    sheet_rows = []
+    kinds = []
+
+    num_active_managers = 0 # flag to avoid printing header twice
+    # only print header again if there is > 1 mgr active
+    for mgr in mgr_order:
+        # if manager in data, fetch their associated contracts
+        if mgr in active_mgrs:
+            print(f"Writing report for {mgr}...")
+            num_active_managers += 1
+        else:
+            continue
+
+        if num_active_managers > 1:
+            plan.addRows(curr_row, H, HEADER)
+            curr_row += 1
+        plan.addSection(curr_row, mgr)
+
+        # get contracts present in this mgrs data
+        for contract in blocks.entities(mgr):
+            # track first row index for use vertically appending later
+            FIRST_ROW = curr_row
+
+            if contract in catalog:
+                contract_info = [contract, *catalog.info[contract]]
+            else: # create new info so the weeks will have a CN label
+                contract_info = [contract]
+                if not catalog.isOverhead(contract):
+                    # first name of week 1, or of week 2 if the contract has no week 1 rows
+                    week = 1 if (mgr, contract, 1) in blocks else 2
+                    name = {blocks.block(mgr, contract, week).name.values[0]}
+                    print(f"Contract \"{contract}\" was referenced by {name}, but not found in ContractList.xlsx")
+            plan.addRows(curr_row, contract_info, INFO)
+            curr_row += 1
+
+            week_lengths = []
+            for week, kind in ((1, WEEK1), (2, WEEK2)):
+                start, stop = blocks.span(mgr, contract, week)
+                frame_rows.append(np.arange(start, stop))
+                sheet_rows.append(np.arange(curr_row, curr_row + stop - start))
+                kinds.append(np.full(stop - start, kind))
+                curr_row += stop - start
+                week_lengths.append(stop - start)
+            curr_row += 1
+            week1_length, week2_length = week_lengths
+
+            # merge contract cells
+            plan.merge(FIRST_ROW, 1, FIRST_ROW + week1_length + week2_length, 1)
+
+            # merge week number cells
+            plan.merge(FIRST_ROW + 1, 2, FIRST_ROW + week1_length, 2)
+            start_week2 = FIRST_ROW + week1_length + 1
+            plan.merge(start_week2, 2, start_week2 + week2_length - 1, 2)
+
+    if frame_rows:
+        entries = blocks.frame.drop(columns=['program_mgr']).to_numpy()
+        plan.addRows(
+            np.concatenate(sheet_rows),
+            entries[np.concatenate(frame_rows)],
+            np.concatenate(kinds)
+        )
+
+    plan.addRows(curr_row, ["Team Members Reported:"], LIST)
+    curr_row += 1
+    unique_names = sorted(contracts_with_pm["name"].unique())
+    plan.addRows(curr_row, np.array(unique_names, dtype=object).reshape(-1, 1), LIST)
+    curr_row += len(unique_names)
+
+    curr_row += 1
+    plan.addRows(curr_row, ["Members Missing:"], LIST)
+    curr_row += 1
+    missing = NameIndex(team_list["name"]).missing(unique_names)
+    plan.addRows(curr_row, np.array(missing, dtype=object).reshape(-1, 1), LIST)
+
+    return plan
@@ -0,0 +1,239 @@
+'''
+The module provides an archive of the filtered
+time forecasts of every period (one per week
+beginning date), and a diff of two archived
+periods which needs no excel sheets at all.
+
+Each period is stored column by column in a
+compressed .npz file, so a diff only decompresses
+the columns it compares. Columns of python objects
+(text, dates, ...) are stored as integer codes into
+a JSON vocabulary, so reading an archive from a
+shared directory never unpickles anything
+'''
+import os
+import json
+import datetime as dt
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from manipulate import WEEKDAYS
+
+ARCHIVE_FILE = "forecasts.npz"
+# entry of an .npz file holding the vocabulary of its object columns
+VOCABULARY_KEY = "_vocabulary"
+
+# an entry is identified by person, contract and week
+KEY_COLUMNS = ["name", "contract", "week"]
+ALLOCATION_COLUMNS = WEEKDAYS + ["roll_up_hours", "roll_up_percent"]
+MILESTONE_COLUMNS = ["milestone1", "milestone2", "milestone3"]
+
+def periodDirectory(directory: str, DATE: dt.date) -> str:
+    '''Partition of the archive holding one period'''
+    return os.path.join(directory, f"period={DATE}")
+
+def entryKeys(forecasts: pd.DataFrame) -> np.ndarray:
+    '''
+    Hashes (name, contract, week) of every entry to a single
+    64-bit key. A person listing the same contract twice in
+    a week gets a distinct key for each row, in sheet order.
+    '''
+    keys = forecasts[KEY_COLUMNS].copy()
+    keys["occurrence"] = keys.groupby(KEY_COLUMNS, dropna=False, sort=False, observed=True).cumcount()
+    return pd.util.hash_pandas_object(keys, index=False).to_numpy()
+
+def savePeriod(forecasts: pd.DataFrame, DATE: dt.date, directory: str) -> str:
+    '''
+    Archives the filtered forecasts of a period (see filterNaNs),
+    replacing any earlier archive of the same period.
+
+    Params
+    ------
+        forecasts: filtered forecasts with at least the KEY_COLUMNS,
+        ALLOCATION_COLUMNS and MILESTONE_COLUMNS
+
+        DATE: week beginning date of the forecasts
+
+        directory: root directory of the archive
+
+    Returns
+    -------
+        path of the archived period
+    '''
+    partition = periodDirectory(directory, DATE)
+    os.makedirs(partition, exist_ok=True)
+
+    columns = {"key": entryKeys(forecasts)}
+    for column in forecasts.columns:
+        columns[column] = forecasts[column].to_numpy()
+
+    path = os.path.join(partition, ARCHIVE_FILE)
+    saveColumns(path, columns)
+    return path
+
+def loadPeriod(directory: str, DATE: dt.date, columns: List[str] =None) -> pd.DataFrame:
+    '''
+    Reads an archived period back, optionally only some columns
+    (the "key" column holds the hashed entry keys)
+    '''
+    path = os.path.join(periodDirectory(directory, DATE), ARCHIVE_FILE)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No archived forecasts for {DATE} in {directory}")
+
+    return loadColumns(path, columns)
+
+def saveColumns(path: str, columns: Dict[str, np.ndarray]) -> None:
+    '''
+    Writes a table column by column to a compressed .npz file.
+    Object columns are written as codes (-1 for missing values)
+    into a vocabulary of their values, kept as JSON (see encodeValue)
+    '''
+    arrays = {}
+    vocabulary = {}
+    for column, values in columns.items():
+        if values.dtype == object:
+            # values are told apart by type too, so 1, 1.0 and True
+            # (equal to pandas) are read back as they were written
+            typed = np.empty(len(values), dtype=object)
+            typed[:] = [None if missing else (type(value), value) for value, missing in zip(values, pd.isna(values))]
+            codes, uniques = pd.factorize(typed)
+            arrays[column] = codes
+            vocabulary[column] = [encodeValue(value) for _, value in uniques]
+        else:
+            arrays[column] = values
+    arrays[VOCABULARY_KEY] = np.array(json.dumps(vocabulary))
+
+    # write to a temporary file first so a reader
+    # never sees a partially written table
+    partial = f"{path}.{os.getpid()}.tmp.npz"
+    np.savez_compressed(partial, **arrays)
+    os.replace(partial, path)
+
+def loadColumns(path: str, columns: List[str] =None) -> pd.DataFrame:
+    '''Reads a table written by saveColumns, optionally only some columns'''
+    with np.load(path, allow_pickle=False) as archived:
+        if VOCABULARY_KEY not in archived.files:
+            raise ValueError(f"{path} was written in an older format which cannot be read safely, archive its period again")
+        vocabulary = json.loads(str(archived[VOCABULARY_KEY]))
+        if columns is None:
+            columns = [column for column in archived.files if column != VOCABULARY_KEY]
+
+        table = {}
+        for column in columns:
+            values = archived[column]
+            if column in vocabulary:
+                # the last value is read for code -1
+                uniques = np.empty(len(vocabulary[column]) + 1, dtype=object)
+                uniques[:-1] = [decodeValue(value) for value in vocabulary[column]]
+                uniques[-1] = np.nan
+                values = uniques[values]
+            table[column] = values
+        return pd.DataFrame(table)
+
+def encodeValue(value: Any) -> Any:
+    '''A value of an object column as JSON: text and numbers as they are, dates and times tagged'''
+    if isinstance(value, (str, bool, int, float)):
+        return value
+    if isinstance(value, np.generic):
+        return value.item()
+    for kind in (dt.datetime, dt.date, dt.time):
+        if isinstance(value, kind):
+            return {kind.__name__: value.isoformat()}
+    raise TypeError(f"Cannot archive {value!r} of type {type(value).__name__}")
+
+def decodeValue(value: Any) -> Any:
+    '''Reverses encodeValue'''
+    if isinstance(value, dict):
+        (kind, text), = value.items()
+        return {"datetime": dt.datetime, "date": dt.date, "time": dt.time}[kind].fromisoformat(text)
+    return value
+
+def listPeriods(directory: str) -> List[str]:
+    '''Week beginning dates of the archived periods, oldest first'''
+    if not os.path.isdir(directory):
+        return []
+    return sorted(
+        name.split("=", 1)[1] for name in os.listdir(directory)
+        if name.startswith("period=") and os.path.exists(os.path.join(directory, name, ARCHIVE_FILE))
+    )
+
+def diffPeriods(old: pd.DataFrame, new: pd.DataFrame) -> pd.DataFrame:
+    '''
+    Compares two archived periods entry by entry.
+
+    Params
+    ------
+        old, new: periods read with loadPeriod
+
+    Returns
+    -------
+        one row per difference, sorted by name, contract and week:
+        name, contract, week, change ("added", "removed" or
+        "changed"), field, old and new value
+    '''
+    fields = ALLOCATION_COLUMNS + MILESTONE_COLUMNS
+    old = old.set_index("key")
+    new = new.set_index("key")
+
+    added = new.loc[new.index.difference(old.index, sort=False)]
+    removed = old.loc[old.index.difference(new.index, sort=False)]
+    both = new.index.intersection(old.index, sort=False)
+
+    # differences are gathered column by column
+    # and made into one dataframe at the end
+    columns = KEY_COLUMNS + ["change", "field", "old", "new"]
+    parts = {column: [] for column in columns}
+
+    def gather(entries: pd.DataFrame, change: str, field=None, a=None, b=None) -> None:
+        n = len(entries)
+        for column in KEY_COLUMNS:
+            parts[column].append(entries[column].to_numpy(dtype=object))
+        parts["change"].append(np.full(n, change, dtype=object))
+        parts["field"].append(np.full(n, field, dtype=object))
+        parts["old"].append(np.full(n, None, dtype=object) if a is None else a.astype(object))
+        parts["new"].append(np.full(n, None, dtype=object) if b is None else b.astype(object))
+
+    gather(added, "added")
+    gather(removed, "removed")
+
+    before = old.loc[both]
+    after = new.loc[both]
+    for field in fields:
+        a = before[field].to_numpy()
+        b = after[field].to_numpy()
+        differs = ~((a == b) | (pd.isna(a) & pd.isna(b)))
+        if differs.any():
+            gather(after[differs], "changed", field, a[differs], b[differs])
+
+    diff = pd.DataFrame({column: np.concatenate(parts[column]) for column in columns})
+    # sort codes rather than values so contracts
+    # mixing numbers and text still sort
+    order = np.lexsort((
+        pd.Categorical(diff["field"], categories=fields).codes,
+        diff["week"].to_numpy(),
+        pd.factorize(diff["contract"], sort=True)[0],
+        pd.factorize(diff["name"], sort=True)[0],
+    ))
+    return diff.iloc[order].reset_index(drop=True)
+
+def formatDiff(diff: pd.DataFrame, old_date: str, new_date: str) -> str:
+    '''Readable report of the differences found by diffPeriods'''
+    lines = [f"Time Forecast Changes\nFrom week beginning {old_date} to week beginning {new_date}"]
+    if diff.empty:
+        lines.append("\nNo changes")
+        return "\n".join(lines)
+
+    for name, entries in diff.groupby("name", sort=False):
+        lines.append(f"\n{name}")
+        for row in entries.itertuples(index=False):
+            entry = f"  {row.contract}, week {row.week}"
+            if row.change == "changed":
+                lines.append(f"{entry}: {row.field} {_show(row.old)} -> {_show(row.new)}")
+            else:
+                lines.append(f"{entry}: {row.change}")
+    return "\n".join(lines)
+
+def _show(value) -> str:
+    return "(blank)" if pd.isna(value) else repr(value) if isinstance(value, str) else str(value)
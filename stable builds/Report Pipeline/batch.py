@@ -0,0 +1,231 @@
+'''
+Headless batch mode of the report pipeline: compiles
+the reports of any number of time forecast directories
+(e.g. one per period) in a single process, without
+prompts, for scheduled regeneration overnight.
+
+ContractList.xlsx and TeamMembersList.xlsx are read
+once for the whole batch, and one pool of worker
+processes reads the sheets and writes the reports of
+every directory, so imports are only paid for once.
+
+    python batch.py DIRECTORY[=OUTPUT] [DIRECTORY[=OUTPUT] ...]
+
+Exits with status 1 if any directory failed.
+'''
+import os
+import sys
+import datetime as dt
+import argparse
+import contextlib
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import List, Tuple
+
+import pandas as pd
+
+from fileIO import FORECAST_LAYOUT, retrieveTimeForecasts, listTimeForecasts, getDefaultPaths, getContractCatalog, getTeamList
+from pipeline import writePmReport, writeTeamReport, writeValidationReport, archiveForecasts, runJobs, flattenPaths
+from outputs import FORMATS, missingFormats
+from workbooks import BACKENDS, resolveBackend
+from ingest import shareTimeForecasts
+from cache import ForecastCache, ReferenceCache, DEFAULT_CACHE_DIRECTORY, DEFAULT_REFERENCE_DIRECTORY
+from contractCatalog import ContractCatalog
+from profiler import Profiler, DEFAULT_TOP_FILES
+
+# silence obnoxious false positive warning
+# default='warn'
+pd.options.mode.chained_assignment = None
+
+REPORTS = ["pm", "team", "validation"]
+
+def parseJobs(arguments: List[str], output: str) -> List[Tuple[str, str]]:
+    '''
+    (forecast directory, report directory) of each DIRECTORY[=OUTPUT]
+    argument; directories without an OUTPUT report to output
+    '''
+    jobs = []
+    for argument in arguments:
+        sheets, _, report_directory = argument.partition("=")
+        jobs.append((os.path.abspath(sheets), os.path.abspath(report_directory or output)))
+    return jobs
+
+def compileReports(
+        SHEETS: str,
+        OUTPUT: str,
+        catalog: ContractCatalog,
+        team_list: pd.DataFrame,
+        reports: List[str],
+        week_begin: dt.datetime =None,
+        archive: str =None,
+        workers: int =1,
+        cache: ForecastCache =None,
+        profiler: Profiler =None,
+        pool: Executor =None,
+        formats: List[str] =None,
+        backend: str ="auto",
+        shared: bool =False,
+        ingest_dir: str =None
+) -> List[str]:
+    '''
+    Compiles the reports of one time forecast directory
+
+    Params
+    ------
+        SHEETS: directory of time forecast sheets
+
+        OUTPUT: directory the reports are placed in (created if missing)
+
+        catalog, team_list: reference lists read for the whole
+        batch (see getContractCatalog and getTeamList)
+
+        reports: any of "pm", "team" and "validation"
+
+        week_begin: correct week beginning date for validation
+        (default is the date read from the sheets)
+
+        archive: root directory of the archive, or None to not archive
+
+        workers, cache, profiler: see retrieveTimeForecasts
+
+        pool: worker processes shared by every directory of the batch
+
+        formats: formats of the PM and Team reports (default: xlsx)
+
+        backend: library the xlsx reports are written with (see workbooks.py)
+
+        shared: read the sheets together with the workers of other
+        hosts (see ingest.py), through the work directory ingest_dir
+
+    Returns
+    -------
+        paths written
+    '''
+    if not os.path.isdir(SHEETS):
+        raise FileNotFoundError(f"Invalid time forcast directory path: {SHEETS}")
+    os.makedirs(OUTPUT, exist_ok=True)
+
+    profiler = Profiler(False) if profiler is None else profiler.copy()
+    with profiler.stage("ingest"):
+        if shared:
+            forecasts, DATE, contexts = shareTimeForecasts(SHEETS, ingest_dir, workers, cache, profiler, pool)
+        else:
+            forecasts, DATE, contexts = retrieveTimeForecasts(SHEETS, workers, cache, profiler, pool)
+    if DATE is None:
+        raise FileNotFoundError(f"No time forecasts in {SHEETS}")
+
+    if week_begin is None:
+        week_begin = dt.datetime.combine(DATE, dt.time())
+    current_time = dt.datetime.now().strftime("%Y-%m-%d--%H-%M-%S")
+
+    formats = formats or ["xlsx"]
+    jobs = []
+    if "pm" in reports:
+        jobs.append((writePmReport, forecasts, catalog, team_list, DATE, OUTPUT, profiler, formats, backend))
+    if "team" in reports:
+        jobs.append((writeTeamReport, forecasts, catalog, team_list, DATE, OUTPUT, profiler, formats, backend))
+    if "validation" in reports:
+        jobs.append((writeValidationReport, listTimeForecasts(SHEETS), contexts, week_begin, catalog, team_list, OUTPUT, current_time, profiler, DATE))
+    if archive is not None:
+        jobs.append((archiveForecasts, forecasts, DATE, archive, catalog, team_list))
+
+    return flattenPaths(runJobs(jobs, workers, pool))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Compile the reports of several time forecast directories in one process, without prompts')
+    parser.add_argument('directories', nargs='+', metavar='DIRECTORY[=OUTPUT]', help='Time forecast directories, each optionally followed by =OUTPUT, the directory its reports are placed in')
+    parser.add_argument('--output', help='Directory for the reports of directories given without =OUTPUT (default: report_directory in config.json)')
+    parser.add_argument('--config', default=r"Q:\EngineeringPlanning\ReportTools\defaults\config.json", help='Defaults file with the report directory and reference list paths')
+    parser.add_argument('--contracts', help='Path to ContractList.xlsx (default: from config.json)')
+    parser.add_argument('--team', help='Path to TeamMembersList.xlsx (default: from config.json)')
+    parser.add_argument('--reports', nargs='+', choices=REPORTS, default=REPORTS, help='Reports to compile (default: all)')
+    parser.add_argument('--week-begin', help='Correct week beginning date (MM/DD/YYYY) for validation of every directory (default: the date read from each directory\'s sheets)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Number of processes used to read time forecast sheets and write reports (default: one per CPU)')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIRECTORY, help='Directory where parsed time forecast sheets are cached between runs')
+    parser.add_argument('--cache-mb', type=int, default=256, help='Maximum size of the cache in megabytes')
+    parser.add_argument('--hash', action='store_true', help='Also compare file contents when deciding if a cached sheet or reference list is current')
+    parser.add_argument('--no-cache', action='store_true', help='Read every sheet and reference list from excel, ignoring the caches')
+    parser.add_argument('--archive-dir', help='Directory where the forecasts of each period are archived (default: "archive" in each report directory)')
+    parser.add_argument('--no-archive', action='store_true', help='Do not archive the forecasts of the periods')
+    parser.add_argument('--formats', nargs='+', choices=FORMATS, default=['xlsx'], help='Formats the PM and Team reports are written in, each from a single render (default: xlsx)')
+    parser.add_argument('--backend', choices=BACKENDS, default='auto', help='Library the xlsx reports are written with: xlsxwriter streams rows in constant memory, openpyxl builds each sheet in memory (default: xlsxwriter if installed)')
+    parser.add_argument('--shared-ingest', action='store_true', help='Read the sheets together with workers on other hosts started with "python ingest.py DIRECTORY --ingest-dir WORK" (see ingest.py)')
+    parser.add_argument('--ingest-dir', help='Work directory shared with those workers, writable only by the accounts running the tools (required with --shared-ingest)')
+    parser.add_argument('--profile', action='store_true', help='Measure the time and memory of each stage and sheet, written to a .profile.json file next to each report (runs slower)')
+    parser.add_argument('--profile-top', type=int, default=DEFAULT_TOP_FILES, help='Number of slowest sheets listed in the profiles (default: 10)')
+    args = parser.parse_args()
+    missing = missingFormats(args.formats)
+    if missing:
+        parser.error(f"{', '.join(missing)} output needs pyarrow (pip install pyarrow)")
+    try:
+        resolveBackend(args.backend)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.shared_ingest and not args.ingest_dir:
+        parser.error("--shared-ingest needs --ingest-dir, a work directory outside the time forecast directory")
+
+    week_begin = None
+    if args.week_begin is not None:
+        try:
+            week_begin = dt.datetime.strptime(args.week_begin, "%m/%d/%Y")
+        except ValueError:
+            parser.error("Invalid date format. Please use the format month/day/year.")
+
+    print(f"Fetching defaults from: {args.config}")
+    defaults = getDefaultPaths(args.config) or ("", "", "", "")
+    _, out, CN_LIST_PATH, TEAM_LIST_PATH = defaults
+    OUTPUT = args.output or out
+    jobs = parseJobs(args.directories, OUTPUT)
+
+    cache = None
+    if not args.no_cache:
+        cache = ForecastCache(args.cache_dir, FORECAST_LAYOUT, args.cache_mb * 1024 * 1024, args.hash)
+
+    reference_cache = ReferenceCache(None if args.no_cache else DEFAULT_REFERENCE_DIRECTORY, args.hash)
+    profiler = Profiler(args.profile, args.profile_top)
+
+    # reference lists are read once for every directory
+    with profiler.stage("reference lists"):
+        catalog = getContractCatalog(args.contracts or CN_LIST_PATH, reference_cache)
+        team_list = getTeamList(args.team or TEAM_LIST_PATH, reference_cache)
+    if not catalog or team_list.empty:
+        print("Could not read the reference lists")
+        sys.exit(1)
+
+    failed = []
+    pool = ProcessPoolExecutor(max_workers=args.workers) if args.workers > 1 else None
+    with pool or contextlib.nullcontext():
+        for number, (SHEETS, REPORT_DIRECTORY) in enumerate(jobs, start=1):
+            print(f"\n[{number}/{len(jobs)}] {SHEETS} -> {REPORT_DIRECTORY}")
+            archive = None
+            if not args.no_archive:
+                archive = args.archive_dir or os.path.join(REPORT_DIRECTORY, "archive")
+            try:
+                paths = compileReports(
+                    SHEETS,
+                    REPORT_DIRECTORY,
+                    catalog,
+                    team_list,
+                    args.reports,
+                    week_begin,
+                    archive,
+                    args.workers,
+                    cache,
+                    profiler,
+                    pool,
+                    args.formats,
+                    args.backend,
+                    args.shared_ingest,
+                    args.ingest_dir
+                )
+            except Exception as e:
+                # one bad directory does not stop the rest of the batch
+                print(f"FAILED: {SHEETS}: {e}")
+                failed.append(SHEETS)
+                continue
+            for path in paths:
+                print(f"Wrote {path}")
+
+    print(f"\nCompiled {len(jobs) - len(failed)} of {len(jobs)} directories")
+    for SHEETS in failed:
+        print(f"FAILED: {SHEETS}")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,70 @@
+'''
+Contract information from ContractList.xlsx, built once
+per read of the list and indexed by contract, so the
+reports and validation look contracts up in constant time
+instead of merging or scanning the list for each one
+'''
+from typing import Any, Dict, Iterable, List, Tuple
+
+import pandas as pd
+
+# contracts which are not expected in ContractList.xlsx
+OVERHEAD_CONTRACTS = ["Sustaining", "ENG_OH", "IRC_OH", "STE_OH", "BP", "PTO", "HOLIDAY"]
+
+class ContractCatalog:
+    def __init__(self, contract_sheet: pd.DataFrame):
+        """
+        Initialize a ContractCatalog object.
+
+        Parameters:
+        - contract_sheet (pd.DataFrame): Sheet1 of ContractList.xlsx, read with header=None.
+          Column A holds the contracts, B their descriptions, C their program managers
+          and E, from row 3, the program managers in the order they are reported.
+          An empty sheet (the list could not be read) gives an empty catalog.
+        """
+        columns = set(contract_sheet.columns)
+
+        rows = pd.DataFrame(columns=['contract', 'program_mgr', 'desc'])
+        if {0, 1, 2} <= columns:
+            rows = contract_sheet[[0, 2, 1]][1:].set_axis(['contract', 'program_mgr', 'desc'], axis='columns')
+        # a contract listed twice keeps its first row
+        rows = rows[rows['contract'].notna()].drop_duplicates('contract')
+
+        # contract -> (program_mgr, desc)
+        self.info: Dict[Any, Tuple[Any, Any]] = dict(zip(rows['contract'], zip(rows['program_mgr'], rows['desc'])))
+        # contract -> program_mgr / desc, for mapping whole columns at once
+        self.managers = pd.Series(rows['program_mgr'].to_numpy(), index=rows['contract'].to_numpy())
+        self.descriptions = pd.Series(rows['desc'].to_numpy(), index=rows['contract'].to_numpy())
+        self.contracts = frozenset(self.info)
+
+        # program managers in the order they are reported
+        self.mgr_order: List[str] = []
+        if 4 in columns:
+            self.mgr_order = contract_sheet[4][2:].dropna().tolist()
+
+        self.overhead = frozenset(OVERHEAD_CONTRACTS)
+
+    def __repr__(self):
+        return f"ContractCatalog(contracts={len(self.contracts)}, managers={len(self.mgr_order)})"
+
+    def __len__(self) -> int:
+        return len(self.contracts)
+
+    def __contains__(self, contract) -> bool:
+        return contract in self.contracts
+
+    def programManager(self, contract, default=None):
+        '''program manager of a contract, or default if it is not in the list'''
+        return self.info.get(contract, (default, None))[0]
+
+    def description(self, contract, default=None):
+        '''description of a contract, or default if it is not in the list'''
+        return self.info.get(contract, (None, default))[1]
+
+    def isOverhead(self, contract) -> bool:
+        '''True for contracts which are not expected in ContractList.xlsx'''
+        return contract in self.overhead
+
+    def unknown(self, contracts: Iterable) -> List[Any]:
+        '''contracts which are not in ContractList.xlsx, sorted (as text, so numbers and text mix)'''
+        return sorted(set(contracts) - self.contracts, key=str)
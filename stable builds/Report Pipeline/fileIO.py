@@ -0,0 +1,377 @@
+'''
+The module provides utility functions for reading
+time forecast sheets and reference lists once, and
+deriving the data of each report from that one read
+'''
+import os
+import sys
+import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple, Iterable, Iterator
+import json
+import functools
+from concurrent.futures import Executor, ProcessPoolExecutor
+
+import pandas as pd
+
+from cache import ForecastCache, ReferenceCache
+from contractCatalog import ContractCatalog
+from profiler import Profiler, timeParse
+from planReader import readPlanSheet
+from manipulate import applySchema
+from validationContext import ValidationContext
+import validationContext
+
+# Layout of the "Plan" sheet in the time forecast template,
+# as 0-indexed (row, column) positions (see planReader.readPlanSheet).
+# These are part of every cache key (see FORECAST_LAYOUT), so cached
+# forecasts are re-read whenever the template layout changes here.
+NAME_CELL = (5, 4)
+DATE_CELL = (6, 4)
+# rows read by the Team report; the PM report starts one row later
+WEEK_ROWS = (16, 38)
+PM_WEEK_ROWS = (17, 38)
+WEEK1_COLUMN_IDX = [2, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15]
+WEEK2_COLUMN_IDX = [18, 19, 20, 21, 22, 23, 24, 25, 26, 27, 28]
+COLUMN_NAMES = [
+    "contract",
+    "monday",
+    "tuesday",
+    "wednesday",
+    "thursday",
+    "friday",
+    "roll_up_hours",
+    "roll_up_percent",
+    "milestone1",
+    "milestone2",
+    "milestone3"
+]
+
+# column order of each report's forecasts
+TEAM_COLUMNS = ["name", "week"] + COLUMN_NAMES
+PM_COLUMNS = ["contract", "week", "name"] + COLUMN_NAMES[1:]
+
+# only these rows and columns of the sheet are read,
+# covering both reports and the validation checks
+PLAN_ROWS = max(WEEK_ROWS[1], NAME_CELL[0] + 1, DATE_CELL[0] + 1, validationContext.MAX_ROW)
+PLAN_COLUMNS = sorted(set(
+    [NAME_CELL[1], DATE_CELL[1]] + WEEK1_COLUMN_IDX + WEEK2_COLUMN_IDX + validationContext.COLUMNS
+))
+
+FORECAST_LAYOUT = (
+    NAME_CELL,
+    DATE_CELL,
+    WEEK_ROWS,
+    WEEK1_COLUMN_IDX,
+    WEEK2_COLUMN_IDX,
+    COLUMN_NAMES,
+    PLAN_ROWS,
+    PLAN_COLUMNS,
+)
+
+def excelToDataframe(filepath: str) -> Tuple[pd.DataFrame, datetime.date, ValidationContext]:
+    '''
+    Reads time forecast formatted excel file
+    into a labeled pandas dataframe, keeping the
+    cells checked by validation alongside it.
+
+    Params
+    ------
+        filepath: a valid fielpath to an .xlsx file
+        formatted in the time forecast sheet pattern
+
+    Returns
+    -------
+        data: dataframe with the TEAM_COLUMNS, plus
+        the plan row (0-indexed) each entry came from
+        date: week beginning date from sheet
+        context: the validation context of the sheet
+    '''
+
+    # Check if the file is a valid Excel file
+    try:
+        print(f"Loading {filepath}")
+        df = readPlanSheet(filepath, PLAN_ROWS, PLAN_COLUMNS, [DATE_CELL])
+    except Exception as e:
+        print(e)
+        return
+
+    DATE = df.iloc[DATE_CELL].date()
+
+    # Extract name from the DataFrame
+    name = df.iloc[NAME_CELL]
+
+    # Using iloc for integer-location based indexing
+    first_row, last_row = WEEK_ROWS
+    week1 = df.iloc[first_row:last_row, WEEK1_COLUMN_IDX].dropna(how='all', axis=0)
+    week2 = df.iloc[first_row:last_row, WEEK2_COLUMN_IDX].dropna(how='all', axis=0)
+
+    week1.columns = COLUMN_NAMES
+    week2.columns = COLUMN_NAMES
+
+    # Add name, week and row columns
+    for week, entries in ((1, week1), (2, week2)):
+        entries.insert(0, "name", name)
+        entries.insert(1, "week", week)
+        entries.insert(len(entries.columns), "row", entries.index)
+
+    # Concatenate DataFrames
+    data = pd.concat([week1, week2], ignore_index=True)
+
+    return data, DATE, ValidationContext(filepath, sheet=df)
+
+def retrieveTimeForecasts(
+        path: str,
+        workers: int = 1,
+        cache: ForecastCache = None,
+        profiler: Profiler = None,
+        pool: Executor = None,
+        read: Callable[[List[str], bool], Iterator[Any]] = None
+) -> Tuple[pd.DataFrame, datetime.date, Dict[str, ValidationContext]]:
+    '''
+    Reads every time forecast sheet in a directory once.
+
+    Params
+    ------
+        path: path to a directory containing excel
+        sheets with bi-weekly time forecasts
+
+        workers: number of processes used to read
+        the sheets (1 -> read one after another).
+        Sheets are always combined in filename order
+
+        cache: if given, sheets unchanged since they were
+        last read are taken from the cache instead
+
+        profiler: if given and enabled, each sheet parsed
+        is measured (see profiler.timeParse)
+
+        pool: if given, sheets are read by this pool of
+        processes, which is left running for the caller
+        to reuse, instead of a pool of workers started here
+
+        read: if given, parses the sheets not taken from the
+        cache instead of readSheets (e.g. ingest.readShared)
+
+    Returns
+    -------
+        data: forecasts of all sheets (see excelToDataframe),
+        to be narrowed with pmForecasts or teamForecasts
+        date: week beginning date from sheet
+        contexts: validation context of each sheet read, by path
+    '''
+
+    # Check if the entered path is a valid directory
+    if not os.path.isdir(path):
+        print("Invalid time forcast directory path.")
+        sys.exit()
+
+    return combineTimeForecasts(iterTimeForecasts(path, workers, cache, profiler, pool, read))
+
+def iterTimeForecasts(
+        path: str,
+        workers: int = 1,
+        cache: ForecastCache = None,
+        profiler: Profiler = None,
+        pool: Executor = None,
+        read: Callable[[List[str], bool], Iterator[Any]] = None
+) -> Iterator[Tuple[pd.DataFrame, datetime.date, ValidationContext]]:
+    '''
+    Yields the result of excelToDataframe for each
+    sheet in a directory, in filename order. Sheets
+    which cannot be read are reported and skipped.
+
+    Params
+    ------
+        path: path to a directory containing excel
+        sheets with bi-weekly time forecasts
+
+        workers: number of processes used to read
+        the sheets (1 -> read one after another)
+
+        cache: if given, sheets unchanged since they were
+        last read are taken from the cache instead
+
+        profiler: if given and enabled, each sheet parsed
+        is measured (see profiler.timeParse)
+
+        pool: if given, sheets are read by this pool of
+        processes, which is left running for the caller
+        to reuse, instead of a pool of workers started here
+
+        read: read(filepaths, profiling) yields the result of
+        parsing each sheet of filepaths, in order, measured
+        (see profiler.timeParse) if profiling is True.
+        Default is readSheets with workers and pool
+    '''
+    filepaths = listTimeForecasts(path)
+
+    unread = filepaths
+    if cache is not None:
+        unread = [file_path for file_path in filepaths if not cache.has(file_path)]
+        print(f"Using cached data for {len(filepaths) - len(unread)} of {len(filepaths)} sheets")
+
+    profiling = profiler is not None and profiler.enabled
+    if read is None:
+        read = functools.partial(readSheets, workers=workers, pool=pool)
+    results = read(unread, profiling)
+    # unread is in filename order too, so the next
+    # parsed sheet is always the next unread one
+    parsed = zip(unread, results)
+
+    try:
+        pending = next(parsed, None)
+        for file_path in filepaths:
+            if pending is not None and pending[0] == file_path:
+                result = pending[1]
+                pending = next(parsed, None)
+                if profiling:
+                    result, measurement = result
+                    profiler.addFile(measurement)
+                if cache is not None:
+                    cache.put(file_path, result)
+            else:
+                result = cache.get(file_path)
+                if result is None:
+                    # evicted since it was checked
+                    result = excelToDataframe(file_path)
+
+            if result is None:
+                print(f"Skipping {file_path}")
+                continue
+            yield result
+    finally:
+        # stops the reader, e.g. shuts down its pool
+        if hasattr(results, "close"):
+            results.close()
+
+def readSheets(
+        filepaths: List[str],
+        profiling: bool = False,
+        workers: int = 1,
+        pool: Executor = None
+) -> Iterator[Any]:
+    '''
+    Yields the result of excelToDataframe for each sheet, in
+    order, with its measurement (see profiler.timeParse) if
+    profiling. Sheets are spread across a pool of processes if
+    one is given or workers > 1; map() hands results back in
+    submission order, so the output does not depend on which
+    sheet finishes loading first
+    '''
+    parse = excelToDataframe
+    if profiling:
+        # measured where the sheet is parsed, which
+        # may be one of the pool's processes
+        parse = functools.partial(timeParse, excelToDataframe)
+
+    own_pool = None
+    try:
+        if pool is not None and len(filepaths) > 1:
+            yield from pool.map(parse, filepaths)
+        elif workers > 1 and len(filepaths) > 1:
+            own_pool = ProcessPoolExecutor(max_workers=min(workers, len(filepaths)))
+            yield from own_pool.map(parse, filepaths)
+        else:
+            yield from map(parse, filepaths)
+    finally:
+        if own_pool is not None:
+            own_pool.shutdown(cancel_futures=True)
+
+def combineTimeForecasts(
+        forecasts: Iterable[Tuple[pd.DataFrame, datetime.date, ValidationContext]]
+) -> Tuple[pd.DataFrame, datetime.date, Dict[str, ValidationContext]]:
+    '''
+    Combines the time forecasts from iterTimeForecasts
+    into a single dataframe, copying each forecast
+    once rather than once per sheet that follows it.
+
+    Returns
+    -------
+        data: all forecasts, in the order given,
+        typed by manipulate.applySchema
+        date: week beginning date from the last sheet
+        contexts: validation context of each sheet, by path
+    '''
+    frames = []
+    contexts = {}
+    date = None
+    for forecast, date, context in forecasts:
+        frames.append(forecast)
+        contexts[context.file_path] = context
+
+    if not frames:
+        return applySchema(pd.DataFrame(columns=TEAM_COLUMNS + ["row"])), date, contexts
+
+    return applySchema(pd.concat(frames, ignore_index=True)), date, contexts
+
+def pmForecasts(forecasts: pd.DataFrame) -> pd.DataFrame:
+    '''Forecasts as the PM Report Generator reads them (see retrieveTimeForecasts)'''
+    return forecasts[forecasts["row"] >= PM_WEEK_ROWS[0]][PM_COLUMNS].reset_index(drop=True)
+
+def teamForecasts(forecasts: pd.DataFrame) -> pd.DataFrame:
+    '''Forecasts as the Team Report Generator reads them (see retrieveTimeForecasts)'''
+    return forecasts[TEAM_COLUMNS]
+
+def listTimeForecasts(path: str) -> List[str]:
+    '''
+    Returns the paths of all time forecast sheets
+    in a directory, sorted by filename. Temporary
+    files left open by Excel (~$...) are skipped.
+    '''
+    filepaths = []
+    for filename in sorted(os.listdir(path)):
+        if filename.endswith(".xlsm"):
+            if (filename.startswith('~')):
+                print(f"Ignoring temporary file: {filename}")
+                continue
+            # Construct the full file path
+            filepaths.append(os.path.join(path, filename))
+
+    return filepaths
+
+def getDefaultPaths(config_file_path: str):
+    try:
+        with open(config_file_path, 'r') as file:
+            directory_paths = json.load(file)
+
+            time_forecast_directory = directory_paths.get("time_forecast_directory", "")
+            report_directory = directory_paths.get("report_directory", "")
+            contracts_list = directory_paths.get("contracts_list_filepath", "")
+            team_members_list = directory_paths.get("team_members_list_filepath", "")
+
+            return time_forecast_directory, report_directory, contracts_list, team_members_list
+
+    except FileNotFoundError:
+        print(f"Config file '{config_file_path}' not found.")
+        return None
+
+def readReferenceList(PATH: str, header: Optional[int], cache: ReferenceCache = None) -> pd.DataFrame:
+    '''Sheet1 of a reference list, through the cache if one is given'''
+    if cache is None:
+        return pd.read_excel(PATH, "Sheet1", header=header)
+    return cache.readExcel(PATH, "Sheet1", header)
+
+def getContractCatalog(PATH: str, cache: ReferenceCache = None) -> ContractCatalog:
+    '''
+    Reads Sheet1 of ContractList.xlsx and indexes it
+    by contract, for every report to look contracts up in
+    '''
+    print("Reading ContractList.xlsx...")
+    try:
+        contract_sheet = readReferenceList(PATH, None, cache)
+    except Exception as e:
+        print(e)
+        contract_sheet = pd.DataFrame([])
+    return ContractCatalog(contract_sheet)
+
+def getTeamList(PATH: str, cache: ReferenceCache = None) -> pd.DataFrame:
+    print("Reading TeamMembersList.xlsx...")
+    try:
+        team_list = readReferenceList(PATH, 0, cache)
+    except Exception as e:
+        print(e)
+        return pd.DataFrame([])
+
+    col_names = ['name', 'group', 'group_list', 'manager']
+    team_list = team_list.set_axis(col_names, axis='columns')
+    return team_list
@@ -0,0 +1,569 @@
+'''
+Shared ingestion: several processes, on one or more hosts
+which see the same time forecast directory, read its
+sheets together. A coordinator (main.py or batch.py with
+--shared-ingest) lists the sheets of a run in a work
+directory, every worker claims one sheet at a time by
+creating a lease file, and writes the parsed sheet next
+to it. The coordinator merges the parsed sheets into the
+forecasts retrieveTimeForecasts returns.
+
+    python ingest.py DIRECTORY --ingest-dir WORK [--workers 4] [--wait]
+
+helps with the runs started on DIRECTORY (as this host
+sees it) from any host. The work directory is never the
+forecast directory, which every team member can write to:
+give one only the accounts running the tools can write.
+Work directory layout:
+
+    current.json                         run being read
+    <run>/manifest.json                  sheets of the run, in filename order
+    <run>/leases/<n>.lease               held by the worker reading sheet n
+    <run>/results/<n>.json               sheet n, parsed (see excelToDataframe):
+    <run>/results/<n>.forecast.npz       date and validation context cells as
+    <run>/results/<n>.sheet.npz          JSON, forecasts and Plan sheet columns
+                                         as archive.saveColumns writes them
+
+Results hold no pickled objects, so reading them cannot
+run code. A worker renews its lease while it parses; a
+lease which is not renewed in lease_seconds (its worker
+crashed or lost the share) is taken over by another
+worker. Results are written atomically and a sheet parses
+the same on every host, so a sheet read twice is harmless.
+'''
+import os
+import sys
+import json
+import time
+import shutil
+import socket
+import argparse
+import functools
+import threading
+import contextlib
+import uuid
+import datetime as dt
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from cache import ForecastCache
+from archive import saveColumns, loadColumns, encodeValue, decodeValue
+from planReader import READER_VERSION
+from fileIO import FORECAST_LAYOUT, excelToDataframe, retrieveTimeForecasts
+from profiler import Profiler, timeParse
+from validationContext import ValidationContext
+
+CURRENT_FILE = "current.json"
+MANIFEST_FILE = "manifest.json"
+# seconds a worker may hold a sheet before others take it over
+LEASE_SECONDS = 120
+# seconds between checks for results and expired leases
+POLL_SECONDS = 0.5
+# runs left behind by a coordinator which stopped are removed after a day
+STALE_RUN_SECONDS = 24 * 60 * 60
+
+def ownerId() -> str:
+    '''Name of this process in leases and runs (host and process id)'''
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+def writeJson(path: str, content: Dict[str, Any]) -> None:
+    '''Writes a JSON file through a temporary file, so readers never see part of it'''
+    partial = f"{path}.{ownerId()}.tmp"
+    with open(partial, 'w', encoding='UTF-8') as file:
+        json.dump(content, file)
+    os.replace(partial, path)
+
+def readJson(path: str) -> Optional[Dict[str, Any]]:
+    '''Contents of a JSON file, or None if it is missing or unreadable'''
+    try:
+        with open(path, 'r', encoding='UTF-8') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+def leasePath(run_dir: str, index: int) -> str:
+    return os.path.join(run_dir, "leases", f"{index:05d}.lease")
+
+def resultPath(run_dir: str, index: int) -> str:
+    return os.path.join(run_dir, "results", f"{index:05d}.json")
+
+def leaseExpired(path: str, lease: Optional[Dict[str, Any]], lease_seconds: float) -> bool:
+    '''True if a lease (read from path, None if unreadable) has run out'''
+    if lease is not None:
+        return lease.get("expires", 0) < time.time()
+    # still being written, or left empty by a crash
+    try:
+        return os.path.getmtime(path) + lease_seconds < time.time()
+    except FileNotFoundError:
+        return True
+
+def claimLease(path: str, lease_seconds: float =LEASE_SECONDS) -> Optional[str]:
+    '''
+    Claims a sheet by creating its lease file. An expired
+    lease is first broken (see breakLease).
+
+    Returns
+    -------
+        token of the lease held by this process, or
+        None if another worker holds the sheet
+    '''
+    for _ in range(2):
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            lease = readJson(path)
+            if not leaseExpired(path, lease, lease_seconds):
+                return None
+            if not breakLease(path, lease, lease_seconds):
+                return None
+            print(f"Taking over {os.path.basename(path)} from {(lease or {}).get('owner', 'an unknown worker')}")
+            continue
+
+        token = uuid.uuid4().hex
+        with os.fdopen(fd, 'w', encoding='UTF-8') as file:
+            json.dump({"owner": ownerId(), "token": token, "expires": time.time() + lease_seconds}, file)
+        return token
+    return None
+
+def breakLease(path: str, seen: Optional[Dict[str, Any]], lease_seconds: float) -> bool:
+    '''
+    Removes an expired lease. It is moved aside first, which
+    only one worker can do, then read again: if it is not the
+    lease seen expired (another worker broke that one and
+    claimed the sheet since), it is put back untouched.
+
+    Returns
+    -------
+        True if the expired lease was removed by this process
+    '''
+    moved = f"{path}.{ownerId()}.expired"
+    try:
+        os.rename(path, moved)
+    except FileNotFoundError:
+        return False  # broken by another worker
+    lease = readJson(moved)
+    if lease == seen and leaseExpired(moved, lease, lease_seconds):
+        os.remove(moved)
+        return True
+    restoreLease(moved, path)
+    return False
+
+def restoreLease(moved: str, path: str) -> None:
+    '''Puts a lease moved aside back, unless a newer lease was created meanwhile'''
+    try:
+        # a hard link never replaces an existing lease
+        os.link(moved, path)
+    except FileExistsError:
+        pass  # the newer lease wins, the sheet may be read twice
+    except OSError:
+        # shares without hard links
+        if not os.path.exists(path):
+            os.rename(moved, path)
+            return
+    os.remove(moved)
+
+def renewLease(path: str, token: str, lease_seconds: float =LEASE_SECONDS) -> bool:
+    '''
+    Moves the expiry of a lease held by this process forward
+
+    Returns
+    -------
+        False if the lease was taken over by another worker
+    '''
+    lease = readJson(path)
+    if lease is None or lease.get("token") != token:
+        return False
+    lease["expires"] = time.time() + lease_seconds
+    writeJson(path, lease)
+    return True
+
+@contextlib.contextmanager
+def keepLease(path: str, token: str, lease_seconds: float =LEASE_SECONDS) -> Iterator[None]:
+    '''Renews a lease every third of lease_seconds while the block it wraps runs'''
+    stop = threading.Event()
+    def renew():
+        while not stop.wait(lease_seconds / 3):
+            if not renewLease(path, token, lease_seconds):
+                return
+    renewer = threading.Thread(target=renew, daemon=True)
+    renewer.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        renewer.join()
+
+def releaseLease(path: str, token: str) -> None:
+    '''Removes a lease held by this process, leaving one taken over by another worker'''
+    moved = f"{path}.{ownerId()}.released"
+    try:
+        os.rename(path, moved)
+    except FileNotFoundError:
+        return
+    if (readJson(moved) or {}).get("token") == token:
+        os.remove(moved)
+    else:
+        restoreLease(moved, path)
+
+def startRun(work_dir: str, names: List[str], profiling: bool =False) -> str:
+    '''
+    Lists the sheets of a run in a new run directory and
+    makes it the current run of the work directory
+
+    Params
+    ------
+        work_dir: work directory shared by the workers
+
+        names: filenames of the sheets to read, in filename order
+
+        profiling: measure each sheet parsed (see profiler.timeParse)
+
+    Returns
+    -------
+        the run directory
+    '''
+    os.makedirs(work_dir, exist_ok=True)
+    removeStaleRuns(work_dir)
+
+    run = f"{dt.datetime.now():%Y%m%d-%H%M%S}-{ownerId()}"
+    run_dir = os.path.join(work_dir, run)
+    os.makedirs(os.path.join(run_dir, "leases"))
+    os.makedirs(os.path.join(run_dir, "results"))
+    writeJson(os.path.join(run_dir, MANIFEST_FILE), {
+        "names": names,
+        "coordinator": ownerId(),
+        # workers only help with runs they parse the same way
+        "layout": repr(FORECAST_LAYOUT),
+        "pandas": pd.__version__,
+        "reader": READER_VERSION,
+        "profile": profiling,
+    })
+    writeJson(os.path.join(work_dir, CURRENT_FILE), {"run": run})
+    return run_dir
+
+def finishRun(work_dir: str, run_dir: str) -> None:
+    '''Removes a run, and stops workers looking for it if it is still current'''
+    current = readJson(os.path.join(work_dir, CURRENT_FILE)) or {}
+    if current.get("run") == os.path.basename(run_dir):
+        try:
+            os.remove(os.path.join(work_dir, CURRENT_FILE))
+        except FileNotFoundError:
+            pass
+    shutil.rmtree(run_dir, ignore_errors=True)
+
+def removeStaleRuns(work_dir: str) -> None:
+    '''Removes runs not touched in STALE_RUN_SECONDS'''
+    for name in os.listdir(work_dir):
+        run_dir = os.path.join(work_dir, name)
+        try:
+            stale = os.path.getmtime(run_dir) + STALE_RUN_SECONDS < time.time()
+        except OSError:
+            continue
+        if os.path.isdir(run_dir) and stale:
+            shutil.rmtree(run_dir, ignore_errors=True)
+
+def currentRun(work_dir: str) -> Optional[str]:
+    '''Run directory of the current run, or None if no run is being read'''
+    current = readJson(os.path.join(work_dir, CURRENT_FILE))
+    if not current or "run" not in current:
+        return None
+    run_dir = os.path.join(work_dir, current["run"])
+    return run_dir if os.path.isdir(run_dir) else None
+
+def workRun(run_dir: str, path: str, lease_seconds: float =LEASE_SECONDS) -> int:
+    '''
+    Reads sheets of a run until every sheet has a result,
+    waiting on sheets leased by other workers and taking
+    them over if their lease expires
+
+    Params
+    ------
+        run_dir: run directory (see startRun)
+
+        path: time forecast directory, as this host sees it
+
+        lease_seconds: time this worker may hold each sheet
+
+    Returns
+    -------
+        number of sheets read by this worker
+    '''
+    manifest = readJson(os.path.join(run_dir, MANIFEST_FILE))
+    if manifest is None:
+        return 0
+    parsed_as = (manifest.get("layout"), manifest.get("pandas"), manifest.get("reader"))
+    if parsed_as != (repr(FORECAST_LAYOUT), pd.__version__, READER_VERSION):
+        print(f"Not reading run {os.path.basename(run_dir)}: its sheet layout, pandas or reader version differs from this host's")
+        return 0
+
+    names = manifest["names"]
+    if any(not isinstance(name, str) or os.path.basename(name) != name for name in names):
+        print(f"Not reading run {os.path.basename(run_dir)}: it lists sheets outside the forecast directory")
+        return 0
+    profiling = bool(manifest.get("profile"))
+
+    parsed = 0
+    try:
+        while True:
+            pending = [index for index in range(len(names)) if not os.path.exists(resultPath(run_dir, index))]
+            if not pending or not os.path.isdir(run_dir):
+                return parsed
+
+            claimed = False
+            for index in pending:
+                lease = leasePath(run_dir, index)
+                token = claimLease(lease, lease_seconds)
+                if token is None:
+                    continue
+                claimed = True
+                try:
+                    # finished while this worker was claiming it
+                    if os.path.exists(resultPath(run_dir, index)):
+                        continue
+                    with keepLease(lease, token, lease_seconds):
+                        if profiling:
+                            result, measurement = timeParse(parseSheet, os.path.join(path, names[index]))
+                        else:
+                            result, measurement = parseSheet(os.path.join(path, names[index])), None
+                    writeResult(resultPath(run_dir, index), result, measurement)
+                    parsed += 1
+                finally:
+                    releaseLease(lease, token)
+
+            if not claimed:
+                time.sleep(POLL_SECONDS)
+    except FileNotFoundError:
+        # the coordinator finished the run and removed it
+        return parsed
+
+def parseSheet(file_path: str) -> Optional[Tuple[pd.DataFrame, dt.date, ValidationContext]]:
+    '''excelToDataframe, with any error reported and the sheet then skipped by the coordinator'''
+    try:
+        return excelToDataframe(file_path)
+    except Exception as e:
+        print(f"Could not read {file_path}: {e}")
+        return None
+
+def resultFiles(path: str) -> Tuple[str, str]:
+    '''Column files of a result: its forecasts and its Plan sheet'''
+    base = os.path.splitext(path)[0]
+    return f"{base}.forecast.npz", f"{base}.sheet.npz"
+
+def writeResult(
+        path: str,
+        result: Optional[Tuple[pd.DataFrame, dt.date, ValidationContext]],
+        measurement: Optional[Dict[str, Any]] =None
+) -> None:
+    '''
+    Stores a parsed sheet (None if it could not be read) and
+    its measurement. The columns are written first and the
+    JSON file last, so a result only appears when complete.
+    '''
+    content: Dict[str, Any] = {"read": result is not None, "measurement": measurement}
+    if result is not None:
+        df, date, context = result
+        forecast_file, sheet_file = resultFiles(path)
+        saveColumns(forecast_file, {str(column): df[column].to_numpy() for column in df.columns})
+        saveColumns(sheet_file, {str(column): context.sheet[column].to_numpy() for column in context.sheet.columns})
+        content.update({
+            "date": None if date is None else encodeValue(date),
+            "columns": [str(column) for column in df.columns],
+            "sheet_name": context.sheet_name,
+            "sheet_exists": context.sheet_exists,
+            # Plan sheet columns are numbered, as pd.read_excel names them
+            "sheet_columns": [int(column) for column in context.sheet.columns],
+        })
+    writeJson(path, content)
+
+def readResult(path: str, file_path: str, profiling: bool =False) -> Any:
+    '''
+    A parsed sheet (with its measurement if profiling), its
+    validation context and measurement naming the sheet as
+    this host sees it
+    '''
+    content = readJson(path)
+    if content is None:
+        raise ValueError(f"Unreadable result {path}")
+
+    result = None
+    if content["read"]:
+        forecast_file, sheet_file = resultFiles(path)
+        df = loadColumns(forecast_file, content["columns"])
+        sheet = loadColumns(sheet_file, [str(column) for column in content["sheet_columns"]])
+        sheet.columns = content["sheet_columns"]
+        date = None if content["date"] is None else decodeValue(content["date"])
+        context = ValidationContext(file_path, content["sheet_name"], sheet)
+        context.sheet_exists = content["sheet_exists"]
+        result = (df, date, context)
+
+    if not profiling:
+        return result
+    measurement = content["measurement"]
+    measurement["name"] = file_path
+    return result, measurement
+
+def runWorkers(run_dir: str, path: str, workers: int =1, pool: Executor =None, lease_seconds: float =LEASE_SECONDS) -> int:
+    '''
+    Reads a run with workers processes of this host (1 -> in this
+    process), or with the processes of pool if one is given
+
+    Returns
+    -------
+        number of sheets read by this host
+    '''
+    if pool is not None and workers > 1:
+        futures = [pool.submit(workRun, run_dir, path, lease_seconds) for _ in range(workers)]
+        return sum(future.result() for future in futures)
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as own_pool:
+            return runWorkers(run_dir, path, workers, own_pool, lease_seconds)
+    return workRun(run_dir, path, lease_seconds)
+
+def readShared(
+        filepaths: List[str],
+        profiling: bool = False,
+        work_dir: str = None,
+        workers: int = 1,
+        pool: Executor = None,
+        lease_seconds: float =LEASE_SECONDS
+) -> Iterator[Any]:
+    '''
+    Reads sheets of one directory together with the workers
+    of other hosts, yielding them as fileIO.readSheets does
+    (see iterTimeForecasts)
+
+    Params
+    ------
+        filepaths: sheets to read, in filename order
+
+        profiling: also yield the measurement of each sheet,
+        taken by whichever worker parsed it
+
+        work_dir: directory shared with the other hosts
+        (required; never the forecast directory itself)
+
+        workers: number of processes of this host reading sheets
+
+        pool: if given, this host's sheets are read by
+        this pool of processes
+
+        lease_seconds: time a worker may hold a sheet
+        before other workers take it over
+    '''
+    if not work_dir:
+        raise ValueError("Shared ingestion needs a work directory (--ingest-dir)")
+    if not filepaths:
+        return
+    path = os.path.dirname(filepaths[0])
+    run_dir = startRun(work_dir, [os.path.basename(file_path) for file_path in filepaths], profiling)
+    print(f"Sharing {len(filepaths)} sheets through {run_dir}")
+    try:
+        parsed = runWorkers(run_dir, path, min(workers, len(filepaths)), pool, lease_seconds)
+        print(f"Read {parsed} sheets here, {len(filepaths) - parsed} on other hosts")
+        for index, file_path in enumerate(filepaths):
+            yield readResult(resultPath(run_dir, index), file_path, profiling)
+    finally:
+        finishRun(work_dir, run_dir)
+
+def shareTimeForecasts(
+        path: str,
+        work_dir: str,
+        workers: int = 1,
+        cache: ForecastCache = None,
+        profiler: Profiler = None,
+        pool: Executor = None,
+        lease_seconds: float =LEASE_SECONDS
+) -> Tuple[pd.DataFrame, dt.date, Dict[str, ValidationContext]]:
+    '''
+    Reads every time forecast sheet in a directory once, together
+    with the workers of other hosts (python ingest.py DIRECTORY)
+
+    Params
+    ------
+        path: path to a directory containing excel
+        sheets with bi-weekly time forecasts
+
+        work_dir: directory shared with the other hosts, writable
+        only by the accounts running the tools (not the forecast
+        directory, which every team member can write to)
+
+        workers: number of processes of this host reading sheets
+
+        cache: if given, sheets unchanged since they were last
+        read are taken from the cache, and not shared out
+
+        profiler: if given and enabled, records the time and
+        peak memory of parsing each sheet, on whichever host
+
+        pool: if given, this host's sheets are read by
+        this pool of processes (see retrieveTimeForecasts)
+
+        lease_seconds: time a worker may hold a sheet
+        before other workers take it over
+
+    Returns
+    -------
+        data, date, contexts: as retrieveTimeForecasts
+    '''
+    read = functools.partial(readShared, work_dir=work_dir, workers=workers, pool=pool, lease_seconds=lease_seconds)
+    return retrieveTimeForecasts(path, workers, cache, profiler, pool, read)
+
+def followRuns(path: str, work_dir: str, workers: int =1, lease_seconds: float =LEASE_SECONDS, wait: bool =False) -> int:
+    '''
+    Helps read the runs started on a directory from any host
+
+    Params
+    ------
+        path: time forecast directory, as this host sees it
+
+        work_dir: directory shared with the coordinator
+
+        workers: number of processes of this host reading sheets
+
+        lease_seconds: time a worker may hold a sheet
+
+        wait: keep waiting for new runs (until Ctrl+C)
+        instead of stopping when no run is being read
+
+    Returns
+    -------
+        number of sheets read
+    '''
+    finished = set()
+    parsed = 0
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        while True:
+            run_dir = currentRun(work_dir)
+            if run_dir is not None and run_dir not in finished:
+                print(f"Reading run {os.path.basename(run_dir)}...")
+                count = runWorkers(run_dir, path, workers, pool, lease_seconds)
+                print(f"Read {count} sheets of run {os.path.basename(run_dir)}")
+                parsed += count
+                finished.add(run_dir)
+            elif not wait:
+                if not finished:
+                    print(f"No run is being read in {work_dir}")
+                return parsed
+            time.sleep(POLL_SECONDS)
+    except KeyboardInterrupt:
+        return parsed
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Help read the time forecast sheets of a directory for a coordinator started with --shared-ingest on any host')
+    parser.add_argument('directory', metavar='DIRECTORY', help='Time forecast directory, as this host sees it')
+    parser.add_argument('--ingest-dir', required=True, help='Work directory shared with the coordinator, writable only by the accounts running the tools')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Number of processes used to read time forecast sheets (default: one per CPU)')
+    parser.add_argument('--lease-seconds', type=float, default=LEASE_SECONDS, help='Seconds a process may hold a sheet before another takes it over (default: 120)')
+    parser.add_argument('--wait', action='store_true', help='Keep waiting for new runs instead of stopping when no run is being read')
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.directory):
+        parser.error(f"Invalid time forcast directory path: {args.directory}")
+    followRuns(args.directory, args.ingest_dir, args.workers, args.lease_seconds, args.wait)
+    sys.exit()
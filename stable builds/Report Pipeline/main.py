@@ -0,0 +1,186 @@
+import os
+import sys
+import datetime as dt
+import argparse
+
+import pandas as pd
+import click
+
+from fileIO import FORECAST_LAYOUT, retrieveTimeForecasts, listTimeForecasts, getDefaultPaths, getContractCatalog, getTeamList
+from pipeline import writePmReport, writeTeamReport, writeValidationReport, archiveForecasts, writePeriodDiff, rollupPeriods, runJobs, flattenPaths
+from outputs import FORMATS, missingFormats
+from workbooks import BACKENDS, resolveBackend
+from archive import listPeriods
+from watch import watchForecasts
+from ingest import shareTimeForecasts
+from cache import ForecastCache, ReferenceCache, DEFAULT_CACHE_DIRECTORY, DEFAULT_REFERENCE_DIRECTORY
+from profiler import Profiler, DEFAULT_TOP_FILES
+
+# silence obnoxious false positive warning
+# default='warn'
+pd.options.mode.chained_assignment = None
+
+if __name__ == "__main__":
+    # The pipeline does the work of the PM Report Generator,
+    # the Team Report Generator and DataValidation in one run:
+    #   1. Read every time forecast sheet once, keeping the
+    #      rows both reports need and the cells validation
+    #      checks (fileIO.py), or with --shared-ingest together
+    #      with workers on other hosts (ingest.py)
+    #
+    #   2. Read ContractList.xlsx and TeamMembersList.xlsx once
+    #
+    #   3. Write the PM report, the Team report and the
+    #      validation report side by side, each in its own
+    #      process (pipeline.py)
+    #
+    #   4. Archive the filtered forecasts of the period,
+    #      for --diff to compare periods later (archive.py),
+    #      and its hours per contract, PM and discipline,
+    #      for --rollup to sum over quarters (rollup.py)
+    #
+    # With --watch, the PM and Team reports are instead
+    # rewritten whenever sheets are saved (watch.py)
+
+    # Parse command-line arguments
+    parser = argparse.ArgumentParser(description='Compile the PM report, the Team report and the validation report from one read of the time forecast excel sheets')
+    parser.add_argument('--week-begin', help='Correct week beginning date (MM/DD/YYYY) for validation (prompted for if not given)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Number of processes used to read time forecast sheets and write reports (default: one per CPU)')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIRECTORY, help='Directory where parsed time forecast sheets are cached between runs')
+    parser.add_argument('--cache-mb', type=int, default=256, help='Maximum size of the cache in megabytes')
+    parser.add_argument('--hash', action='store_true', help='Also compare file contents when deciding if a cached sheet or reference list is current')
+    parser.add_argument('--no-cache', action='store_true', help='Read every sheet and reference list from excel, ignoring the caches')
+    parser.add_argument('--watch', action='store_true', help='Keep running, rewriting the PM and Team reports whenever time forecast sheets are saved')
+    parser.add_argument('--interval', type=float, default=2, help='Seconds between checks of the time forecast directory in watch mode')
+    parser.add_argument('--debounce', type=float, default=5, help='Seconds the directory must stay unchanged before reports are rewritten in watch mode')
+    parser.add_argument('--archive-dir', help='Directory where the forecasts of each period are archived (default: "archive" in the report directory)')
+    parser.add_argument('--no-archive', action='store_true', help='Do not archive the forecasts of this period')
+    parser.add_argument('--diff', nargs=2, metavar=('OLD', 'NEW'), help='Instead of compiling reports, list the changes between two archived periods (week beginning dates, YYYY-MM-DD)')
+    parser.add_argument('--rollup', nargs='*', metavar='DIRECTORY', help='Instead of compiling reports, sum the hours of every archived period per contract, PM and discipline, first archiving the time forecast directories of any past periods given')
+    parser.add_argument('--rollup-by', choices=['period', 'quarter', 'year'], default='quarter', help='Rollup columns (default: quarter)')
+    parser.add_argument('--formats', nargs='+', choices=FORMATS, default=['xlsx'], help='Formats the PM and Team reports are written in, each from a single render (default: xlsx)')
+    parser.add_argument('--backend', choices=BACKENDS, default='auto', help='Library the xlsx reports are written with: xlsxwriter streams rows in constant memory, openpyxl builds each sheet in memory (default: xlsxwriter if installed)')
+    parser.add_argument('--shared-ingest', action='store_true', help='Read the sheets together with workers on other hosts started with "python ingest.py DIRECTORY --ingest-dir WORK" (see ingest.py)')
+    parser.add_argument('--ingest-dir', help='Work directory shared with those workers, writable only by the accounts running the tools (required with --shared-ingest)')
+    parser.add_argument('--profile', action='store_true', help='Measure the time and memory of each stage and sheet, written to a .profile.json file next to each report (runs slower)')
+    parser.add_argument('--profile-top', type=int, default=DEFAULT_TOP_FILES, help='Number of slowest sheets listed in the profiles (default: 10)')
+    args = parser.parse_args()
+    missing = missingFormats(args.formats)
+    if missing:
+        parser.error(f"{', '.join(missing)} output needs pyarrow (pip install pyarrow)")
+    try:
+        resolveBackend(args.backend)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.shared_ingest and not args.ingest_dir:
+        parser.error("--shared-ingest needs --ingest-dir, a work directory outside the time forecast directory")
+    profiler = Profiler(args.profile, args.profile_top)
+
+    DEFAULTS = r"Q:\EngineeringPlanning\ReportTools\defaults\config.json"
+    print(f"Fetching defaults from: {DEFAULTS}")
+    tf, out, CN_LIST_PATH, TEAM_LIST_PATH = getDefaultPaths(DEFAULTS)
+
+    SHEETS = click.prompt(
+        "Path to the directory containing time forecast excel sheets",
+        type=str,
+        default=tf
+        )
+    OUTPUT = click.prompt(
+        "Path to place the reports",
+        type=str,
+        default=out
+        )
+
+    ARCHIVE = args.archive_dir or os.path.join(OUTPUT, "archive")
+    if args.diff:
+        old_date, new_date = args.diff
+        try:
+            path = writePeriodDiff(ARCHIVE, old_date, new_date, OUTPUT)
+        except FileNotFoundError as e:
+            print(e)
+            print(f"Archived periods: {', '.join(listPeriods(ARCHIVE)) or 'none'}")
+            sys.exit(1)
+        print(f"\nWrote {path}")
+        sys.exit()
+
+    cache = None
+    if not args.no_cache:
+        cache = ForecastCache(args.cache_dir, FORECAST_LAYOUT, args.cache_mb * 1024 * 1024, args.hash)
+
+    reference_cache = ReferenceCache(None if args.no_cache else DEFAULT_REFERENCE_DIRECTORY, args.hash)
+
+    if args.rollup is not None:
+        path = rollupPeriods(
+            args.rollup,
+            ARCHIVE,
+            getContractCatalog(CN_LIST_PATH, reference_cache),
+            getTeamList(TEAM_LIST_PATH, reference_cache),
+            args.rollup_by,
+            OUTPUT,
+            args.workers,
+            cache
+        )
+        print(f"\nWrote {path}")
+        sys.exit()
+
+    if args.watch:
+        def refresh(forecasts, DATE):
+            # reference lists are read again if they were edited
+            catalog = getContractCatalog(CN_LIST_PATH, reference_cache)
+            team_list = getTeamList(TEAM_LIST_PATH, reference_cache)
+            jobs = [
+                (writePmReport, forecasts, catalog, team_list, DATE, OUTPUT, None, args.formats, args.backend),
+                (writeTeamReport, forecasts, catalog, team_list, DATE, OUTPUT, None, args.formats, args.backend),
+            ]
+            if not args.no_archive:
+                jobs.append((archiveForecasts, forecasts, DATE, ARCHIVE, catalog, team_list))
+            runJobs(jobs, args.workers)
+
+        watchForecasts(SHEETS, refresh, args.workers, cache, args.interval, args.debounce)
+        sys.exit()
+
+    user_input = args.week_begin
+    while True:
+        if user_input is None:
+            user_input = input("Enter the correct week beginning date (MM/DD/YYYY): ")
+
+        try:
+            # Parse the input date
+            week_begin = dt.datetime.strptime(user_input, "%m/%d/%Y")
+        except ValueError:
+            print("Invalid date format. Please use the format month/day/year.")
+            user_input = None
+            continue
+        break
+
+    print(f"You entered: {week_begin}")
+
+    # stages shared by every report; each report's profile
+    # adds its own stages to these (see writePmReport)
+    with profiler.stage("ingest"):
+        if args.shared_ingest:
+            forecasts, DATE, contexts = shareTimeForecasts(SHEETS, args.ingest_dir, args.workers, cache, profiler)
+        else:
+            forecasts, DATE, contexts = retrieveTimeForecasts(SHEETS, args.workers, cache, profiler)
+    with profiler.stage("reference lists"):
+        catalog = getContractCatalog(CN_LIST_PATH, reference_cache)
+        team_list = getTeamList(TEAM_LIST_PATH, reference_cache)
+
+    current_time = dt.datetime.now().strftime("%Y-%m-%d--%H-%M-%S")
+
+    jobs = [
+        (writePmReport, forecasts, catalog, team_list, DATE, OUTPUT, profiler, args.formats, args.backend),
+        (writeTeamReport, forecasts, catalog, team_list, DATE, OUTPUT, profiler, args.formats, args.backend),
+        (writeValidationReport, listTimeForecasts(SHEETS), contexts, week_begin, catalog, team_list, OUTPUT, current_time, profiler),
+    ]
+    if not args.no_archive:
+        jobs.append((archiveForecasts, forecasts, DATE, ARCHIVE, catalog, team_list))
+
+    # each report is written by its own process,
+    # from the data read above
+    paths = flattenPaths(runJobs(jobs, args.workers))
+
+    print()
+    for path in paths:
+        print(f"Wrote {path}")
+    print("Reports compiled successfully!")
@@ -0,0 +1,201 @@
+'''
+This module provides the schema time forecasts
+are typed with when read, a function to filter
+out contract entries which have no hours
+recorded to either of their 2 weeks, and an
+index for reading the filtered entries back
+in blocks (e.g. one person's week 1) when
+printing reports
+'''
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+WEEKDAYS = [
+    'monday',
+    'tuesday',
+    'wednesday',
+    'thursday',
+    'friday'
+]
+
+# columns held as categories, so sorting, grouping
+# and matching them compares integer codes
+CATEGORY_COLUMNS = ['name', 'contract']
+HOUR_COLUMNS = WEEKDAYS + ['roll_up_hours', 'roll_up_percent']
+
+def categorize(column: pd.Series) -> pd.Series:
+    '''
+    A column as a categorical whose categories are its
+    values in sorted order, so sorting by the codes
+    sorts by the values (missing values stay missing)
+    '''
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        return column
+    # factorize also sorts columns mixing numbers and text
+    codes, uniques = pd.factorize(column, sort=True)
+    return pd.Series(
+        pd.Categorical.from_codes(codes, categories=uniques),
+        index=column.index,
+        name=column.name
+    )
+
+def addCategory(column: pd.Series, value: Any) -> pd.Series:
+    '''A categorical column which can also hold value (e.g. "none" filled in for NaN)'''
+    if isinstance(column.dtype, pd.CategoricalDtype) and value not in column.cat.categories:
+        return column.cat.add_categories([value])
+    return column
+
+def applySchema(df: pd.DataFrame) -> pd.DataFrame:
+    '''
+    Types combined time forecasts compactly: the name and
+    contract columns as categories, week as a nullable
+    8-bit integer, and the hours as float64 where every
+    entry of a column is a number (a column with text in
+    it is kept as written, so the reports show the text)
+
+    Params
+    ------
+        df: forecasts of all sheets, as read (see excelToDataframe)
+
+    Returns
+    -------
+        the forecasts with the same values and columns
+    '''
+    df = df.copy()
+    for column in CATEGORY_COLUMNS:
+        if column in df.columns:
+            df[column] = categorize(df[column])
+
+    if 'week' in df.columns:
+        df['week'] = df['week'].astype('Int8')
+
+    for column in HOUR_COLUMNS:
+        if column in df.columns and df[column].dtype == object:
+            numbers = pd.to_numeric(df[column], errors='coerce')
+            if numbers.notna().sum() == df[column].notna().sum():
+                df[column] = numbers.astype('float64')
+
+    return df
+
+def filterNaNs(df: pd.DataFrame, how: str ='both') -> pd.DataFrame:
+    '''
+    Filter for identifying and dropping
+    contract rows where no hours have been
+    entered for both weeks 1 & 2
+
+    Params
+    ------
+        df: dataframe version of consolidated
+        excel time forecasts
+
+        how: 'both' -> drop a person's contract only if
+        all weekdays are empty in both weeks;
+        'week' -> drop each week of a contract
+        on its own when its weekdays are empty
+
+    Returns
+    -------
+        a dataframe with contract rows without
+        hours dropped, ordered by contract then
+        name (rows of one person's contract keep
+        their original order)
+    '''
+    if how not in ('both', 'week'):
+        raise ValueError(f"how must be 'both' or 'week', not {how!r}")
+
+    keys = [df['contract'], df['name']]
+    if how == 'week':
+        keys.append(df['week'])
+
+    # a row counts if any weekday has hours;
+    # keep every row of a group where one row counts
+    has_hours = df[WEEKDAYS].notna().any(axis=1)
+    keep = has_hours.groupby(keys, dropna=False, sort=False, observed=True).transform('any')
+
+    # rows without a contract or name cannot be grouped
+    keep &= df['contract'].notna() & df['name'].notna()
+    data = df[keep.to_numpy()]
+
+    # sort codes rather than values so contracts
+    # mixing numbers and text still sort
+    contract_codes, _ = pd.factorize(data['contract'], sort=True)
+    name_codes, _ = pd.factorize(data['name'], sort=True)
+    order = np.lexsort((name_codes, contract_codes))
+
+    return data.iloc[order].reset_index(drop=True)
+
+class BlockIndex:
+    def __init__(self, df: pd.DataFrame, keys: Sequence[str]):
+        '''
+        Initialize a BlockIndex object.
+
+        Sorts the dataframe once so that the rows sharing any
+        leading part of the keys (e.g. a discipline, a person
+        within it, one week of that person) are contiguous,
+        then records where each of those blocks starts and stops.
+        Blocks keep the order in which they first appear in df,
+        and rows keep their order within a block. Rows with a
+        missing key are left out.
+
+        Parameters:
+        - df (pd.DataFrame): The rows to index.
+        - keys (Sequence[str]): Columns to index by, outermost first
+          (e.g. ["group", "name", "week"]).
+        '''
+        self.keys = list(keys)
+        df = df[df[self.keys].notna().all(axis=1).to_numpy()]
+
+        # number each block of every level in order of first appearance
+        codes = [
+            df.groupby(self.keys[:level], sort=False, observed=True).ngroup().to_numpy()
+            for level in range(1, len(self.keys) + 1)
+        ]
+        order = np.lexsort(codes[::-1])
+        self.frame = df.iloc[order]
+
+        self._offsets: Dict[Tuple, Tuple[int, int]] = {}
+        self._children: Dict[Tuple, List[Any]] = {(): []}
+        key_values = [self.frame[key].to_numpy() for key in self.keys]
+        for level, level_codes in enumerate(codes, 1):
+            level_codes = level_codes[order]
+            if not len(level_codes):
+                break
+            starts = np.flatnonzero(np.r_[True, level_codes[1:] != level_codes[:-1]])
+            stops = np.r_[starts[1:], len(level_codes)]
+            for start, stop in zip(starts, stops):
+                key = tuple(values[start] for values in key_values[:level])
+                self._offsets[key] = (start, stop)
+                self._children.setdefault(key[:-1], []).append(key[-1])
+
+    def __contains__(self, key: Any) -> bool:
+        return self._key(key) in self._offsets
+
+    def _key(self, key: Any) -> Tuple:
+        return key if isinstance(key, tuple) else (key,)
+
+    def span(self, *key: Any) -> Tuple[int, int]:
+        '''
+        Returns the (start, stop) positions in self.frame
+        of the rows matching the leading keys given.
+        Missing blocks are returned as (0, 0).
+        '''
+        return self._offsets.get(key, (0, 0))
+
+    def block(self, *key: Any) -> pd.DataFrame:
+        '''
+        Returns the rows matching the leading keys given,
+        e.g. block("SE", "Jack Grigor", 1). Missing blocks
+        are returned as an empty dataframe.
+        '''
+        start, stop = self.span(*key)
+        return self.frame.iloc[start:stop]
+
+    def entities(self, *key: Any) -> List[Any]:
+        '''
+        Returns the values of the next key within a block,
+        in order of first appearance, e.g. entities("SE")
+        lists the names in discipline SE.
+        '''
+        return list(self._children.get(key, []))
@@ -0,0 +1,320 @@
+'''
+The module provides the outputs of the report
+pipeline: the PM report, the Team report and the
+validation report, each written from data which
+has already been read (see fileIO.py), so they can
+run side by side in separate processes
+'''
+import os
+import datetime as dt
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+import pandas as pd
+
+from manipulate import filterNaNs
+from workbooks import savePlan
+from outputs import writeOutputs
+import pmReport
+import teamReport
+from fileIO import retrieveTimeForecasts, pmForecasts, teamForecasts
+from validate import validateSheet, writeReport
+from validationContext import ValidationContext
+from contractCatalog import ContractCatalog
+from nameIndex import NameIndex
+from cache import ForecastCache
+from profiler import Profiler
+from watch import scanForecasts
+from rollup import aggregatePeriod, savePeriodAggregates, loadAggregates, rollup, directoryStamp, readManifest, writeManifest, writeRollup
+from archive import savePeriod, loadPeriod, diffPeriods, formatDiff, KEY_COLUMNS, ALLOCATION_COLUMNS, MILESTONE_COLUMNS
+
+def writePmReport(
+        forecasts: pd.DataFrame,
+        catalog: ContractCatalog,
+        team_list: pd.DataFrame,
+        DATE: dt.date,
+        OUTPUT: str,
+        profiler: Profiler =None,
+        formats: Sequence[str] =("xlsx",),
+        backend: str ="auto"
+) -> List[str]:
+    '''
+    Writes PM_Report_for_<DATE> in each format (.xlsx, .csv, ...)
+
+    Params
+    ------
+        forecasts: forecasts of all sheets (see retrieveTimeForecasts)
+
+        catalog: contracts of ContractList.xlsx (see getContractCatalog)
+
+        team_list: TeamMembersList.xlsx (see getTeamList)
+
+        DATE: week beginning date of the forecasts
+
+        OUTPUT: directory the report is placed in
+
+        profiler: if given and enabled, the stages of the report are
+        added to a copy of it and written next to the report
+
+        formats: any of outputs.FORMATS, written from a single render
+
+        backend: library the xlsx report is written with (see workbooks.py)
+
+    Returns
+    -------
+        paths of the report, one per format
+    '''
+    profiler = Profiler(False) if profiler is None else profiler.copy()
+    with profiler.stage("filter"):
+        forecasts = filterNaNs(pmForecasts(forecasts))
+    with profiler.stage("merge"):
+        contracts_with_pm = pmReport.prepareReport(forecasts, catalog)
+    with profiler.stage("render"):
+        plan = pmReport.planReport(contracts_with_pm, catalog, team_list, DATE)
+
+    return saveReport(plan, OUTPUT + "/PM_Report_for_" + str(DATE), profiler, formats, backend)
+
+def writeTeamReport(
+        forecasts: pd.DataFrame,
+        catalog: ContractCatalog,
+        team_list: pd.DataFrame,
+        DATE: dt.date,
+        OUTPUT: str,
+        profiler: Profiler =None,
+        formats: Sequence[str] =("xlsx",),
+        backend: str ="auto"
+) -> List[str]:
+    '''
+    Writes Team_Report_for_<DATE> in each format (.xlsx, .csv, ...)
+
+    Params
+    ------
+        see writePmReport
+
+    Returns
+    -------
+        paths of the report, one per format
+    '''
+    profiler = Profiler(False) if profiler is None else profiler.copy()
+    with profiler.stage("filter"):
+        forecasts = filterNaNs(teamForecasts(forecasts))
+    with profiler.stage("merge"):
+        forecasts, disciplines = teamReport.prepareReport(forecasts, catalog, team_list)
+    with profiler.stage("render"):
+        plan = teamReport.planReport(forecasts, disciplines, team_list, DATE)
+
+    return saveReport(plan, OUTPUT + "/Team_Report_for_" + str(DATE), profiler, formats, backend)
+
+def writeValidationReport(
+        filepaths: List[str],
+        contexts: Dict[str, ValidationContext],
+        week_begin: dt.datetime,
+        catalog: ContractCatalog,
+        team_list: pd.DataFrame,
+        OUTPUT: str,
+        current_time: str,
+        profiler: Profiler =None,
+        DATE: dt.date =None
+) -> str:
+    '''
+    Writes validation_report_<current_time>.txt, or
+    validation_report_for_<DATE>_<current_time>.txt when
+    the week beginning date of the forecasts is given
+
+    Params
+    ------
+        filepaths: every time forecast sheet, in filename order
+
+        contexts: validation context of each sheet which was read
+        (see retrieveTimeForecasts). Sheets without one, such as
+        workbooks missing the Plan sheet, are read again here
+
+        week_begin: correct week beginning date
+
+        catalog, team_list, OUTPUT: see writePmReport
+
+        current_time: time the report was generated
+
+        profiler: see writePmReport
+
+        DATE: week beginning date of the forecasts, so reports
+        of several periods written at once have distinct names
+
+    Returns
+    -------
+        path of the report
+    '''
+    names = NameIndex(team_list["name"])
+
+    results = (
+        validateSheet(file_path, week_begin, names, catalog, contexts.get(file_path))
+        for file_path in filepaths
+    )
+
+    profiler = Profiler(False) if profiler is None else profiler.copy()
+    period = "" if DATE is None else f"for_{DATE}_"
+    path = os.path.join(OUTPUT, f"validation_report_{period}{current_time}.txt")
+    with profiler.stage("validate"):
+        with open(path, 'w', encoding='UTF-8') as file:
+            writeReport(file, results, week_begin, names, current_time)
+    profiler.write(path)
+    return path
+
+def archiveForecasts(
+        forecasts: pd.DataFrame,
+        DATE: dt.date,
+        directory: str,
+        catalog: ContractCatalog,
+        team_list: pd.DataFrame
+) -> str:
+    '''
+    Archives the filtered forecasts of this period (see archive.py),
+    along with its hours per contract, manager and discipline
+    (see rollup.py)
+
+    Params
+    ------
+        forecasts: forecasts of all sheets (see retrieveTimeForecasts)
+
+        DATE: week beginning date of the forecasts
+
+        directory: root directory of the archive
+
+        catalog, team_list: see writePmReport
+
+    Returns
+    -------
+        path of the archived period
+    '''
+    forecasts = filterNaNs(teamForecasts(forecasts))
+    savePeriodAggregates(aggregatePeriod(forecasts, catalog, team_list), DATE, directory)
+    return savePeriod(forecasts, DATE, directory)
+
+def rollupPeriods(
+        directories: List[str],
+        archive: str,
+        catalog: ContractCatalog,
+        team_list: pd.DataFrame,
+        by: str,
+        OUTPUT: str,
+        workers: int =1,
+        cache: ForecastCache =None
+) -> str:
+    '''
+    Writes Utilization_Rollup_by_<by>_<time>.xlsx, the hours of every
+    archived period summed per contract, manager and discipline.
+
+    Params
+    ------
+        directories: forecast directories of past periods to add to the
+        archive first. Directories rolled up before are only read again
+        if a sheet in them was added, removed or saved since
+
+        archive: root directory of the archive
+
+        catalog, team_list: see writePmReport
+
+        by: "period", "quarter" or "year"
+
+        OUTPUT: directory the rollup is placed in
+
+        workers, cache: see retrieveTimeForecasts
+
+    Returns
+    -------
+        path of the rollup
+    '''
+    manifest = readManifest(archive)
+    for directory in directories:
+        directory = os.path.abspath(directory)
+        if not os.path.isdir(directory):
+            print(f"Invalid time forcast directory path: {directory}")
+            continue
+        stamp = directoryStamp(scanForecasts(directory))
+        if manifest.get(directory, {}).get("stamp") == stamp:
+            print(f"Up to date: {directory}")
+            continue
+
+        print(f"Rolling up {directory}...")
+        forecasts, DATE, _ = retrieveTimeForecasts(directory, workers, cache)
+        if DATE is None:
+            print(f"No time forecasts in {directory}")
+            continue
+        archiveForecasts(forecasts, DATE, archive, catalog, team_list)
+        manifest[directory] = {"stamp": stamp, "period": str(DATE)}
+        writeManifest(archive, manifest)
+
+    aggregates = loadAggregates(archive, catalog, team_list)
+    print(f"Summing {len(aggregates['period'].unique())} periods by {by}...")
+    tables = rollup(aggregates, by)
+
+    current_time = dt.datetime.now().strftime("%Y-%m-%d--%H-%M-%S")
+    path = os.path.join(OUTPUT, f"Utilization_Rollup_by_{by}_{current_time}.xlsx")
+    writeRollup(tables, path)
+    return path
+
+def writePeriodDiff(directory: str, old_date: str, new_date: str, OUTPUT: str) -> str:
+    '''
+    Writes period_diff_<old_date>_to_<new_date>.txt, listing
+    who changed which allocations and milestones between two
+    archived periods (dates as YYYY-MM-DD)
+
+    Returns
+    -------
+        path of the report
+    '''
+    columns = ["key"] + KEY_COLUMNS + ALLOCATION_COLUMNS + MILESTONE_COLUMNS
+    diff = diffPeriods(
+        loadPeriod(directory, old_date, columns),
+        loadPeriod(directory, new_date, columns)
+    )
+    report = formatDiff(diff, old_date, new_date)
+    print(report)
+
+    path = os.path.join(OUTPUT, f"period_diff_{old_date}_to_{new_date}.txt")
+    with open(path, 'w', encoding='UTF-8') as file:
+        file.write(report)
+    return path
+
+def saveReport(plan, base_path: str, profiler: Profiler =None, formats: Sequence[str] =("xlsx",), backend: str ="auto") -> List[str]:
+    '''
+    Writes a render plan to base_path.<format> for each format:
+    xlsx to the "Report" sheet of a new workbook (see workbooks.py),
+    the others without building a workbook (see outputs.py). The
+    profile, if any, is written next to the first. Returns the
+    paths written
+    '''
+    profiler = profiler or Profiler(False)
+    paths = []
+    for output_format in formats:
+        if output_format == "xlsx":
+            paths.append(savePlan(plan, base_path + ".xlsx", backend, profiler))
+        else:
+            paths += writeOutputs(plan, base_path, [output_format], profiler)
+
+    if paths:
+        profiler.write(paths[0])
+    return paths
+
+def flattenPaths(results: Sequence[Any]) -> List[str]:
+    '''paths returned by report jobs, some of which return a list of paths'''
+    paths = []
+    for result in results:
+        paths += result if isinstance(result, list) else [result]
+    return paths
+
+def runJobs(jobs: Sequence[Tuple[Callable[..., Any], ...]], workers: int =1, pool: Executor =None) -> List[Any]:
+    '''
+    Runs report jobs, each given as (function, *arguments),
+    in their own processes when workers > 1, and returns
+    their results in the order given. A pool which is
+    given is used, and left running, in place of a new one
+    '''
+    if pool is not None and len(jobs) > 1:
+        futures = [pool.submit(*job) for job in jobs]
+        return [future.result() for future in futures]
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            futures = [pool.submit(*job) for job in jobs]
+            return [future.result() for future in futures]
+    return [job[0](*job[1:]) for job in jobs]
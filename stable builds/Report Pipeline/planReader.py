@@ -0,0 +1,245 @@
+'''
+The module provides a reader for the top of
+a worksheet in an .xlsx/.xlsm workbook which
+streams the sheet XML straight out of the zip,
+decoding only the rows and columns asked for
+and ignoring the rest of the workbook (VBA
+project, other sheets, styles, ...)
+'''
+import re
+import zipfile
+import warnings
+import datetime as dt
+import posixpath
+import xml.etree.ElementTree as ET
+from typing import Dict, Iterable, List, Tuple, Any
+
+import numpy as np
+import pandas as pd
+from openpyxl.utils.datetime import from_excel, CALENDAR_WINDOWS_1900, CALENDAR_MAC_1904
+
+REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+
+# version of what a sheet is read as (this reader and
+# fileIO.excelToDataframe); bump it with any change to
+# the values read so cached sheets are read again
+READER_VERSION = 1
+
+# strings pd.read_excel treats as missing by default,
+# kept here so both readers produce the same values
+NA_STRINGS = {
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan",
+    "1.#IND", "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a",
+    "nan", "null"
+}
+
+_CELL_REF = re.compile(r"([A-Z]+)(\d+)")
+
+def _localName(tag: str) -> str:
+    '''Tag without its namespace, so transitional and strict files both work'''
+    return tag.rsplit('}', 1)[-1]
+
+def columnIndex(letters: str) -> int:
+    '''Converts a column label (e.g. "AC") to a 0-indexed column number'''
+    idx = 0
+    for letter in letters:
+        idx = idx * 26 + ord(letter) - ord('A') + 1
+    return idx - 1
+
+def _resolve(base: str, target: str) -> str:
+    '''Resolves a relationship target to a path inside the zip'''
+    if target.startswith('/'):
+        return target[1:]
+    return posixpath.normpath(posixpath.join(posixpath.dirname(base), target))
+
+def _locateSheet(archive: zipfile.ZipFile, sheet_name: str) -> Tuple[str, str, bool]:
+    '''
+    Finds the XML part holding a sheet.
+
+    Returns
+    -------
+        sheet_path: zip path of the worksheet
+        strings_path: zip path of the shared strings (None if absent)
+        date1904: True if the workbook uses the 1904 date system
+    '''
+    workbook = ET.fromstring(archive.read("xl/workbook.xml"))
+    date1904 = False
+    rel_id = None
+    for elem in workbook.iter():
+        tag = _localName(elem.tag)
+        if tag == "workbookPr":
+            date1904 = elem.get("date1904", "0").lower() in ("1", "true")
+        elif tag == "sheet" and elem.get("name") == sheet_name:
+            rel_id = elem.get(f"{{{REL_NS}}}id")
+
+    if rel_id is None:
+        raise ValueError(f"Worksheet named '{sheet_name}' not found")
+
+    sheet_path = None
+    strings_path = None
+    rels = ET.fromstring(archive.read("xl/_rels/workbook.xml.rels"))
+    for rel in rels:
+        if rel.get("Id") == rel_id:
+            sheet_path = _resolve("xl/workbook.xml", rel.get("Target"))
+        elif rel.get("Type", "").endswith("/sharedStrings"):
+            strings_path = _resolve("xl/workbook.xml", rel.get("Target"))
+
+    return sheet_path, strings_path, date1904
+
+def _text(elem: ET.Element) -> str:
+    '''Text of a string item, joining rich text runs and skipping phonetic hints'''
+    if elem is None:
+        return ""
+    parts = []
+    for child in elem:
+        tag = _localName(child.tag)
+        if tag == "t":
+            parts.append(child.text or "")
+        elif tag == "r":
+            parts.extend(t.text or "" for t in child if _localName(t.tag) == "t")
+    return "".join(parts)
+
+def _sharedStrings(archive: zipfile.ZipFile, path: str, wanted: Iterable[int]) -> Dict[int, str]:
+    '''Decodes only the shared strings referenced by the cells that were read'''
+    wanted = set(wanted)
+    strings = {}
+    if not wanted or path is None:
+        return strings
+
+    last = max(wanted)
+    idx = 0
+    with archive.open(path) as stream:
+        for _, elem in ET.iterparse(stream, events=("end",)):
+            if _localName(elem.tag) != "si":
+                continue
+            if idx in wanted:
+                strings[idx] = _text(elem)
+            elem.clear()
+            if idx == last:
+                break
+            idx += 1
+    return strings
+
+def _convert(raw_type: str, raw: Any, strings: Dict[int, str]) -> Any:
+    '''Converts a raw cell the same way pd.read_excel does'''
+    if raw is None:
+        return np.nan
+    if raw_type == "s":
+        raw_type, raw = "str", strings.get(int(raw), "")
+    if raw_type in ("str", "inlineStr"):
+        return np.nan if raw in NA_STRINGS else raw
+    if raw_type == "b":
+        return raw == "1"
+    if raw_type == "e":
+        return np.nan
+    if raw_type == "d":
+        # ISO 8601 date, time or date and time, written by some
+        # exporters and by Excel's strict ISO mode
+        try:
+            return dt.datetime.fromisoformat(raw)
+        except ValueError:
+            try:
+                return dt.time.fromisoformat(raw)
+            except ValueError:
+                warnings.warn(f"Unreadable date cell {raw!r} read as empty")
+                return np.nan
+    if raw_type != "n":
+        warnings.warn(f"Unknown cell type {raw_type!r} read as empty")
+        return np.nan
+    value = float(raw)
+    if value.is_integer():
+        return int(value)
+    return value
+
+def readPlanSheet(
+        filepath: str,
+        max_row: int,
+        columns: Iterable[int],
+        date_cells: Iterable[Tuple[int, int]] =(),
+        sheet_name: str ="Plan"
+) -> pd.DataFrame:
+    '''
+    Reads the top of a worksheet into a dataframe laid out
+    like pd.read_excel(filepath, sheet_name, header=None),
+    i.e. df.iloc[5, 4] is cell E6.
+
+    Params
+    ------
+        filepath: .xlsx/.xlsm workbook
+
+        max_row: number of rows to read, reading
+        stops as soon as the sheet passes this row
+
+        columns: 0-indexed columns to decode,
+        all other columns are left as NaN
+
+        date_cells: 0-indexed (row, column) cells
+        holding dates, returned as datetimes
+
+        sheet_name: worksheet to read
+
+    Returns
+    -------
+        dataframe of max_row rows and as many columns
+        as the right-most column requested, with column
+        dtypes inferred from the cells read
+    '''
+    columns = sorted(set(columns))
+    wanted_columns = set(columns)
+    date_cells = set(date_cells)
+    grid: List[List[Any]] = [[np.nan] * (columns[-1] + 1) for _ in range(max_row)]
+
+    with zipfile.ZipFile(filepath) as archive:
+        sheet_path, strings_path, date1904 = _locateSheet(archive, sheet_name)
+
+        raw_cells = {}
+        row_idx = -1
+        col_idx = -1
+        with archive.open(sheet_path) as stream:
+            for event, elem in ET.iterparse(stream, events=("start", "end")):
+                tag = _localName(elem.tag)
+                if event == "start":
+                    if tag == "row":
+                        row_idx = int(elem.get("r", row_idx + 2)) - 1
+                        col_idx = -1
+                        if row_idx >= max_row:
+                            break
+                    continue
+
+                if tag == "c":
+                    ref = elem.get("r")
+                    if ref is not None:
+                        col_idx = columnIndex(_CELL_REF.match(ref).group(1))
+                    else:
+                        col_idx += 1
+
+                    if col_idx in wanted_columns:
+                        raw_type = elem.get("t", "n")
+                        raw = None
+                        for child in elem:
+                            child_tag = _localName(child.tag)
+                            if child_tag == "v":
+                                raw = child.text
+                            elif child_tag == "is":
+                                raw = _text(child)
+                        raw_cells[(row_idx, col_idx)] = (raw_type, raw)
+                    elem.clear()
+                elif tag == "row":
+                    elem.clear()
+                elif tag == "sheetData":
+                    break
+
+        strings = _sharedStrings(
+            archive,
+            strings_path,
+            (int(raw) for raw_type, raw in raw_cells.values() if raw_type == "s" and raw is not None)
+        )
+
+    epoch = CALENDAR_MAC_1904 if date1904 else CALENDAR_WINDOWS_1900
+    for (row, col), (raw_type, raw) in raw_cells.items():
+        value = _convert(raw_type, raw, strings)
+        if (row, col) in date_cells and isinstance(value, (int, float)) and not isinstance(value, bool):
+            value = from_excel(value, epoch)
+        grid[row][col] = value
+
+    return pd.DataFrame(grid, dtype=object).infer_objects()
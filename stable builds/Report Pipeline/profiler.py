@@ -0,0 +1,152 @@
+'''
+The module provides the --profile instrumentation:
+wall time, CPU time and tracemalloc peak of each
+stage of a report, and of each time forecast sheet
+parsed, written to a JSON sidecar next to the report
+'''
+import os
+import copy
+import json
+import time
+import datetime
+import tracemalloc
+import contextlib
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+DEFAULT_TOP_FILES = 10
+
+# measurements open in this process, outermost first.
+# Every stage starts by resetting the tracemalloc peak,
+# so the peak seen so far is first handed to the stages
+# it is nested in
+_open: List[Dict[str, Any]] = []
+
+def _foldPeak() -> None:
+    peak = tracemalloc.get_traced_memory()[1]
+    for measurement in _open:
+        measurement["peak"] = max(measurement["peak"], peak)
+
+@contextlib.contextmanager
+def measure(name: str) -> Iterator[Dict[str, Any]]:
+    '''
+    Measures the block it wraps. Starts tracemalloc
+    if it is not already tracing in this process.
+
+    Yields
+    ------
+        measurement: name, wall and cpu seconds and peak traced
+        bytes, filled in when the block ends
+    '''
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+    _foldPeak()
+    tracemalloc.reset_peak()
+
+    measurement = {"name": name, "wall": 0.0, "cpu": 0.0, "peak": 0}
+    _open.append(measurement)
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    try:
+        yield measurement
+    finally:
+        measurement["wall"] = time.perf_counter() - wall
+        measurement["cpu"] = time.process_time() - cpu
+        _foldPeak()
+        _open.remove(measurement)
+
+def timeParse(parse: Callable[[str], Any], file_path: str) -> Tuple[Any, Dict[str, Any]]:
+    '''
+    Runs parse(file_path) under measure, in whichever
+    process it is called from (see iterTimeForecasts)
+
+    Returns
+    -------
+        result of parse and its measurement
+    '''
+    with measure(file_path) as measurement:
+        result = parse(file_path)
+    return result, measurement
+
+class Profiler:
+    def __init__(self, enabled: bool =True, top_files: int =DEFAULT_TOP_FILES):
+        '''
+        Initialize a Profiler object.
+
+        Parameters:
+        - enabled (bool): Measure stages (default is True). A disabled profiler
+          runs every stage as it is and writes nothing.
+        - top_files (int): Number of slowest sheets listed in the sidecar (default is 10).
+        '''
+        self.enabled = enabled
+        self.top_files = top_files
+        self.stages: List[Dict[str, Any]] = []
+        self.files: List[Dict[str, Any]] = []
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        '''
+        Measures a stage of the report, e.g. "ingest" or "save".
+        A stage run more than once is listed once, with its
+        times added up and the highest of its peaks
+        '''
+        if not self.enabled:
+            yield
+            return
+        with measure(name) as measurement:
+            yield
+
+        for stage in self.stages:
+            if stage["name"] == name:
+                stage["wall"] += measurement["wall"]
+                stage["cpu"] += measurement["cpu"]
+                stage["peak"] = max(stage["peak"], measurement["peak"])
+                return
+        self.stages.append(measurement)
+
+    def addFile(self, measurement: Dict[str, Any]) -> None:
+        '''Records the measurement of one parsed sheet (see timeParse)'''
+        self.files.append(measurement)
+
+    def copy(self) -> 'Profiler':
+        '''Copy to add the stages of one report to, after the shared ones'''
+        return copy.deepcopy(self)
+
+    def summary(self, report_path: str) -> Dict[str, Any]:
+        '''Contents of the sidecar, times in seconds and peaks in megabytes'''
+        def row(measurement: Dict[str, Any], key: str) -> Dict[str, Any]:
+            return {
+                key: measurement["name"],
+                "wall_s": round(measurement["wall"], 4),
+                "cpu_s": round(measurement["cpu"], 4),
+                "peak_mb": round(measurement["peak"] / (1024 * 1024), 3),
+            }
+
+        slowest = sorted(self.files, key=lambda measurement: measurement["wall"], reverse=True)
+        return {
+            "report": os.path.basename(report_path),
+            "generated": datetime.datetime.now().isoformat(timespec="seconds"),
+            # cpu_s of a stage only counts this process; sheets
+            # parsed by worker processes are measured in "files"
+            "stages": [row(measurement, "stage") for measurement in self.stages],
+            "sheets_parsed": len(self.files),
+            "parse_wall_s": round(sum(measurement["wall"] for measurement in self.files), 4),
+            "parse_cpu_s": round(sum(measurement["cpu"] for measurement in self.files), 4),
+            "slowest_files": [row(measurement, "file") for measurement in slowest[:self.top_files]],
+        }
+
+    def write(self, report_path: str) -> str:
+        '''
+        Writes the sidecar of a report: <report>.profile.json
+        in the same directory
+
+        Returns
+        -------
+            path of the sidecar, or None if the profiler is disabled
+        '''
+        if not self.enabled:
+            return None
+        path = os.path.splitext(report_path)[0] + ".profile.json"
+        with open(path, 'w', encoding='UTF-8') as file:
+            json.dump(self.summary(report_path), file, indent=4)
+        print(f"Wrote profile {path}")
+        return path
@@ -0,0 +1,144 @@
+'''
+Asks a running report service (see service.py) for
+reports. Only the standard library and click are
+imported, so the client starts in a fraction of a
+second and the service does the work.
+
+    python reportClient.py [--reports pm team validation]
+
+Requests carry the token the service wrote when it
+started (see service.writeToken).
+'''
+import os
+import sys
+import json
+import argparse
+import urllib.request
+import urllib.error
+from typing import Any, Dict
+
+import click
+
+DEFAULT_URL = "http://127.0.0.1:8765"
+# as service.DEFAULT_TOKEN_FILE, without importing pandas
+DEFAULT_TOKEN_FILE = os.path.join(os.path.expanduser("~"), ".engineering_planning", "service_token")
+
+def readToken(path: str) -> str:
+    '''
+    Token written by the running service
+
+    Raises
+    ------
+        RuntimeError: if the service has not written one
+    '''
+    try:
+        with open(path, 'r', encoding='UTF-8') as file:
+            return file.read().strip()
+    except FileNotFoundError:
+        raise RuntimeError(f"No token in {path}. Is service.py running?") from None
+
+def callService(url: str, token: str, path: str, body: Dict[str, Any] =None, timeout: float =600) -> Dict[str, Any]:
+    '''
+    Sends a request to the report service
+
+    Params
+    ------
+        url: address of the service
+
+        token: token of the service (see readToken)
+
+        path: "/reports", "/reload", "/status" or "/shutdown"
+
+        body: JSON body of a POST request (None -> GET)
+
+        timeout: seconds to wait for the reports
+
+    Returns
+    -------
+        JSON response of the service
+
+    Raises
+    ------
+        RuntimeError: with the service's message if the request failed
+    '''
+    data = None if body is None else json.dumps(body).encode("utf-8")
+    request = urllib.request.Request(url + path, data=data, headers={
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {token}",
+    })
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return json.load(response)
+    except urllib.error.HTTPError as e:
+        raise RuntimeError(json.load(e).get("error", str(e))) from None
+
+def getDefaultPaths(config_file_path: str):
+    # as fileIO.getDefaultPaths, without importing pandas
+    try:
+        with open(config_file_path, 'r') as file:
+            directory_paths = json.load(file)
+            return directory_paths.get("time_forecast_directory", ""), directory_paths.get("report_directory", "")
+    except FileNotFoundError:
+        print(f"Config file '{config_file_path}' not found.")
+        return "", ""
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Compile reports with a running report service')
+    parser.add_argument('--url', default=DEFAULT_URL, help=f'Address of the report service (default: {DEFAULT_URL})')
+    parser.add_argument('--token-file', default=DEFAULT_TOKEN_FILE, help=f'Token file written by the report service (default: {DEFAULT_TOKEN_FILE})')
+    parser.add_argument('--reports', nargs='+', choices=['pm', 'team', 'validation'], default=['pm', 'team', 'validation'], help='Reports to compile (default: all)')
+    parser.add_argument('--formats', nargs='+', choices=['xlsx', 'csv', 'parquet', 'html'], default=['xlsx'], help='Formats the PM and Team reports are written in (default: xlsx)')
+    parser.add_argument('--archive', action='store_true', help='Also archive the forecasts of this period')
+    parser.add_argument('--status', action='store_true', help='Only show what the service holds in memory')
+    parser.add_argument('--reload', action='store_true', help='Only make the service read the reference lists again')
+    parser.add_argument('--shutdown', action='store_true', help='Only stop the service')
+    args = parser.parse_args()
+
+    try:
+        token = readToken(args.token_file)
+        if args.status or args.reload or args.shutdown:
+            if args.status:
+                print(json.dumps(callService(args.url, token, "/status"), indent=4))
+            if args.reload:
+                print(json.dumps(callService(args.url, token, "/reload", {}), indent=4))
+            if args.shutdown:
+                callService(args.url, token, "/shutdown", {})
+                print("Report service stopped")
+            sys.exit()
+
+        DEFAULTS = r"Q:\EngineeringPlanning\ReportTools\defaults\config.json"
+        print(f"Fetching defaults from: {DEFAULTS}")
+        tf, out = getDefaultPaths(DEFAULTS)
+
+        SHEETS = click.prompt(
+            "Path to the directory containing time forecast excel sheets",
+            type=str,
+            default=tf
+            )
+        OUTPUT = click.prompt(
+            "Path to place the reports",
+            type=str,
+            default=out
+            )
+        week_begin = None
+        if "validation" in args.reports:
+            week_begin = click.prompt("Enter the correct week beginning date (MM/DD/YYYY)", type=str)
+
+        result = callService(args.url, token, "/reports", {
+            "sheets": SHEETS,
+            "output": OUTPUT,
+            "reports": args.reports,
+            "week_begin": week_begin,
+            "archive": args.archive,
+            "formats": args.formats,
+        })
+    except urllib.error.URLError as e:
+        print(f"Could not reach the report service at {args.url} ({e.reason}). Is service.py running?")
+        sys.exit(1)
+    except RuntimeError as e:
+        print(f"The report service could not compile the reports: {e}")
+        sys.exit(1)
+
+    for path in result["paths"]:
+        print(f"Wrote {path}")
+    print(f"Reports compiled in {result['seconds']} s")
@@ -0,0 +1,182 @@
+'''
+The module provides utilization rollups over many
+periods. Hours per contract, program manager and
+discipline are aggregated once per period and kept
+next to the period's archived forecasts (see
+archive.py); quarter and year rollups then only sum
+those small tables instead of reading old sheets
+'''
+import os
+import json
+import hashlib
+import datetime as dt
+from typing import Dict
+
+import pandas as pd
+
+from manipulate import WEEKDAYS, addCategory
+from contractCatalog import ContractCatalog
+from archive import periodDirectory, listPeriods, loadPeriod, saveColumns, loadColumns
+
+AGGREGATES_FILE = "aggregates.npz"
+MANIFEST_FILE = "rollup_manifest.json"
+
+# dimension -> sheet name of the rollup workbook
+DIMENSIONS = {
+    "contract": "By Contract",
+    "program_mgr": "By PM",
+    "discipline": "By Discipline",
+}
+
+def aggregatePeriod(
+        forecasts: pd.DataFrame,
+        catalog: ContractCatalog,
+        team_list: pd.DataFrame
+) -> pd.DataFrame:
+    '''
+    Hours forecast in one period per contract, per program
+    manager and per discipline.
+
+    Params
+    ------
+        forecasts: filtered forecasts of the period
+
+        catalog: contracts of ContractList.xlsx (see getContractCatalog)
+
+        team_list: TeamMembersList.xlsx (see getTeamList)
+
+    Returns
+    -------
+        dimension, key and hours of every contract, program
+        manager and discipline with entries in the period.
+        Contracts without a manager and people without a
+        discipline are counted under "none"
+    '''
+    # hours are summed from the weekdays, both weeks together
+    hours = forecasts[WEEKDAYS].apply(pd.to_numeric, errors='coerce').sum(axis=1)
+
+    # name -> discipline, as in teamReport.prepareReport
+    disciplines = team_list.drop_duplicates('name').set_index('name')['group']
+
+    keys = {
+        "contract": forecasts['contract'],
+        # contract -> manager, as in pmReport.prepareReport
+        "program_mgr": forecasts['contract'].map(catalog.managers),
+        "discipline": forecasts['name'].map(disciplines),
+    }
+
+    tables = []
+    for dimension, key in keys.items():
+        totals = hours.groupby(addCategory(key, "none").fillna("none").to_numpy(), sort=False).sum()
+        tables.append(pd.DataFrame({
+            "dimension": dimension,
+            "key": totals.index.to_numpy(dtype=object),
+            "hours": totals.to_numpy(dtype=float),
+        }))
+    return pd.concat(tables, ignore_index=True)
+
+def savePeriodAggregates(aggregates: pd.DataFrame, DATE: dt.date, directory: str) -> str:
+    '''Stores the aggregates of a period in its archive partition'''
+    partition = periodDirectory(directory, DATE)
+    os.makedirs(partition, exist_ok=True)
+    path = os.path.join(partition, AGGREGATES_FILE)
+    saveColumns(path, {column: aggregates[column].to_numpy() for column in aggregates.columns})
+    return path
+
+def loadAggregates(
+        directory: str,
+        catalog: ContractCatalog,
+        team_list: pd.DataFrame
+) -> pd.DataFrame:
+    '''
+    Aggregates of every archived period, with a period column.
+    Periods archived before aggregates were kept are
+    aggregated (once) from their archived forecasts.
+    '''
+    tables = []
+    for period in listPeriods(directory):
+        path = os.path.join(periodDirectory(directory, period), AGGREGATES_FILE)
+        if not os.path.exists(path):
+            print(f"Aggregating archived period {period}...")
+            aggregates = aggregatePeriod(loadPeriod(directory, period), catalog, team_list)
+            savePeriodAggregates(aggregates, period, directory)
+        else:
+            aggregates = loadColumns(path)
+        tables.append(aggregates.assign(period=period))
+
+    if not tables:
+        return pd.DataFrame(columns=["dimension", "key", "hours", "period"])
+    return pd.concat(tables, ignore_index=True)
+
+def periodLabels(periods: pd.Series, by: str) -> pd.Series:
+    '''
+    Label of the rollup each period (week beginning date,
+    YYYY-MM-DD) falls in: "period", "quarter" (e.g. 2024 Q1)
+    or "year". A period belongs to the quarter it begins in.
+    '''
+    if by == "period":
+        return periods
+    dates = pd.to_datetime(periods)
+    if by == "quarter":
+        return dates.dt.year.astype(str) + " Q" + dates.dt.quarter.astype(str)
+    if by == "year":
+        return dates.dt.year.astype(str)
+    raise ValueError(f"by must be 'period', 'quarter' or 'year', not {by!r}")
+
+def rollup(aggregates: pd.DataFrame, by: str ='quarter') -> Dict[str, pd.DataFrame]:
+    '''
+    Sums period aggregates into one table per dimension.
+
+    Params
+    ------
+        aggregates: see loadAggregates
+
+        by: "period", "quarter" or "year"
+
+    Returns
+    -------
+        dimension -> hours with a row per key and a column
+        per rollup, plus a total column
+    '''
+    aggregates = aggregates.assign(
+        label=periodLabels(aggregates["period"], by).to_numpy(),
+        key=aggregates["key"].astype(str).to_numpy()
+    )
+    totals = aggregates.groupby(["dimension", "key", "label"], sort=True)["hours"].sum()
+
+    tables = {}
+    for dimension in DIMENSIONS:
+        if dimension in totals.index.get_level_values(0):
+            table = totals.loc[dimension].unstack("label", fill_value=0.0)
+        else:
+            table = pd.DataFrame(dtype=float)
+        table["Total"] = table.sum(axis=1)
+        table.index.name = dimension
+        tables[dimension] = table.sort_values("Total", ascending=False)
+    return tables
+
+def directoryStamp(stamps: Dict[str, tuple]) -> str:
+    '''Fingerprint of a forecast directory (see watch.scanForecasts)'''
+    return hashlib.sha1(repr(sorted(stamps.items())).encode("utf-8")).hexdigest()
+
+def readManifest(directory: str) -> Dict[str, dict]:
+    '''Forecast directories rolled up so far: path -> {"stamp", "period"}'''
+    try:
+        with open(os.path.join(directory, MANIFEST_FILE), 'r') as file:
+            return json.load(file)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+def writeManifest(directory: str, manifest: Dict[str, dict]) -> None:
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, MANIFEST_FILE)
+    with open(path + ".tmp", 'w') as file:
+        json.dump(manifest, file, indent=4)
+    os.replace(path + ".tmp", path)
+
+def writeRollup(tables: Dict[str, pd.DataFrame], path: str) -> None:
+    '''Writes the rollup tables to a workbook, one sheet per dimension'''
+    with pd.ExcelWriter(path, engine="openpyxl") as writer:
+        for dimension, table in tables.items():
+            table.to_excel(writer, sheet_name=DIMENSIONS[dimension])
+            writer.sheets[DIMENSIONS[dimension]].column_dimensions['A'].width = 24
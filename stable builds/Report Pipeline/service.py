@@ -0,0 +1,334 @@
+'''
+Resident report service: a local HTTP server which keeps
+the interpreter, the reference lists and every parsed
+time forecast sheet in memory between requests, so
+compiling reports after the first request only reads
+the sheets saved since (see watch.MemoryCache).
+
+    python service.py [--port 8765]
+
+Requests (JSON bodies, see reportClient.py) carry the token
+written to a file only the user can read when the service
+starts, as "Authorization: Bearer <token>":
+    GET  /status     sheets held, reference lists, uptime
+    POST /reports    {"sheets", "output", "reports", "week_begin", "archive", "formats"}
+    POST /reload     read the reference lists again if they were edited
+    POST /shutdown   stop the service
+
+The server only listens on localhost and handles one
+request at a time. Forecast and report directories must
+be inside the roots the service was started with
+(--sheets-root, --output-root; default the directories
+of config.json).
+'''
+import os
+import sys
+import json
+import time
+import hmac
+import secrets
+import datetime as dt
+import argparse
+import contextlib
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Dict, List, Sequence
+
+import pandas as pd
+
+from fileIO import FORECAST_LAYOUT, getDefaultPaths, getContractCatalog, getTeamList
+from batch import compileReports, REPORTS
+from outputs import FORMATS, missingFormats
+from watch import MemoryCache, scanForecasts
+from cache import ForecastCache, ReferenceCache, DEFAULT_CACHE_DIRECTORY, DEFAULT_REFERENCE_DIRECTORY
+
+# silence obnoxious false positive warning
+# default='warn'
+pd.options.mode.chained_assignment = None
+
+DEFAULT_PORT = 8765
+# read by reportClient.py, which has its own copy of the path
+DEFAULT_TOKEN_FILE = os.path.join(os.path.expanduser("~"), ".engineering_planning", "service_token")
+
+def writeToken(path: str) -> str:
+    '''
+    Writes a new random token to a file readable by this
+    user only (mode 0600; on Windows the user's profile
+    directory already is), replacing any earlier token
+
+    Returns
+    -------
+        the token
+    '''
+    token = secrets.token_urlsafe(32)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # created anew rather than reused, so a file (or link)
+    # left with other permissions is never written to
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(path)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, 'w', encoding='UTF-8') as file:
+        file.write(token)
+    return token
+
+def insideRoots(path: str, roots: Sequence[str]) -> bool:
+    '''True if path is one of the roots or inside one, after resolving links'''
+    path = os.path.normcase(os.path.realpath(path))
+    for root in roots:
+        root = os.path.normcase(os.path.realpath(root))
+        try:
+            if os.path.commonpath([root, path]) == root:
+                return True
+        except ValueError:
+            continue  # on another drive
+    return False
+
+class ReportService:
+    def __init__(self,
+                 CN_LIST_PATH: str,
+                 TEAM_LIST_PATH: str,
+                 workers: int =1,
+                 backing: ForecastCache =None,
+                 pool: Executor =None,
+                 reference_cache: ReferenceCache =None,
+                 sheet_roots: Sequence[str] =(),
+                 output_roots: Sequence[str] =()
+        ):
+        '''
+        Initialize a ReportService object.
+
+        Parameters:
+        - CN_LIST_PATH (str): Path to ContractList.xlsx.
+        - TEAM_LIST_PATH (str): Path to TeamMembersList.xlsx.
+        - workers (int): Number of processes used to read sheets and write reports.
+        - backing (ForecastCache): On-disk cache consulted for sheets not yet in memory (default is None).
+        - pool (Executor): Worker processes kept running between requests (default is None).
+        - reference_cache (ReferenceCache): Cache of the reference lists, checked before
+          every request so edited lists are picked up (default is an in-memory one).
+        - sheet_roots (Sequence[str]): Directories forecast directories must be in.
+        - output_roots (Sequence[str]): Directories reports may be written to.
+        '''
+        self.CN_LIST_PATH = CN_LIST_PATH
+        self.TEAM_LIST_PATH = TEAM_LIST_PATH
+        self.workers = workers
+        self.backing = backing
+        self.pool = pool
+        self.reference_cache = reference_cache or ReferenceCache(None)
+        self.sheet_roots: List[str] = [root for root in sheet_roots if root]
+        self.output_roots: List[str] = [root for root in output_roots if root]
+        self.started = time.time()
+        self.requests = 0
+        # forecast directory -> its parsed sheets
+        self.caches: Dict[str, MemoryCache] = {}
+        self.reload()
+
+    def reload(self) -> Dict[str, Any]:
+        '''Reads ContractList.xlsx and TeamMembersList.xlsx again if either was edited'''
+        self.catalog = getContractCatalog(self.CN_LIST_PATH, self.reference_cache)
+        self.team_list = getTeamList(self.TEAM_LIST_PATH, self.reference_cache)
+        self.checked = dt.datetime.now().isoformat(timespec="seconds")
+        return {"contracts": len(self.catalog), "team_members": len(self.team_list), "checked": self.checked}
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "uptime_s": round(time.time() - self.started, 1),
+            "requests": self.requests,
+            "reference_lists_checked": self.checked,
+            "directories": {SHEETS: len(cache) for SHEETS, cache in self.caches.items()},
+        }
+
+    def reports(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        '''
+        Compiles reports of one forecast directory (see batch.compileReports)
+
+        Params
+        ------
+            request: "sheets" (directory of time forecasts), "output"
+            (report directory), and optionally "reports" (any of "pm",
+            "team" and "validation", default all), "week_begin"
+            (MM/DD/YYYY, default the date read from the sheets),
+            "archive" (default false) and "formats" (formats of the
+            PM and Team reports, default ["xlsx"])
+
+        Returns
+        -------
+            paths written and seconds taken
+
+        Raises
+        ------
+            PermissionError: if the directories are not inside
+            the roots the service was started with
+        '''
+        start = time.perf_counter()
+        SHEETS = os.path.abspath(request["sheets"])
+        OUTPUT = os.path.abspath(request["output"])
+        if not insideRoots(SHEETS, self.sheet_roots):
+            raise PermissionError(f"{SHEETS} is not inside the forecast roots of the service ({', '.join(self.sheet_roots) or 'none configured'})")
+        if not insideRoots(OUTPUT, self.output_roots):
+            raise PermissionError(f"{OUTPUT} is not inside the report roots of the service ({', '.join(self.output_roots) or 'none configured'})")
+        reports = request.get("reports") or REPORTS
+        unknown = set(reports) - set(REPORTS)
+        if unknown:
+            raise ValueError(f"Unknown reports: {', '.join(sorted(unknown))}")
+
+        formats = request.get("formats") or ["xlsx"]
+        unknown = set(formats) - set(FORMATS)
+        if unknown:
+            raise ValueError(f"Unknown formats: {', '.join(sorted(unknown))}")
+        missing = missingFormats(formats)
+        if missing:
+            raise ValueError(f"{', '.join(missing)} output needs pyarrow installed where the service runs")
+
+        week_begin = None
+        if request.get("week_begin"):
+            week_begin = dt.datetime.strptime(request["week_begin"], "%m/%d/%Y")
+
+        archive = os.path.join(OUTPUT, "archive") if request.get("archive") else None
+
+        cache = self.caches.setdefault(SHEETS, MemoryCache(self.backing))
+        if os.path.isdir(SHEETS):
+            cache.forget(scanForecasts(SHEETS))
+
+        self.requests += 1
+        self.reload()
+        paths = compileReports(
+            SHEETS,
+            OUTPUT,
+            self.catalog,
+            self.team_list,
+            reports,
+            week_begin,
+            archive,
+            self.workers,
+            cache,
+            None,
+            self.pool,
+            formats
+        )
+        return {"paths": paths, "seconds": round(time.perf_counter() - start, 3)}
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    '''Routes requests carrying the server's token to its ReportService'''
+
+    def authorized(self) -> bool:
+        '''True if the request carries the token, otherwise responds 401'''
+        expected = f"Bearer {self.server.token}".encode("utf-8")
+        given = (self.headers.get("Authorization") or "").encode("utf-8")
+        if hmac.compare_digest(given, expected):
+            return True
+        self.respond(401, {"error": "Missing or wrong token, see the service's token file"})
+        return False
+
+    def do_GET(self) -> None:
+        if not self.authorized():
+            return
+        if self.path == "/status":
+            self.respond(200, self.server.service.status())
+        else:
+            self.respond(404, {"error": f"Unknown path {self.path}"})
+
+    def do_POST(self) -> None:
+        service = self.server.service
+        if not self.authorized():
+            return
+        # a web page can only send a JSON body after a
+        # CORS preflight, which this server never allows
+        content_type = (self.headers.get("Content-Type") or "").split(";")[0].strip().lower()
+        if content_type != "application/json":
+            self.respond(415, {"error": "Request bodies must be application/json"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            request = json.loads(self.rfile.read(length) or b"{}")
+            if self.path == "/reports":
+                self.respond(200, service.reports(request))
+            elif self.path == "/reload":
+                self.respond(200, service.reload())
+            elif self.path == "/shutdown":
+                self.respond(200, {"stopping": True})
+                self.server.stopping = True
+            else:
+                self.respond(404, {"error": f"Unknown path {self.path}"})
+        except PermissionError as e:
+            print(f"Request refused: {e}")
+            self.respond(403, {"error": str(e)})
+        except Exception as e:
+            # reported to the client, the service keeps running
+            print(f"Request failed: {e}")
+            self.respond(500, {"error": f"{type(e).__name__}: {e}"})
+
+    def respond(self, code: int, body: Dict[str, Any]) -> None:
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format: str, *args) -> None:
+        print(f"{dt.datetime.now():%H:%M:%S} {self.command} {self.path}")
+
+def serve(service: ReportService, port: int =DEFAULT_PORT, token_file: str =DEFAULT_TOKEN_FILE) -> None:
+    '''Serves requests on localhost until /shutdown or Ctrl+C, with a new token in token_file'''
+    server = HTTPServer(("127.0.0.1", port), ServiceHandler)
+    server.service = service
+    server.stopping = False
+    server.token = writeToken(token_file)
+    print(f"Report service listening on http://127.0.0.1:{port} (Ctrl+C to stop), token in {token_file}")
+    try:
+        while not server.stopping:
+            server.handle_request()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        # unless a newer service replaced it
+        with contextlib.suppress(OSError):
+            with open(token_file, 'r', encoding='UTF-8') as file:
+                current = file.read()
+            if current == server.token:
+                os.remove(token_file)
+    print("Report service stopped")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Keep reference lists and parsed time forecast sheets in memory and compile reports on request')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='Port on localhost to listen on (default: 8765)')
+    parser.add_argument('--config', default=r"Q:\EngineeringPlanning\ReportTools\defaults\config.json", help='Defaults file with the reference list paths')
+    parser.add_argument('--contracts', help='Path to ContractList.xlsx (default: from config.json)')
+    parser.add_argument('--team', help='Path to TeamMembersList.xlsx (default: from config.json)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Number of processes used to read time forecast sheets and write reports (default: one per CPU)')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIRECTORY, help='Directory where parsed time forecast sheets are cached between runs')
+    parser.add_argument('--cache-mb', type=int, default=256, help='Maximum size of the cache in megabytes')
+    parser.add_argument('--hash', action='store_true', help='Also compare file contents when deciding if a cached sheet or reference list is current')
+    parser.add_argument('--no-cache', action='store_true', help='Only keep parsed sheets and reference lists in memory, not on disk')
+    parser.add_argument('--token-file', default=DEFAULT_TOKEN_FILE, help=f'File the token clients must send is written to (default: {DEFAULT_TOKEN_FILE})')
+    parser.add_argument('--sheets-root', action='append', help='Directory time forecast directories must be in, may be given more than once (default: time_forecast_directory of config.json)')
+    parser.add_argument('--output-root', action='append', help='Directory reports may be written to, may be given more than once (default: report_directory of config.json)')
+    args = parser.parse_args()
+
+    print(f"Fetching defaults from: {args.config}")
+    tf, out, CN_LIST_PATH, TEAM_LIST_PATH = getDefaultPaths(args.config) or ("", "", "", "")
+    sheet_roots = args.sheets_root or [tf]
+    output_roots = args.output_root or [out]
+
+    backing = None
+    if not args.no_cache:
+        backing = ForecastCache(args.cache_dir, FORECAST_LAYOUT, args.cache_mb * 1024 * 1024, args.hash)
+    reference_cache = ReferenceCache(None if args.no_cache else DEFAULT_REFERENCE_DIRECTORY, args.hash)
+
+    # the pool is started once, so its processes
+    # have pandas and openpyxl imported already
+    pool = ProcessPoolExecutor(max_workers=args.workers) if args.workers > 1 else None
+    with pool or contextlib.nullcontext():
+        service = ReportService(
+            args.contracts or CN_LIST_PATH,
+            args.team or TEAM_LIST_PATH,
+            args.workers,
+            backing,
+            pool,
+            reference_cache,
+            sheet_roots,
+            output_roots
+        )
+        serve(service, args.port, args.token_file)
+    sys.exit()
@@ -0,0 +1,54 @@
+'''
+Contains tests to ensure the integrity 
+of time forecast excel sheets
+'''
+
+import datetime
+from typing import List
+
+import pandas as pd
+
+from validationContext import ValidationContext
+from contractCatalog import ContractCatalog
+from nameIndex import NameIndex
+
+def testContractValidity(series1: pd.Series, catalog: ContractCatalog) -> List[str]:
+    '''
+    Get a list of the contracts in a pandas Series
+    that are not present in ContractList.xlsx.
+
+    Parameters
+    ----------
+    - series1 (pd.Series): The contracts of a sheet.
+    - catalog (ContractCatalog): contracts of ContractList.xlsx
+
+    Returns
+    -------
+        contracts not found in the catalog
+    '''
+
+    return catalog.unknown(series1)
+
+def weekContractsMatch(context: ValidationContext, cn_week1: List) -> List[str]:
+    # column S, rows 18-31
+    cn_week2 = context.week2_contracts
+
+    # sorted (as text, so numbers and text mix) so reports do not depend on set order
+    return sorted(set(cn_week1) - set(cn_week2), key=str)
+
+
+
+def isValidName(name: str, names: NameIndex) -> bool:
+    '''True if name is in TeamMembersList.xlsx, ignoring case and spacing'''
+    return name in names
+
+def testSheetExistence(context: ValidationContext) -> bool:
+    ''''''
+    if context.sheet_exists:
+        return True
+    print('Sheet \"Plan\" does not exist')
+    return False
+
+def isCorrectDate(actual_date: datetime.datetime, date: datetime.datetime) -> bool:
+    ''''''
+    return date == actual_date
@@ -0,0 +1,250 @@
+'''
+This module runs the tests in tests.py against a
+single time forecast sheet and collects the results,
+so sheets can be validated in any order (or at the
+same time) and reported in filename order
+'''
+import os
+import datetime as dt
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Iterable, Iterator, List, Optional, TextIO
+
+from tests import testContractValidity, isValidName, testSheetExistence, isCorrectDate, weekContractsMatch
+from validationContext import ValidationContext
+from contractCatalog import ContractCatalog
+from nameIndex import NameIndex
+
+class Person:
+    def __init__(self, name="", forecast_date="", schedule_type="9/80", alternate_hours=None, contracts=None):
+        """
+        Initialize a Person object.
+
+        Parameters:
+        - name (str): The name of the person (default is an empty string).
+        - forecast_date (str): The time forecast date (e.g., "01/31/2024", default is an empty string).
+        - schedule_type (str): The schedule type ("9/80" or "40 hours", default is "9/80").
+        - alternate_hours (tuple): A tuple to record alternate 8 hours (e.g., (True, 1) for week 1, default is None).
+        - contracts (pd.Series): A pandas Series of contracts (default is None).
+        """
+        self.name = name
+        self.forecast_date = forecast_date
+        self.schedule_type = schedule_type
+        self.alternate_hours = alternate_hours
+        self.contracts = contracts
+
+    def __str__(self):
+        return f"Person(name={self.name}, forecast_date={self.forecast_date}, schedule_type={self.schedule_type}, alternate_hours={self.alternate_hours}, contracts={self.contracts})"
+
+class SheetResult:
+    def __init__(self, filename: str):
+        '''
+        Initialize a SheetResult object.
+
+        Parameters:
+        - filename (str): Name of the validated sheet.
+        '''
+        self.filename = filename
+        self.name: Optional[str] = None  # set when the name is valid
+        self.messages: List[str] = []     # every test result, for the console
+        self.failures: List[str] = []     # failures and warnings, for the report
+
+    def passed(self, message: str) -> None:
+        self.messages.append(message)
+
+    def failed(self, message: str) -> None:
+        self.messages.append(message)
+        self.failures.append(message)
+
+    def report(self) -> str:
+        '''Section of the validation report for this sheet ("" if every test passed)'''
+        if not self.failures:
+            return ""
+        return f"\n\nEvaluating {self.filename}..." + "".join('\n' + s for s in self.failures)
+
+def validateSheet(
+        file_path: str,
+        week_begin: dt.datetime,
+        names: NameIndex,
+        catalog: ContractCatalog,
+        context: Optional[ValidationContext] =None
+) -> SheetResult:
+    '''
+    Runs every test against one time forecast sheet.
+
+    Params
+    ------
+        file_path: path to the time forecast sheet
+
+        week_begin: correct week beginning date
+
+        names: names in TeamMembersList.xlsx
+
+        catalog: contracts of ContractList.xlsx
+
+        context: the sheet, if it has already been read
+        (else it is read from file_path)
+
+    Returns
+    -------
+        test results of the sheet
+    '''
+    result = SheetResult(os.path.basename(file_path))
+
+    # read every cell the tests need in one pass
+    if context is None:
+        context = ValidationContext(file_path)
+    if not testSheetExistence(context):
+        result.failed('FAILED: Sheet "Plan" does not exist')
+        return result
+
+    team_member = Person()
+    team_member.name = context.name
+    team_member.forecast_date = context.forecast_date
+
+    sch = context.schedule # 1 = 9/80, 2 = 40 hr
+    if (sch == 1):
+        team_member.schedule_type = "9/80"
+    else:
+        team_member.schedule_type = "40"
+
+    team_member.alternate_hours = context.alternate_hours
+    # column C, rows 18-31
+    team_member.contracts = context.week1_contracts
+
+    # Name testing
+    if isValidName(team_member.name, names):
+        result.passed("PASSED: Name Validity")
+        result.name = team_member.name
+    else:
+        error = f"FAILED: Name Validity, {team_member.name} is not in team member list!"
+        suggestions = names.suggest(team_member.name)
+        if suggestions:
+            error += f" Did you mean: {', '.join(suggestions)}?"
+        result.failed(error)
+
+    # Date testing
+    if isCorrectDate(week_begin, team_member.forecast_date):
+        result.passed("PASSED: Date Correctness")
+    else:
+        result.failed(f"FAILED: Date Correctness, {team_member.forecast_date.strftime('%Y-%m-%d')} != {week_begin.strftime('%Y-%m-%d')} (actual)!")
+
+    # Contract testing
+    if not team_member.contracts.empty:
+        mismatched_cn = weekContractsMatch(context, team_member.contracts)
+        if not mismatched_cn:
+            result.passed("PASSED: Week 1 == week 2 contracts")
+        else:
+            result.failed(f"FAILED: Week 1 != week 2 contracts, missing contracts: {mismatched_cn}")
+
+        xs = testContractValidity(team_member.contracts, catalog)
+        if (xs == []):
+            result.passed("PASSED: Contract Validity")
+        else:
+            s = "WARNING: Contracts included but not found in ContractList.xlsx:"
+            for x in xs:
+                s += '\n ' + str(x)
+            result.failed(s)
+    else:
+        result.failed(f"WARNING: {team_member.name} did not enter any contracts")
+
+    # Schedule testing
+    if team_member.schedule_type == "9/80":
+        if team_member.alternate_hours > 0:
+            result.passed("PASSED: 9/80 Alt Hours")
+        else:
+            result.failed(f"FAILED: 9/80 Alt Hours, {team_member.name} works 9/80 but entered 0 alt hours")
+
+    return result
+
+def listForecastSheets(path: str) -> List[str]:
+    '''Paths of the time forecast sheets in a directory, in filename order'''
+    filepaths = []
+    for filename in sorted(os.listdir(path)):
+        if filename.endswith(".xlsm"):
+            if (filename.startswith('~')):
+                print(f"Temporary file detected: {filename}")
+                continue
+            filepaths.append(os.path.join(path, filename))
+    return filepaths
+
+def validateSheets(
+        filepaths: List[str],
+        week_begin: dt.datetime,
+        names: NameIndex,
+        catalog: ContractCatalog,
+        workers: int =1
+) -> Iterator[SheetResult]:
+    '''
+    Validates time forecast sheets, yielding the results
+    in the order the sheets are given.
+
+    Params
+    ------
+        filepaths: paths to the time forecast sheets
+
+        week_begin, names, catalog: see validateSheet
+
+        workers: number of processes validating sheets
+        at the same time (1 -> one after another)
+    '''
+    validate = partial(validateSheet, week_begin=week_begin, names=names, catalog=catalog)
+
+    # map() hands results back in submission order,
+    # whichever sheet finishes first
+    pool = None
+    if workers > 1 and len(filepaths) > 1:
+        pool = ProcessPoolExecutor(max_workers=min(workers, len(filepaths)))
+        results = pool.map(validate, filepaths)
+    else:
+        results = map(validate, filepaths)
+
+    try:
+        yield from results
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+def writeReport(
+        file: TextIO,
+        results: Iterable[SheetResult],
+        week_begin: dt.datetime,
+        names: NameIndex,
+        current_time: str
+) -> None:
+    '''
+    Writes the validation report of a set of sheets,
+    printing every test result as it goes.
+
+    Params
+    ------
+        file: open report file
+
+        results: test results, in the order they are reported
+
+        week_begin: correct week beginning date
+
+        names: names in TeamMembersList.xlsx,
+        for the list of reports missing
+
+        current_time: time the report was generated
+    '''
+    header = f"Time Forecast Data Validation Report\nGENERATED: {current_time}\nFor week beginning: {week_begin}"
+    file.write(header)
+
+    present_names = []
+    for result in results:
+        print(f"\nEvaluating {result.filename}...")
+        for s in result.messages:
+            print(s)
+        if result.name is not None:
+            present_names.append(result.name)
+        file.write(result.report())
+
+    print("\nReports missing:")
+    error = "\n\nReports missing:"
+    for n in names.missing(present_names):
+        print(n)
+        error += '\n' + n
+
+    file.write(error)
@@ -0,0 +1,194 @@
+'''
+The module provides a watch mode which keeps the
+PM and Team reports up to date while people save
+their time forecasts: the forecast directory is
+polled, and once saving has settled only the
+sheets which changed are read again before the
+reports are regenerated
+'''
+import os
+import time
+import datetime as dt
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import pandas as pd
+
+from cache import ForecastCache
+from fileIO import retrieveTimeForecasts
+
+# (size, modification time) of a sheet
+Stamp = Tuple[int, int]
+
+def scanForecasts(path: str) -> Dict[str, Stamp]:
+    '''
+    Returns the stamp of every time forecast sheet in a
+    directory. Temporary files left open by Excel (~$...)
+    are skipped, as in listTimeForecasts, but quietly.
+    '''
+    stamps = {}
+    for filename in os.listdir(path):
+        if filename.endswith(".xlsm") and not filename.startswith('~'):
+            file_path = os.path.join(path, filename)
+            try:
+                stat = os.stat(file_path)
+            except FileNotFoundError:
+                continue  # removed since it was listed
+            stamps[file_path] = (stat.st_size, stat.st_mtime_ns)
+    return stamps
+
+def scanDirectory(path: str) -> Optional[Dict[str, Stamp]]:
+    '''scanForecasts, or None if the directory is missing or cannot be listed'''
+    if not os.path.isdir(path):
+        return None
+    try:
+        return scanForecasts(path)
+    except OSError:
+        return None
+
+class MemoryCache:
+    def __init__(self, backing: Optional[ForecastCache] =None):
+        '''
+        Initialize a MemoryCache object.
+
+        Keeps the result of reading each sheet in memory for as
+        long as the sheet is unchanged. Used in place of a
+        ForecastCache (see iterTimeForecasts), so a refresh only
+        reads the sheets saved since the last one.
+
+        Parameters:
+        - backing (ForecastCache): On-disk cache consulted for sheets
+          not yet in memory, and given every sheet read (default is None).
+        '''
+        self.backing = backing
+        self._entries: Dict[str, Tuple[Stamp, Any]] = {}
+
+    def _stamp(self, filepath: str) -> Optional[Stamp]:
+        try:
+            stat = os.stat(filepath)
+        except FileNotFoundError:
+            return None
+        return (stat.st_size, stat.st_mtime_ns)
+
+    def has(self, filepath: str) -> bool:
+        stamp = self._stamp(filepath)
+        if stamp is None:
+            return False
+        entry = self._entries.get(filepath)
+        if entry is not None and entry[0] == stamp:
+            return True
+        return self.backing is not None and self.backing.has(filepath)
+
+    def get(self, filepath: str) -> Any:
+        stamp = self._stamp(filepath)
+        if stamp is None:
+            return None
+        entry = self._entries.get(filepath)
+        if entry is not None and entry[0] == stamp:
+            return entry[1]
+        if self.backing is None:
+            return None
+        result = self.backing.get(filepath)
+        if result is not None:
+            self._entries[filepath] = (stamp, result)
+        return result
+
+    def put(self, filepath: str, result: Any) -> None:
+        if result is None:
+            # unreadable (e.g. mid-save), read again next time
+            self._entries.pop(filepath, None)
+            return
+        stamp = self._stamp(filepath)
+        if stamp is not None:
+            self._entries[filepath] = (stamp, result)
+        if self.backing is not None:
+            self.backing.put(filepath, result)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def forget(self, keep: Dict[str, Stamp]) -> None:
+        '''Drops the sheets which are no longer in the directory'''
+        for filepath in list(self._entries):
+            if filepath not in keep:
+                del self._entries[filepath]
+
+def watchForecasts(
+        path: str,
+        refresh: Callable[[pd.DataFrame, dt.date], None],
+        workers: int =1,
+        backing: Optional[ForecastCache] =None,
+        interval: float =2,
+        debounce: float =5
+) -> None:
+    '''
+    Regenerates reports whenever the time forecast sheets
+    in a directory change, until interrupted (Ctrl+C).
+
+    Params
+    ------
+        path: path to a directory containing excel
+        sheets with bi-weekly time forecasts
+
+        refresh: called with the forecasts and date
+        (see retrieveTimeForecasts) after every change
+
+        workers: number of processes used to read sheets
+
+        backing: on-disk cache of sheets, if any
+
+        interval: seconds between polls of the directory
+
+        debounce: seconds the directory must stay unchanged
+        before the reports are regenerated, so a sheet which
+        is still being saved is not read half-written
+    '''
+    cache = MemoryCache(backing)
+    seen = None
+    missing = False
+    try:
+        while True:
+            stamps = scanDirectory(path)
+            if stamps is None:
+                # e.g. the share is being remounted; retrieveTimeForecasts
+                # would exit, so wait for the directory to come back
+                if not missing:
+                    print(f"{path} is not available, waiting for it...")
+                missing = True
+                time.sleep(interval)
+                continue
+            missing = False
+
+            if stamps != seen:
+                if seen is not None:
+                    # wait for saving to settle
+                    while stamps is not None:
+                        time.sleep(debounce)
+                        settled = scanDirectory(path)
+                        if settled == stamps:
+                            break
+                        stamps = settled
+                    if stamps is None:
+                        continue
+
+                    changed = [os.path.basename(f) for f in stamps if seen.get(f) != stamps[f]]
+                    removed = [os.path.basename(f) for f in seen if f not in stamps]
+                    print(f"\nChanged: {', '.join(changed) or 'none'}; removed: {', '.join(removed) or 'none'}")
+
+                cache.forget(stamps)
+                try:
+                    forecasts, DATE, _ = retrieveTimeForecasts(path, workers, cache)
+                    refresh(forecasts, DATE)
+                    print(f"Reports refreshed at {dt.datetime.now():%H:%M:%S}, watching {path} (Ctrl+C to stop)...")
+                except Exception as e:
+                    # e.g. a report left open in excel; try again on the next change
+                    print(f"Could not refresh reports: {e}")
+                except SystemExit:
+                    # the directory went away after it was scanned
+                    if os.path.isdir(path):
+                        raise
+                    print(f"Could not refresh reports: {path} is not available")
+                seen = stamps
+
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        print("Stopped watching")
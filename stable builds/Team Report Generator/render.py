@@ -0,0 +1,204 @@
+'''
+The module provides a render plan: every value,
+merged range and style of a report worksheet,
+worked out before anything is written to excel,
+and a function which writes a finished plan
+to an open worksheet in a single pass
+'''
+from typing import Any, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+import openpyxl
+from openpyxl.utils import get_column_letter
+
+import styles
+
+# Kinds of report row. Together with the column,
+# the kind decides the style of every cell:
+#   TITLE      bold, report date line
+#   HEADER     bold, column headers
+#   INFO       bordered, contract/person info
+#   WEEK1      bordered, blue
+#   WEEK2      bordered
+#   HIGHLIGHT  bordered, orange (e.g. unallocated time)
+#   LIST       bold, member lists below the report
+TITLE, HEADER, INFO, WEEK1, WEEK2, HIGHLIGHT, LIST = range(7)
+
+# kinds which take the alignment and number format of their column
+COLUMN_FORMATTED = (HEADER, INFO, WEEK1, WEEK2, HIGHLIGHT)
+# kinds written from dataframes, which may be highlighted
+BORDERED = (INFO, WEEK1, WEEK2, HIGHLIGHT)
+
+class ColumnFormat:
+    def __init__(self, width: float, alignment: Optional[openpyxl.styles.Alignment] =None, number_format: str ="General"):
+        '''
+        Initialize a ColumnFormat object.
+
+        Parameters:
+        - width (float): Column width.
+        - alignment (Alignment): Alignment of the column's cells (default is none).
+        - number_format (str): Number format of the column's cells (default is "General").
+        '''
+        self.width = width
+        self.alignment = alignment
+        self.number_format = number_format
+
+class RenderPlan:
+    def __init__(self, columns: Sequence[ColumnFormat], highlight: Optional[str] =None):
+        '''
+        Initialize a RenderPlan object.
+
+        Parameters:
+        - columns (Sequence[ColumnFormat]): Width and format of each column, from column A.
+        - highlight (str): Bordered cells from this value to the end
+          of their row are highlighted (default is no highlighting).
+        '''
+        self.columns = list(columns)
+        self.highlight = highlight
+        self.merges: List[Tuple[int, int, int, int]] = []
+        # (first sheet row, label) of each section of the report
+        self.sections: List[Tuple[int, str]] = []
+        self._rows: List[np.ndarray] = []
+        self._cols: List[np.ndarray] = []
+        self._values: List[np.ndarray] = []
+        self._kinds: List[np.ndarray] = []
+
+    def addRows(self,
+                rows: Union[int, Sequence[int]],
+                values: Any,
+                kinds: Union[int, Sequence[int]],
+                first_col: int =1
+        ) -> None:
+        '''
+        Adds a block of cells to the plan.
+
+        Params
+        ------
+            rows: first sheet row (1-indexed) of the block,
+            or the sheet row of every row of values
+
+            values: 2-d array of values (one sheet row each),
+            or a list of values for a single row
+
+            kinds: kind of every row, or one kind for all rows
+
+            first_col: sheet column (1-indexed) of the first value
+        '''
+        values = np.asarray(values, dtype=object)
+        if values.ndim == 1:
+            values = values.reshape(1, -1)
+        n_rows, n_cols = values.shape
+
+        if np.ndim(rows) == 0:
+            rows = np.arange(rows, rows + n_rows)
+        kinds = np.broadcast_to(np.asarray(kinds).reshape(-1, 1), (n_rows, n_cols)).copy()
+
+        if self.highlight is not None:
+            # highlight from the matching value to the end of the row
+            hit = (values == self.highlight) & np.isin(kinds, BORDERED)
+            kinds[np.logical_or.accumulate(hit, axis=1)] = HIGHLIGHT
+
+        self._rows.append(np.repeat(np.asarray(rows), n_cols))
+        self._cols.append(np.tile(np.arange(first_col, first_col + n_cols), n_rows))
+        self._values.append(values.ravel())
+        self._kinds.append(kinds.ravel())
+
+    def merge(self, start_row: int, start_column: int, end_row: int, end_column: int) -> None:
+        '''
+        Adds a merged range to the plan. Empty ranges, such as
+        the week cells of a contract with no week 2 entries,
+        are skipped rather than failing when the plan is written
+        '''
+        if end_row < start_row or end_column < start_column:
+            return
+        self.merges.append((start_row, start_column, end_row, end_column))
+
+    def addSection(self, row: int, label: str) -> None:
+        '''
+        Marks the first sheet row of a section of the report,
+        such as one program manager, for outputs which split
+        the report by section (see outputs.py). Sections are
+        not written to excel
+        '''
+        self.sections.append((row, label))
+
+    def cells(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        '''
+        Returns the planned cells in row order as arrays of
+        rows, columns, values and style ids. Where a cell was
+        planned more than once, the last value planned wins.
+        Missing values (NaN) are returned as None.
+        '''
+        if not self._rows:
+            empty = np.array([], dtype=int)
+            return empty, empty, np.array([], dtype=object), empty
+
+        rows = np.concatenate(self._rows)
+        cols = np.concatenate(self._cols)
+        values = np.concatenate(self._values)
+        kinds = np.concatenate(self._kinds)
+
+        # stable sort, so later plans of a cell stay after earlier ones
+        order = np.lexsort((cols, rows))
+        rows, cols, values, kinds = rows[order], cols[order], values[order], kinds[order]
+        last = np.r_[(rows[1:] != rows[:-1]) | (cols[1:] != cols[:-1]), True]
+        rows, cols, values, kinds = rows[last], cols[last], values[last], kinds[last]
+
+        values = np.where(pd.isna(values), None, values)
+        return rows, cols, values, self.styleIds(kinds, cols)
+
+    def styleIds(self, kinds: np.ndarray, cols: np.ndarray) -> np.ndarray:
+        '''Style id of each cell, numbering every (kind, column) pair'''
+        return kinds * (len(self.columns) + 1) + np.minimum(cols, len(self.columns))
+
+    def kinds(self, style_ids: np.ndarray) -> np.ndarray:
+        '''Kind of row of each style id (see styleIds)'''
+        return style_ids // (len(self.columns) + 1)
+
+    def style(self, style_id: int) -> Tuple[Optional[str], str, Optional[openpyxl.styles.Alignment]]:
+        '''
+        The named style (see styles.py), number format
+        and alignment making up a style id
+        '''
+        kind, col = divmod(style_id, len(self.columns) + 1)
+        base = {
+            TITLE: styles.HEADER,
+            HEADER: styles.HEADER,
+            LIST: styles.HEADER,
+            INFO: styles.BODY,
+            WEEK1: styles.WEEK1,
+            WEEK2: styles.BODY,
+            HIGHLIGHT: styles.UNALLOCATED,
+        }[kind]
+        if kind in COLUMN_FORMATTED and 0 < col <= len(self.columns):
+            column = self.columns[col - 1]
+            return base, column.number_format, column.alignment
+        return base, "General", None
+
+def emitPlan(ws: openpyxl.worksheet.worksheet.Worksheet, plan: RenderPlan) -> None:
+    '''
+    Writes a render plan to an open worksheet: cells in
+    row order, then merged ranges, then column widths.
+    '''
+    rows, cols, values, style_ids = plan.cells()
+
+    # register each named style once, then apply by name
+    names = {}
+    for style_id in np.unique(style_ids).tolist():
+        names[style_id] = styles.registerStyle(ws.parent, *plan.style(style_id))
+
+    for row, col, value, style_id in zip(rows.tolist(), cols.tolist(), values.tolist(), style_ids.tolist()):
+        cell = ws.cell(row=row, column=col, value=value)
+        cell.style = names[style_id]
+
+    for start_row, start_column, end_row, end_column in plan.merges:
+        ws.merge_cells(
+            start_row=start_row,
+            start_column=start_column,
+            end_row=end_row,
+            end_column=end_column
+        )
+
+    for idx, column in enumerate(plan.columns, 1):
+        ws.column_dimensions[get_column_letter(idx)].width = column.width
@@ -0,0 +1,133 @@
+'''
+The module provides the named cell styles used in
+reports. Styles are registered with a workbook once
+and applied to cells by name, so openpyxl does not
+allocate and deduplicate a new style for every cell
+'''
+from typing import Optional
+
+import openpyxl
+from openpyxl.styles import NamedStyle, Font, PatternFill, Side, Border, Alignment
+from openpyxl.styles.fonts import DEFAULT_FONT
+from openpyxl.styles.borders import DEFAULT_BORDER
+
+blue_fill = PatternFill('solid', fgColor="daeef3")
+orange_fill = PatternFill('solid', fgColor="ffb38a")
+bold_font = Font(bold=True)
+hair = Side(border_style="hair")
+border_style = Border(
+    left=hair,
+    right=hair,
+    top=hair,
+    bottom=hair,
+)
+center = Alignment(horizontal='center', vertical='center')
+fill = Alignment(horizontal='fill')
+
+# base styles
+HEADER = "Report Header"
+BODY = "Report Body"
+WEEK1 = "Report Week 1"
+UNALLOCATED = "Report Unallocated Time"
+HOURS = "Report Hours"
+PERCENT = "Report Percent"
+
+BASE_STYLES = {
+    HEADER: dict(font=bold_font),
+    BODY: dict(border=border_style),
+    WEEK1: dict(border=border_style, fill=blue_fill),
+    UNALLOCATED: dict(border=border_style, fill=orange_fill),
+    HOURS: dict(number_format="0.0"),
+    PERCENT: dict(number_format="0%"),
+}
+
+# the base styles as xlsxwriter format properties (see workbooks.py)
+XLSXWRITER_STYLES = {
+    HEADER: dict(bold=True),
+    BODY: dict(border=7),  # 7 -> hair
+    WEEK1: dict(border=7, pattern=1, bg_color="#" + blue_fill.fgColor.rgb[-6:]),
+    UNALLOCATED: dict(border=7, pattern=1, bg_color="#" + orange_fill.fgColor.rgb[-6:]),
+}
+
+# names given to the column formats a base style is combined with
+NUMBER_FORMAT_NAMES = {"0.0": "hours", "0%": "percent"}
+ALIGNMENT_NAMES = {center: "centered", fill: "fill"}
+
+def _register(wb: openpyxl.Workbook, name: str, **attributes) -> str:
+    if name not in wb.named_styles:
+        # unset attributes fall back to the workbook defaults,
+        # as they do for cells styled attribute by attribute
+        attributes.setdefault("font", DEFAULT_FONT)
+        attributes.setdefault("border", DEFAULT_BORDER)
+        wb.add_named_style(NamedStyle(name=name, **attributes))
+    return name
+
+def registerStyles(wb: openpyxl.Workbook) -> None:
+    '''Registers the base report styles with a workbook (once)'''
+    if HEADER in wb.named_styles:
+        return
+    for name, attributes in BASE_STYLES.items():
+        _register(wb, name, **attributes)
+
+def registerStyle(
+        wb: openpyxl.Workbook,
+        base: Optional[str],
+        number_format: str ="General",
+        alignment: Optional[Alignment] =None
+) -> str:
+    '''
+    Registers (once) a base style combined with a column's
+    number format and alignment, e.g. week 1 entries in the
+    hours column, and returns the name to apply it by.
+
+    Params
+    ------
+        wb: workbook the style is used in
+
+        base: one of the base styles, or None for
+        a cell styled by its column only
+
+        number_format: number format of the column
+
+        alignment: alignment of the column
+    '''
+    registerStyles(wb)
+
+    attributes = dict(BASE_STYLES[base]) if base is not None else {}
+    parts = [base] if base is not None else ["Report"]
+    if number_format != "General":
+        attributes["number_format"] = number_format
+        parts.append(NUMBER_FORMAT_NAMES.get(number_format, number_format))
+    if alignment is not None:
+        attributes["alignment"] = alignment
+        parts.append(ALIGNMENT_NAMES.get(alignment, repr(alignment)))
+
+    if base is None and not attributes:
+        return "Normal"
+    if parts == ["Report", "hours"]:
+        return HOURS
+    if parts == ["Report", "percent"]:
+        return PERCENT
+    return _register(wb, ", ".join(parts), **attributes)
+
+def xlsxwriterFormat(
+        base: Optional[str],
+        number_format: str ="General",
+        alignment: Optional[Alignment] =None
+) -> dict:
+    '''
+    xlsxwriter format properties of a base style combined
+    with a column's number format and alignment, matching
+    the named style registerStyle gives openpyxl
+    '''
+    properties = dict(XLSXWRITER_STYLES[base]) if base is not None else {}
+    if number_format != "General":
+        properties["num_format"] = number_format
+    if alignment is not None:
+        if alignment.horizontal is not None:
+            properties["align"] = alignment.horizontal
+        if alignment.vertical == "center":
+            properties["valign"] = "vcenter"
+        elif alignment.vertical is not None:
+            properties["valign"] = alignment.vertical
+    return properties
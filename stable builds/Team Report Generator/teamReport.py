@@ -0,0 +1,235 @@
+'''
+This module lays out the Team report as a render
+plan: time forecast entries grouped by discipline,
+then by team member, with the week 1 and week 2
+entries of each member listed under their name
+'''
+import datetime
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from manipulate import BlockIndex, categorize, addCategory
+from contractCatalog import ContractCatalog
+from nameIndex import NameIndex
+from styles import center, fill
+from render import RenderPlan, ColumnFormat, TITLE, HEADER, INFO, WEEK1, WEEK2, LIST
+
+H = ["Name",
+     "Week",
+     "Contract",
+     "Description",
+     "M", "T", "W", "R", "F",
+     "Hours",
+     "%",
+     "Milestone 1", "Milestone 2","Milestone 3"]
+
+WEEKDAY_WIDTH = 5
+COLUMNS = [
+    ColumnFormat(19, center),               # name
+    ColumnFormat(6, center),                # week
+    ColumnFormat(11),                       # contract
+    ColumnFormat(19, fill, "0.0"),          # desc (fill avoids spill over)
+    ColumnFormat(WEEKDAY_WIDTH, None, "0.0"),  # m
+    ColumnFormat(WEEKDAY_WIDTH, None, "0.0"),  # t
+    ColumnFormat(WEEKDAY_WIDTH, None, "0.0"),  # w
+    ColumnFormat(WEEKDAY_WIDTH, None, "0.0"),  # r
+    ColumnFormat(WEEKDAY_WIDTH, None, "0.0"),  # f
+    ColumnFormat(6),                        # hours
+    ColumnFormat(WEEKDAY_WIDTH + .5, None, "0%"),  # %
+    ColumnFormat(13),                       # milestone 1
+    ColumnFormat(13),                       # milestone 2
+    ColumnFormat(13),                       # milestone 3
+]
+
+# rows from this contract to the end are highlighted orange
+UNALLOCATED_TIME = "Unallocated Time"
+
+def prepareReport(
+        forecasts: pd.DataFrame,
+        catalog: ContractCatalog,
+        team_list: pd.DataFrame
+) -> Tuple[pd.DataFrame, List[str]]:
+    '''
+    Matches filtered forecasts to contract
+    descriptions and team member disciplines.
+
+    Params
+    ------
+        forecasts: filtered forecasts (see filterNaNs)
+
+        catalog: contracts of ContractList.xlsx
+
+        team_list: TeamMembersList.xlsx
+
+    Returns
+    -------
+        forecasts, disciplines: see planReport
+    '''
+    print("Matching contracts and descriptions...")
+    forecasts = forecasts.reset_index(drop=True)
+    forecasts["desc"] = forecasts["contract"].map(catalog.descriptions)
+
+    print("Fetching a list of disciplines...")
+    # create a list of disciplines to iterate
+    # through when printing the report
+    disciplines = team_list.iloc[:, 2].dropna().tolist()
+    '''
+    ex: disciplines
+    ----------
+    0      SE
+    1    IRSP
+    2     SWE
+    3      ME
+    4      EE
+    5     SRS
+    ----------
+    '''
+
+    print("Matching disciplines to people...")
+    # add discipline column to forecasts data, merging
+    # on the codes of the name categories (names not in
+    # the forecasts become NaN and match nothing)
+    members = team_list[["name", "group"]].astype({"name": forecasts["name"].dtype})
+    forecasts = pd.merge(
+        left=forecasts,
+        right=members,
+        on="name",
+        how='left'
+    )
+    forecasts["group"] = categorize(forecasts["group"])
+
+    # replace blank (NaN) contracts with "none" for grouping. 
+    # (np.NaN cannot be passed as key to get_group)
+    values = {"contract": "none"}
+    forecasts["contract"] = addCategory(forecasts["contract"], "none")
+    forecasts.fillna(value=values, inplace=True)
+
+    # reorder cols to move desc to col 2
+    forecasts = forecasts[['name', 'week', 'contract', 'desc', 'monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'roll_up_hours', 'roll_up_percent', 'milestone1', 'milestone2', 'milestone3', 'group']]
+
+    # cut rows with unallocated time = 0
+    forecasts = forecasts[~((forecasts['contract'] == 'Unallocated Time') & (forecasts['roll_up_hours'] == 0))]
+
+    return forecasts, disciplines
+
+def planReport(
+        forecasts: pd.DataFrame,
+        disciplines: List[str],
+        team_list: pd.DataFrame,
+        DATE: datetime.date
+) -> RenderPlan:
+    '''
+    Lays out the Team report.
+
+    Params
+    ------
+        forecasts: filtered forecasts with desc and group
+        columns, in the printed column order (group last)
+
+        disciplines: disciplines in the order they are printed
+
+        team_list: TeamMembersList.xlsx, for the list
+        of members missing from the report
+
+        DATE: week beginning date of the forecasts
+
+    Returns
+    -------
+        render plan of the report worksheet
+    '''
+    plan = RenderPlan(COLUMNS, UNALLOCATED_TIME)
+
+    # see which disciplines are present for this 2-week period
+    active_disciplines = forecasts["group"].unique()
+
+    # group all forecast rows by discipline, name and week
+    # once, so each printed block is a contiguous slice
+    blocks = BlockIndex(forecasts, ["group", "name", "week"])
+
+    # tracks current row being printed to excel sheet
+    curr_row = 1
+    plan.addRows(
+        curr_row,
+        [f"REPORT FOR WEEK BEGINNING: {str(DATE)}, "
+          f"GENERATED: {datetime.datetime.now()}"],
+        TITLE
+    )
+    curr_row += 1
+
+    plan.addRows(curr_row, H, HEADER)
+    curr_row += 1
+
+    # week entries are gathered as positions in blocks.frame
+    # and sheet rows, then planned together at the end
+    frame_rows = []
+    sheet_rows = []
+    kinds = []
+
+    num_active_disciplines = 0  # flag to avoid printing header twice
+    # only print header again if there is > 1 dicipline active
+    for discipline in disciplines:
+        # if discipline in data, fetch their associated contracts
+        if discipline in active_disciplines:
+            print(f"Writing report for {discipline}...")
+            num_active_disciplines += 1
+        else:
+            continue
+
+        if num_active_disciplines > 1:
+            plan.addRows(curr_row, H, HEADER)
+            curr_row += 1
+        plan.addSection(curr_row, discipline)
+
+        # get names present in this disciplines data
+        for name in blocks.entities(discipline):
+            # track first row index for use vertically appending later
+            FIRST_ROW = curr_row
+
+            # write persons name on left and their group above week #
+            plan.addRows(curr_row, [name, discipline], INFO)
+            curr_row += 1
+
+            week_lengths = []
+            for week, kind in ((1, WEEK1), (2, WEEK2)):
+                start, stop = blocks.span(discipline, name, week)
+                frame_rows.append(np.arange(start, stop))
+                sheet_rows.append(np.arange(curr_row, curr_row + stop - start))
+                kinds.append(np.full(stop - start, kind))
+                curr_row += stop - start
+                week_lengths.append(stop - start)
+            curr_row += 1
+            week1_length, week2_length = week_lengths
+
+            # merge name cells
+            plan.merge(FIRST_ROW, 1, FIRST_ROW + week1_length + week2_length, 1)
+
+            # merge week number cells
+            plan.merge(FIRST_ROW + 1, 2, FIRST_ROW + week1_length, 2)
+            start_week2 = FIRST_ROW + week1_length + 1
+            plan.merge(start_week2, 2, start_week2 + week2_length - 1, 2)
+
+    if frame_rows:
+        # drop discipline col to avoid it being printed
+        # at the end of the row entry
+        entries = blocks.frame.drop(columns=['group']).to_numpy()
+        plan.addRows(
+            np.concatenate(sheet_rows),
+            entries[np.concatenate(frame_rows)],
+            np.concatenate(kinds)
+        )
+
+    plan.addRows(curr_row, ["Team Members Reported:"], LIST)
+    curr_row += 1
+    unique_names = sorted(forecasts["name"].unique())
+    plan.addRows(curr_row, np.array(unique_names, dtype=object).reshape(-1, 1), LIST)
+    curr_row += len(unique_names)
+
+    curr_row += 1
+    plan.addRows(curr_row, ["Members Missing:"], LIST)
+    curr_row += 1
+    missing = NameIndex(team_list["name"]).missing(unique_names)
+    plan.addRows(curr_row, np.array(missing, dtype=object).reshape(-1, 1), LIST)
+
+    return plan
@@ -0,0 +1,214 @@
+'''
+The module saves render plans (see render.py) as excel
+workbooks through one of two backends:
+
+    openpyxl    builds every cell of the sheet in memory,
+                then saves it (see render.emitPlan)
+    xlsxwriter  streams the sheet to disk in row order in
+                constant memory mode, so only one row is
+                held at a time
+
+Both give the same layout: values, merged ranges, named
+colours, number formats and column widths. "auto" uses
+xlsxwriter when it is installed, else openpyxl.
+'''
+import zipfile
+import datetime
+from typing import Dict, Tuple
+
+import numpy as np
+import openpyxl
+
+try:
+    import xlsxwriter
+except ImportError:
+    xlsxwriter = None
+
+import styles
+from render import RenderPlan, emitPlan
+from profiler import Profiler
+
+BACKENDS = ["auto", "openpyxl", "xlsxwriter"]
+
+# xlsxwriter releases the streamed merged ranges were checked
+# against (see registerMerge); "auto" uses openpyxl with others
+XLSXWRITER_VERSIONS = ("3.",)
+
+# number formats openpyxl gives dates and times written to General cells
+DATETIME_FORMATS = [
+    (datetime.datetime, "yyyy-mm-dd h:mm:ss"),
+    (datetime.date, "yyyy-mm-dd"),
+    (datetime.time, "h:mm:ss"),
+]
+
+def resolveBackend(backend: str ="auto") -> str:
+    '''
+    The backend a plan is saved with: "auto" is xlsxwriter
+    if a supported release is installed, else openpyxl
+
+    Raises
+    ------
+        ValueError: if xlsxwriter is asked for but not installed,
+        or the installed release is not in XLSXWRITER_VERSIONS
+    '''
+    supported = xlsxwriter is not None and xlsxwriter.__version__.startswith(XLSXWRITER_VERSIONS)
+    if backend == "auto":
+        return "xlsxwriter" if supported else "openpyxl"
+    if backend == "xlsxwriter" and xlsxwriter is None:
+        raise ValueError("The xlsxwriter backend needs xlsxwriter (pip install xlsxwriter)")
+    if backend == "xlsxwriter" and not supported:
+        raise ValueError(
+            f"The xlsxwriter backend supports xlsxwriter {', '.join(v + 'x' for v in XLSXWRITER_VERSIONS)}, "
+            f"not {xlsxwriter.__version__} (pip install \"xlsxwriter>=3,<4\" or use --backend openpyxl)"
+        )
+    return backend
+
+def registerMerge(ws, start_row: int, start_column: int, end_row: int, end_column: int) -> None:
+    '''
+    Registers a merged range (1-indexed, as in plans) with an
+    xlsxwriter worksheet without writing any of its cells.
+
+    merge_range cannot be used while streaming: in constant memory
+    mode it refuses ranges starting in a row already written, and
+    its blank cells in later rows flush the rows between them. The
+    worksheet's list of ranges is private, so savePlan checks every
+    range reached the saved workbook (see savedMerges).
+    '''
+    ws.merge.append([start_row - 1, start_column - 1, end_row - 1, end_column - 1])
+
+def savedMerges(path: str, sheet: str ="xl/worksheets/sheet1.xml") -> int:
+    '''Number of merged ranges in a worksheet of a saved workbook'''
+    tag = b"<mergeCell "
+    count = 0
+    tail = b""
+    with zipfile.ZipFile(path) as archive, archive.open(sheet) as stream:
+        for chunk in iter(lambda: stream.read(1 << 20), b""):
+            data = tail + chunk
+            count += data.count(tag)
+            # too short to hold a whole tag, so never counted twice
+            tail = data[-(len(tag) - 1):]
+    return count
+
+def saveOpenpyxl(plan: RenderPlan, path: str, profiler: Profiler) -> None:
+    '''Writes a plan to the "Report" sheet of a new openpyxl workbook'''
+    wb = openpyxl.Workbook()
+    ws = wb.create_sheet("Report", 0) # insert at first position
+
+    print("Formatting...")
+    with profiler.stage("format"):
+        emitPlan(ws, plan)
+
+    print("Saving...")
+    with profiler.stage("save"):
+        wb.save(path)
+
+def saveXlsxwriter(plan: RenderPlan, path: str, profiler: Profiler) -> None:
+    '''
+    Streams a plan to the "Report" sheet of a new workbook in
+    row order. Merged ranges are registered up front and their
+    hidden cells written as blanks in the top left cell's format,
+    as merge_range would, without writing ahead of the current row
+    '''
+    wb = xlsxwriter.Workbook(path, {
+        "constant_memory": True,
+        # values are written as they are, as openpyxl writes them
+        "strings_to_urls": False,
+    })
+    ws = wb.add_worksheet("Report")
+    # openpyxl workbooks start with an empty "Sheet"
+    wb.add_worksheet("Sheet")
+
+    print("Formatting...")
+    with profiler.stage("format"):
+        for idx, column in enumerate(plan.columns):
+            ws.set_column(idx, idx, column.width)
+
+        rows, cols, values, style_ids = plan.cells()
+
+        # one format per style id, and per style id with a date
+        formats: Dict[Tuple[int, str], object] = {}
+        def cellFormat(style_id: int, value=None):
+            base, number_format, alignment = plan.style(style_id)
+            if number_format == "General":
+                for kind, date_format in DATETIME_FORMATS:
+                    if isinstance(value, kind):
+                        number_format = date_format
+                        break
+            key = (style_id, number_format)
+            if key not in formats:
+                formats[key] = wb.add_format(styles.xlsxwriterFormat(base, number_format, alignment))
+            return formats[key]
+
+        # the top left cell of the merged range over each hidden cell
+        owners: Dict[Tuple[int, int], Tuple[int, int]] = {}
+        tops = set()
+        for start_row, start_column, end_row, end_column in plan.merges:
+            for row in range(start_row, end_row + 1):
+                for col in range(start_column, end_column + 1):
+                    owners[(row, col)] = (start_row, start_column)
+            del owners[(start_row, start_column)]
+            tops.add((start_row, start_column))
+            registerMerge(ws, start_row, start_column, end_row, end_column)
+
+        # hidden cells nothing was planned in are written too,
+        # so the whole range takes the top left cell's format
+        planned = set(zip(rows.tolist(), cols.tolist()))
+        extra = [cell for cell in owners if cell not in planned]
+        if extra:
+            extra_rows, extra_cols = np.array(extra, dtype=int).T
+            rows = np.concatenate([rows, extra_rows])
+            cols = np.concatenate([cols, extra_cols])
+            values = np.concatenate([values, np.full(len(extra), None, dtype=object)])
+            style_ids = np.concatenate([style_ids, np.full(len(extra), -1)])
+            order = np.lexsort((cols, rows))
+            rows, cols, values, style_ids = rows[order], cols[order], values[order], style_ids[order]
+
+        # a top left cell is always written before the cells it hides
+        top_formats = {}
+        for row, col, value, style_id in zip(rows.tolist(), cols.tolist(), values.tolist(), style_ids.tolist()):
+            owner = owners.get((row, col))
+            if owner is not None:
+                ws.write_blank(row - 1, col - 1, None, top_formats.get(owner))
+                continue
+            cell_format = cellFormat(style_id, value)
+            if (row, col) in tops:
+                top_formats[(row, col)] = cell_format
+            ws.write(row - 1, col - 1, value, cell_format)
+
+    print("Saving...")
+    with profiler.stage("save"):
+        wb.close()
+
+    # the ranges are registered through a private list
+    merges = savedMerges(path)
+    if merges != len(plan.merges):
+        raise RuntimeError(
+            f"xlsxwriter {xlsxwriter.__version__} saved {merges} of {len(plan.merges)} "
+            f"merged ranges to {path}; use --backend openpyxl"
+        )
+
+def savePlan(plan: RenderPlan, path: str, backend: str ="auto", profiler: Profiler =None) -> str:
+    '''
+    Saves a render plan as an excel workbook
+
+    Params
+    ------
+        plan: render plan of the report worksheet
+
+        path: path of the workbook
+
+        backend: one of BACKENDS
+
+        profiler: if given, formatting and saving are timed
+        as the "format" and "save" stages
+
+    Returns
+    -------
+        path of the workbook
+    '''
+    profiler = profiler or Profiler(False)
+    if resolveBackend(backend) == "xlsxwriter":
+        saveXlsxwriter(plan, path, profiler)
+    else:
+        saveOpenpyxl(plan, path, profiler)
+    return path